@@ -0,0 +1,210 @@
+# agendador.py
+
+from indicador_medias import PERIODOS
+from estocastico_incremental import EstocasticoIncremental, STO_LEN, D_LEN
+from estocastico_lento import tendencia_estocastico
+
+# timeframe ('1M', '5M', ...) → regra de resample, na ordem de PERIODOS
+RULES = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
+TFS   = list(RULES.keys())
+
+
+class _No:
+    __slots__ = ("nome", "entradas", "calcular", "assinatura", "valor",
+                 "versao", "vistas", "calculos", "pulos")
+
+    def __init__(self, nome, entradas, calcular, assinatura=None):
+        self.nome       = nome
+        self.entradas   = entradas     # nós de que depende (já registrados)
+        self.calcular   = calcular     # fonte: () → valor; indicador: (*entradas) → valor
+        self.assinatura = assinatura   # só nas fontes: () → marca que muda com o dado
+        self.valor      = None
+        self.versao     = None         # fonte: última assinatura; indicador: contador
+        self.vistas     = None         # versões das entradas no último cálculo
+        self.calculos   = 0
+        self.pulos      = 0
+
+
+class Agendador:
+    """
+    Grafo de dependências de indicadores com recálculo preguiçoso.
+
+      - fonte(nome, assinatura, valor): dado externo (barras de um
+        timeframe, médias...); assinatura() muda sempre que o dado muda
+      - registrar(nome, entradas, calcular): indicador calculado a partir
+        de fontes e/ou outros indicadores, registrados antes dele (a ordem
+        de registro já é uma ordem topológica)
+
+    atualizar(), chamado uma vez por tick, recalcula só os nós cujas
+    entradas mudaram; os demais ficam com o valor em cache e contam como
+    pulados. Um indicador recalculado com o mesmo valor não suja os que
+    dependem dele (ex.: %K mudou, mas a tendência continuou ALTA).
+    """
+
+    def __init__(self):
+        self._nos = {}
+
+    def fonte(self, nome: str, assinatura, valor):
+        self._adicionar(_No(nome, (), valor, assinatura))
+
+    def registrar(self, nome: str, entradas: tuple, calcular):
+        faltam = [e for e in entradas if e not in self._nos]
+        if faltam:
+            raise KeyError(f"{nome}: entradas não registradas {faltam}")
+        self._adicionar(_No(nome, tuple(self._nos[e] for e in entradas), calcular))
+
+    def _adicionar(self, no: _No):
+        if no.nome in self._nos:
+            raise KeyError(f"nó já registrado: {no.nome}")
+        self._nos[no.nome] = no
+
+    def atualizar(self) -> int:
+        """Recalcula os nós sujos; retorna quantos foram recalculados."""
+        recalculados = 0
+        for no in self._nos.values():
+            if no.assinatura is not None:
+                marca = no.assinatura()
+                if no.calculos and marca == no.versao:
+                    no.pulos += 1
+                    continue
+                no.versao = marca
+                no.valor  = no.calcular()
+            else:
+                vistas = tuple(e.versao for e in no.entradas)
+                if no.calculos and vistas == no.vistas:
+                    no.pulos += 1
+                    continue
+                no.vistas = vistas
+                valor = no.calcular(*(e.valor for e in no.entradas))
+                if not no.calculos or valor != no.valor:
+                    no.versao = no.calculos
+                no.valor = valor
+            no.calculos += 1
+            recalculados += 1
+        return recalculados
+
+    def valor(self, nome: str):
+        return self._nos[nome].valor
+
+    def contadores(self) -> dict:
+        """{nó: (recálculos, pulados)}."""
+        return {n.nome: (n.calculos, n.pulos) for n in self._nos.values()}
+
+    def resumo(self) -> str:
+        calc = sum(n.calculos for n in self._nos.values() if n.assinatura is None)
+        pulo = sum(n.pulos for n in self._nos.values() if n.assinatura is None)
+        total = calc + pulo
+        return (f"{calc} recálculos, {pulo} pulados "
+                f"({100 * pulo / total if total else 0:.1f}% evitados) em {len(self._nos)} nós")
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Grafo padrão dos painéis: estocástico, tendência, range e médias por timeframe
+# —————————————————————————————————————————————————————————————————————————
+def _range_candle(motor, tf: str) -> float:
+    """High - Low da barra de floor(último tick), como no painel TAMANHO CANDLE."""
+    barra = motor.barra_piso(tf)
+    return 0.0 if barra is None else float(barra[0] - barra[1])
+
+
+class GrafoIndicadores:
+    """
+    Indicadores dos painéis sobre o MotorBarras (e MediasIncrementais, se
+    houver), recalculados por timeframe só quando as barras dele mudam:
+
+        barras:TF  → estocastico:TF → tendencia:TF
+                   → range:TF
+        medias:TF  → ema:TF
+
+    timeframes limita o grafo aos timeframes usados (perfil sniper); os
+    demais não são calculados nem aparecem nos dicionários de valores.
+    """
+
+    def __init__(self, motor, medias=None, timeframes=None):
+        self.motor  = motor
+        self.medias = medias
+        self.timeframes = [tf for tf in TFS if timeframes is None or tf in timeframes]
+        ag = self.agendador = Agendador()
+        for tf in self.timeframes:
+            rule = RULES[tf]
+            est = EstocasticoIncremental(STO_LEN, D_LEN)
+            ag.fonte(f"barras:{tf}", lambda tf=tf: motor.assinatura(tf), lambda: motor)
+            ag.registrar(f"estocastico:{tf}", (f"barras:{tf}",), lambda m, tf=tf, est=est: est.atualizar(m, tf))
+            ag.registrar(f"tendencia:{tf}", (f"estocastico:{tf}",), lambda kd: tendencia_estocastico(*kd))
+            ag.registrar(f"range:{tf}", (f"barras:{tf}",), lambda m, tf=tf: _range_candle(m, tf))
+            if medias is not None:
+                ag.fonte(f"medias:{tf}", lambda rule=rule: medias.assinatura(rule), lambda: medias)
+                ag.registrar(f"ema:{tf}", (f"medias:{tf}",), lambda md, rule=rule: md.valores(rule))
+
+    def atualizar(self) -> int:
+        return self.agendador.atualizar()
+
+    def _por_tf(self, prefixo: str) -> dict:
+        return {tf: self.agendador.valor(f"{prefixo}:{tf}") for tf in self.timeframes}
+
+    def estocastico(self) -> dict:
+        """{timeframe: (%K, %D)}"""
+        return self._por_tf("estocastico")
+
+    def tendencias(self) -> dict:
+        """{timeframe: 'ALTA' | 'BAIXA' | 'LATERAL' | 'SOBRECOMPRADO' | 'SOBREVENDIDO'}"""
+        return self._por_tf("tendencia")
+
+    def ranges(self) -> dict:
+        """{timeframe: high - low da barra atual}"""
+        return self._por_tf("range")
+
+    def medias_moveis(self) -> dict:
+        """{timeframe: (EMA21, EMA50, count)}; vazio sem MediasIncrementais."""
+        return self._por_tf("ema") if self.medias is not None else {}
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Recálculos evitados num replay de ticks + paridade com o cálculo direto
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    import numpy as np
+    from barras import MotorBarras
+    from tick_store import TickStore
+    from medias_incrementais import MediasIncrementais
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    rng = np.random.default_rng(13)
+    # ticks a cada 0,2-3 s (polling do DDE): muitos sem mudança de preço
+    passos = rng.integers(200, 3_000, n).astype(np.int64) * 1_000_000
+    ts     = np.datetime64("2025-03-10T09:05:00", "ns").astype(np.int64) + np.cumsum(passos)
+    precos = 128_000 + np.cumsum(rng.choice([-5.0, 0.0, 0.0, 0.0, 5.0], n))
+
+    store  = TickStore()
+    motor  = MotorBarras(max_barras=500)
+    medias = MediasIncrementais()
+    grafo  = GrafoIndicadores(motor, medias)
+    estos  = {tf: EstocasticoIncremental() for tf in TFS}   # caminho antigo: tudo a cada tick
+
+    ok = True
+    t_grafo = t_tudo = 0.0
+    for i in range(n):
+        store.anexar({"DataHora": ts[i].astype("datetime64[ns]"), "Último": precos[i]})
+        motor.sincronizar(store)
+        medias.sincronizar(store)
+
+        t0 = time.perf_counter()
+        grafo.atualizar()
+        t_grafo += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ref_kd  = {tf: est.atualizar(motor, tf) for tf, est in estos.items()}
+        ref_rg  = {tf: _range_candle(motor, tf) for tf in TFS}
+        ref_ema = {tf: medias.valores(rule) for tf, rule in RULES.items()}
+        {tf: tendencia_estocastico(*kd) for tf, kd in ref_kd.items()}
+        t_tudo += time.perf_counter() - t0
+
+        ok &= grafo.estocastico() == ref_kd and grafo.ranges() == ref_rg and grafo.medias_moveis() == ref_ema
+
+    print(f"{n} ticks | {grafo.agendador.resumo()} | paridade={ok}")
+    print(f"tudo a cada tick: {t_tudo / n * 1e6:7.1f} us/tick | agendador: {t_grafo / n * 1e6:7.1f} us/tick")
+    for nome, (calc, pulos) in grafo.agendador.contadores().items():
+        if nome.startswith(("estocastico", "tendencia")):
+            print(f"  {nome:<16} {calc:>6} recálculos {pulos:>6} pulados")
@@ -0,0 +1,175 @@
+# agregador_barras.py
+
+from math import gcd
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from indicador_medias import PERIODOS
+
+# timeframe ('1M', '5M', ...) → regra de resample, na ordem de PERIODOS
+RULES = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
+
+
+def _reduzir(rotulos: np.ndarray, o, h, l, c, v) -> tuple:
+    """Agrupa posições consecutivas de mesmo rótulo (primeiro/máx/mín/último/soma)."""
+    novo = rotulos[1:] != rotulos[:-1]
+    if novo.all():
+        # um registro por rótulo (ex.: histórico 1-min no timeframe de 1-min)
+        return rotulos, o, h, l, c, v
+    ini = np.flatnonzero(np.r_[True, novo])
+    fim = np.r_[ini[1:], len(rotulos)] - 1
+    return (
+        rotulos[ini],
+        o[ini],
+        np.maximum.reduceat(h, ini),
+        np.minimum.reduceat(l, ini),
+        c[fim],
+        np.add.reduceat(v, ini),
+    )
+
+
+def _preencher(rotulos: np.ndarray, passo: int, o, h, l, c, v, calendario=None) -> tuple:
+    """
+    Grade completa de rótulos (como o resample) com as barras vazias
+    copiando a anterior (como o .ffill()) e volume 0. Com calendário, as
+    barras vazias fora do pregão são descartadas.
+    """
+    if calendario is None:
+        pos   = (rotulos - rotulos[0]) // passo
+        grade = rotulos[0] + np.arange(pos[-1] + 1, dtype=np.int64) * passo
+    else:
+        # barras de pregão + as com negócio fora dele (after, leilão...)
+        grade, pos, fora = calendario.posicoes(rotulos, passo)
+        if fora.any():
+            grade = np.insert(grade, np.searchsorted(grade, rotulos[fora]), rotulos[fora])
+            pos   = np.searchsorted(grade, rotulos)
+    vol = np.zeros(len(grade), dtype=np.float64)
+    vol[pos] = v
+    # cada barra real se repete até a próxima (posições crescentes, pos[0] = 0);
+    # repetir a linha OHLC inteira (32 bytes) é uma cópia só, não quatro
+    linhas = np.stack((o, h, l, c), axis=1).view([("ohlc", np.float64, 4)]).ravel()
+    ohlc   = np.repeat(linhas, np.diff(pos, append=len(grade))).view(np.float64).reshape(-1, 4)
+    return grade, ohlc[:, 0], ohlc[:, 1], ohlc[:, 2], ohlc[:, 3], vol
+
+
+def agregar_barras(ts, precos, volumes=None, regras: dict = None, preencher: bool = True,
+                   calendario=None) -> dict:
+    """
+    Barras OHLC + volume de todos os timeframes em uma passada, com a
+    semântica dos painéis: resample(rule, closed='right', label='right')
+    .ohlc().ffill() (e .sum() para o volume).
+
+      - ts: epoch em ns (int64 ou datetime64), em ordem crescente
+      - o menor passo agrega os ticks (rótulo = teto por divisão inteira +
+        reduceat); os demais agregam as barras de um passo menor que os
+        divide, pois os intervalos (rótulo-passo, rótulo] se encaixam
+      - preencher=False devolve só as barras com negócio
+      - calendario (calendario_b3.CalendarioB3): só preenche dentro do
+        pregão; barras com negócio fora dele são mantidas
+      - preços NaN são ignorados (como no ohlc)
+
+    Retorna {tf: {"rotulo", "open", "high", "low", "close", "volume"}}.
+    """
+    regras = dict(regras or RULES)
+    ts = np.asarray(ts)
+    if ts.dtype.kind == "M":
+        ts = ts.astype("datetime64[ns]").view(np.int64)
+    ts = ts.astype(np.int64, copy=False)
+    p  = np.asarray(precos, dtype=np.float64)
+    v  = np.zeros(len(p)) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    ok = p == p
+    if not ok.all():
+        ts, p, v = ts[ok], p[ok], v[ok]
+
+    passos = {tf: pd.Timedelta(rule).value for tf, rule in regras.items()}
+    vazio  = {k: np.empty(0, dtype=np.int64 if k == "rotulo" else np.float64)
+              for k in ("rotulo", "open", "high", "low", "close", "volume")}
+    if len(ts) == 0:
+        return {tf: dict(vazio) for tf in regras}
+
+    # barras sem preenchimento por passo; cada timeframe agrega o maior
+    # passo já calculado que o divide (5M ← 1M, 15M ← 5M, 30M ← 15M, ...)
+    base   = reduce(gcd, passos.values())
+    brutas = {base: _reduzir(-(-ts // base) * base, p, p, p, p, v)}
+    for passo in sorted(set(passos.values())):
+        if passo not in brutas:
+            fonte = brutas[max(q for q in brutas if passo % q == 0)]
+            brutas[passo] = _reduzir(-(-fonte[0] // passo) * passo, *fonte[1:])
+
+    saida = {}
+    for tf, passo in passos.items():
+        b = brutas[passo]
+        if preencher:
+            b = _preencher(b[0], passo, *b[1:], calendario=calendario)
+        saida[tf] = dict(zip(("rotulo", "open", "high", "low", "close", "volume"), b))
+    return saida
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: 5 x resample do pandas x agregar_barras (um ano de 1-min)
+# —————————————————————————————————————————————————————————————————————————
+def _agregar_pandas(ts: np.ndarray, precos: np.ndarray, volumes: np.ndarray) -> dict:
+    idx   = pd.DatetimeIndex(ts.view("datetime64[ns]"))
+    serie = pd.Series(precos, index=idx)
+    vol   = pd.Series(volumes, index=idx)
+    saida = {}
+    for tf, rule in RULES.items():
+        bars = serie.resample(rule, closed='right', label='right').ohlc().ffill()
+        bars["volume"] = vol.resample(rule, closed='right', label='right').sum()
+        saida[tf] = bars
+    return saida
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from calendario_b3 import CalendarioB3
+
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 252
+    repeticoes = 5
+    rng = np.random.default_rng(11)
+
+    # um ano de pregões 1-min (09:00-18:00), com alguns minutos sem negócio
+    datas = pd.bdate_range("2024-01-02", periods=dias)
+    ts = np.concatenate([
+        (d + pd.Timedelta(hours=9) + pd.to_timedelta(np.arange(1, 541), "min")).to_numpy()
+        for d in datas
+    ]).astype("datetime64[ns]").view(np.int64)
+    ts = ts[rng.random(len(ts)) > 0.02]
+    precos  = 120_000 + np.cumsum(rng.choice([-10.0, -5.0, 0.0, 5.0, 10.0], len(ts)))
+    volumes = rng.uniform(1e5, 5e6, len(ts))
+
+    def medir(fn):
+        melhor = np.inf
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            r = fn()
+            melhor = min(melhor, time.perf_counter() - t0)
+        return r, melhor
+
+    cal = CalendarioB3()
+    ref, t_pd = medir(lambda: _agregar_pandas(ts, precos, volumes))
+    nov, t_np = medir(lambda: agregar_barras(ts, precos, volumes))
+    ses, t_cl = medir(lambda: agregar_barras(ts, precos, volumes, calendario=cal))
+    _, t_sp   = medir(lambda: agregar_barras(ts, precos, volumes, preencher=False))
+
+    ok = True
+    for tf in RULES:
+        a, b = ref[tf], nov[tf]
+        igual = (np.array_equal(a.index.asi8, b["rotulo"])
+                 and all(np.array_equal(a[k].to_numpy(), b[k]) for k in ("open", "high", "low", "close"))
+                 and np.allclose(a["volume"].to_numpy(), b["volume"]))
+        # com calendário: as barras de pregão da grade do pandas (o ffill é o mesmo)
+        s = ses[tf]
+        m = a.loc[cal.mascara(a.index.asi8, pd.Timedelta(RULES[tf]).value)]
+        sessao = (np.array_equal(m.index.asi8, s["rotulo"])
+                  and all(np.array_equal(m[k].to_numpy(), s[k]) for k in ("open", "high", "low", "close")))
+        ok &= igual and sessao
+        print(f"{tf:>4}: {len(b['rotulo']):>7} barras ({len(s['rotulo']):>6} de pregão) | "
+              f"idêntico={igual} | pregão idêntico={sessao}")
+    print(f"{len(ts)} linhas 1-min ({dias} pregões) | pandas x5: {t_pd * 1e3:7.1f} ms | paridade={ok}")
+    print(f"agregar_barras, grade completa (noites/fins de semana): {t_np * 1e3:6.1f} ms | x{t_pd / t_np:5.1f}")
+    print(f"agregar_barras, grade de pregão (CalendarioB3):         {t_cl * 1e3:6.1f} ms | x{t_pd / t_cl:5.1f}")
+    print(f"agregar_barras(preencher=False):                        {t_sp * 1e3:6.1f} ms | x{t_pd / t_sp:5.1f}")
@@ -0,0 +1,181 @@
+# avaliador_risco.py
+
+import numpy as np
+
+# motivos de saída, na ordem de prioridade quando vários disparam no mesmo tick/barra
+STOP, TRAILING, ALVO = 'STOP', 'TRAILING', 'ALVO'
+
+
+def _primeiro(mascara: np.ndarray) -> int:
+    """Índice do primeiro True (ou len(mascara) se não houver)."""
+    i = int(mascara.argmax()) if len(mascara) else 0
+    return i if len(mascara) and mascara[i] else len(mascara)
+
+
+def _saida_unica(lo: float, hi: float, lado: str, stop, alvo, trailing: float, pico) -> tuple | None:
+    """primeira_saida() de um só intervalo, em aritmética escalar."""
+    if lado == 'VENDA':
+        r = _saida_unica(-hi, -lo, 'COMPRA', None if stop is None else -stop,
+                         None if alvo is None else -alvo, trailing, None if pico is None else -pico)
+        return None if r is None else (r[0], r[1], -r[2])
+    if stop is not None and lo <= stop:
+        return 0, STOP, min(stop, hi)
+    if alvo is not None and trailing > 0:
+        if pico is not None and pico >= alvo and lo <= pico - trailing:
+            return 0, TRAILING, min(pico - trailing, hi)
+    elif alvo is not None and hi >= alvo:
+        return 0, ALVO, max(alvo, lo)
+    return None
+
+
+def primeira_saida(minimas, maximas, lado: str, stop: float | None, alvo: float | None,
+                   trailing: float = 0.0, pico: float | None = None) -> tuple | None:
+    """
+    Qual saída a posição teria atingido primeiro num lote de ticks (ou de
+    barras com mínima/máxima) e a que preço, sem laço em Python.
+
+      - minimas/maximas: um valor por tick (a mesma sequência nas duas) ou
+        a mínima/máxima de cada intervalo (barra 1-min, trecho entre polls)
+      - lado: 'COMPRA' ou 'VENDA'; stop/alvo: níveis de preço (None = sem)
+      - trailing > 0: o alvo não fecha, ativa o trailing stop a 'trailing'
+        pontos do melhor preço (como o CapitalManager); 'pico' é o melhor
+        preço visto antes do lote (continuação entre lotes)
+
+    Dentro de um intervalo a ordem dos preços é desconhecida, então a
+    avaliação é conservadora: no mesmo intervalo vale STOP, depois
+    TRAILING, depois ALVO, e o trailing só anda com as máximas dos
+    intervalos anteriores. Com um valor por tick o resultado é o mesmo da
+    avaliação tick a tick.
+
+    Retorna (índice, motivo, preço) ou None. O preço é o nível, ou o do
+    intervalo quando ele abriu além do nível (gap).
+    """
+    if len(minimas) == 1:
+        # um só tick/intervalo (o caso do loop ao vivo): sem custo do NumPy
+        return _saida_unica(float(minimas[0]), float(maximas[0]), lado, stop, alvo, trailing, pico)
+    lo = np.asarray(minimas, dtype=np.float64)
+    hi = np.asarray(maximas, dtype=np.float64)
+    if lo.size == 0:
+        return None
+    if lado == 'VENDA':
+        # venda = compra no preço espelhado
+        r = primeira_saida(-hi, -lo, 'COMPRA',
+                           None if stop is None else -stop,
+                           None if alvo is None else -alvo,
+                           trailing, None if pico is None else -pico)
+        return None if r is None else (r[0], r[1], -r[2])
+
+    n = lo.size
+    i_stop = _primeiro(lo <= stop) if stop is not None else n
+    i_tr = i_alvo = n
+    nivel_tr = None
+    if alvo is not None and trailing > 0:
+        antes = np.empty(n)
+        antes[0] = -np.inf if pico is None else pico
+        antes[1:] = hi[:-1]
+        antes = np.maximum.accumulate(antes)          # melhor preço antes de cada intervalo
+        nivel_tr = antes - trailing
+        i_tr = _primeiro((antes >= alvo) & (lo <= nivel_tr))
+    elif alvo is not None:
+        i_alvo = _primeiro(hi >= alvo)
+
+    i = min(i_stop, i_tr, i_alvo)
+    if i == n:
+        return None
+    if i == i_stop:
+        return i, STOP, min(stop, hi[i])
+    if i == i_tr:
+        return i, TRAILING, min(nivel_tr[i], hi[i])
+    return i, ALVO, max(alvo, lo[i])
+
+
+def niveis_plano(plano: dict, lado: str, entrada: float, pnl_dia: float, valor_ponto: float) -> tuple:
+    """
+    Preços (stop, alvo) de uma posição pelo plano de trade (stop_op/meta_op
+    por contrato e stop_day/meta_day do dia, em R$): vale o mais próximo
+    entre o limite da operação e o que falta para o limite do dia.
+    """
+    sinal = 1 if lado == 'COMPRA' else -1
+    perda = max(plano['stop_op'], plano['stop_day'] - pnl_dia) / valor_ponto
+    ganho = min(plano['meta_op'], plano['meta_day'] - pnl_dia) / valor_ponto
+    return entrada + sinal * perda, entrada + sinal * ganho
+
+
+def melhor_preco(minimas, maximas, lado: str, pico: float | None = None) -> float | None:
+    """Melhor preço da posição até o fim do lote (máxima na compra, mínima na venda)."""
+    if lado == 'VENDA':
+        m = float(np.min(minimas)) if len(minimas) else None
+        return m if pico is None or (m is not None and m < pico) else pico
+    m = float(np.max(maximas)) if len(maximas) else None
+    return m if pico is None or (m is not None and m > pico) else pico
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Poll de 0,2 s (só o último preço) x todos os ticks / mínima-máxima do
+# intervalo; paridade com a avaliação tick a tick do CapitalManager
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import time
+
+    rng = np.random.default_rng(24)
+    n_pos, n_ticks, amostra = 2000, 2000, 8     # ~8 ticks entre polls de 0,2 s
+    stop_pts, alvo_pts, trail_pts = 150.0, 50.0, 10.0
+
+    def tick_a_tick(precos, lado, entrada):
+        """Réplica em laço do CapitalManager.update (SL → trailing após o alvo)."""
+        s = 1 if lado == 'COMPRA' else -1
+        stop, ts, ativo = entrada - s * stop_pts, entrada - s * trail_pts, False
+        for i, p in enumerate(precos):
+            if s * (p - stop) <= 0:
+                return i, STOP, p
+            if s * (p - entrada) >= alvo_pts:
+                ativo = True
+                novo = p - s * trail_pts
+                if s * (novo - ts) > 0:
+                    ts = novo
+            if ativo and s * (p - ts) <= 0:
+                return i, TRAILING, p
+        return None
+
+    caminhos = 128_000 + np.cumsum(rng.choice([-5.0, 0.0, 5.0], (n_pos, n_ticks)), axis=1)
+    lados = rng.choice(['COMPRA', 'VENDA'], n_pos)
+
+    difs = 0
+    t_laco = t_vet = 0.0
+    for k in range(n_pos):
+        p, lado, ent = caminhos[k], lados[k], caminhos[k, 0]
+        s = 1 if lado == 'COMPRA' else -1
+        t0 = time.perf_counter()
+        a = tick_a_tick(p[1:], lado, ent)
+        t_laco += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        b = primeira_saida(p[1:], p[1:], lado, ent - s * stop_pts, ent + s * alvo_pts, trail_pts)
+        t_vet += time.perf_counter() - t0
+        difs += a != b
+    print(f"{n_pos} posições x {n_ticks} ticks: laço {t_laco / n_pos * 1e3:.2f} ms | "
+          f"vetorizado {t_vet / n_pos * 1e3:.3f} ms por posição | divergências: {difs}")
+
+    # só SL/TP (check_exits): último preço de cada poll x mínima/máxima do intervalo
+    trocadas = atrasadas = 0
+    atraso = perda = 0.0
+    for k in range(n_pos):
+        p, lado, ent = caminhos[k, 1:], lados[k], caminhos[k, 0]
+        s = 1 if lado == 'COMPRA' else -1
+        stop, alvo = ent - s * 30.0, ent + s * 60.0
+        m = len(p) // amostra * amostra
+        real = primeira_saida(p[:m], p[:m], lado, stop, alvo)
+        if real is None:
+            continue
+        blocos = p[:m].reshape(-1, amostra)
+        poll  = primeira_saida(blocos[:, -1], blocos[:, -1], lado, stop, alvo)
+        faixa = primeira_saida(blocos.min(axis=1), blocos.max(axis=1), lado, stop, alvo)
+        assert faixa[0] == real[0] // amostra and faixa[1:] == real[1:]
+        if poll[1] != real[1]:
+            trocadas += 1
+        elif poll[0] > faixa[0]:
+            atrasadas += 1
+            atraso += poll[0] - faixa[0]
+            perda += s * (real[2] - poll[2]) if real[1] == STOP else 0.0
+    print(f"stop/meta só com o último preço do poll: {trocadas} saídas trocadas (meta no lugar do stop "
+          f"ou vice-versa), {atrasadas} atrasadas (média {atraso / max(atrasadas, 1):.1f} polls, "
+          f"{perda / max(atrasadas, 1):.1f} pts a mais por saída) | com mínima/máxima: iguais ao tick a tick")
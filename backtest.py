@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# backtest.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import BACKTEST_PROCESSOS, BACKTEST_DIAS_TAREFA, BACKTEST_AQUECIMENTO
+from agregador_barras import agregar_barras, RULES
+from estocastico_incremental import STO_LEN, D_LEN
+from cenarios import TabelaCenarios, ESTADOS, TFS
+from avaliador_risco import primeira_saida, niveis_plano
+
+_PASSOS = {tf: pd.Timedelta(rule).value for tf, rule in RULES.items()}
+_FATOR = 1.0 - 2.0 / (D_LEN + 1.0)        # decaimento da EWM do estocástico lento
+
+# estado do processo (trabalhador do pool ou o próprio, sem pool)
+_dados  = None
+_tabela = None
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Estocástico lento por linha do histórico (mesmo resultado do
+# EstocasticoIncremental no loop de ticks, sem laço por linha)
+# —————————————————————————————————————————————————————————————————————————
+def _fk(c, hr, lr) -> np.ndarray:
+    """%K rápido; janela sem amplitude → NaN (como no incremental)."""
+    den = hr - lr
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, 100 * (c - lr) / den, np.where(c == lr, np.nan, np.inf))
+
+
+def _estados_ewm(fk: np.ndarray) -> tuple:
+    """
+    Estado (média, peso) das EWMs de %K e %D após cada barra fechada,
+    com a recorrência do _EWM (laço por barra, não por linha).
+    """
+    n = len(fk)
+    mk, wk, md, wd = (np.empty(n) for _ in range(4))
+    k = d = np.nan
+    pk = pd_ = 1.0
+    f = _FATOR
+    for i, x in enumerate(fk.tolist()):
+        if k == k:
+            pk *= f
+            if x == x:
+                if k != x:
+                    k = (pk * k + x) / (pk + 1.0)
+                pk += 1.0
+        elif x == x:
+            k = x
+        if d == d:
+            pd_ *= f
+            if k == k:
+                if d != k:
+                    d = (pd_ * d + k) / (pd_ + 1.0)
+                pd_ += 1.0
+        elif k == k:
+            d = k
+        mk[i], wk[i], md[i], wd[i] = k, pk, d, pd_
+    return mk, wk, md, wd
+
+
+def _passo_ewm(media, peso, x) -> tuple:
+    """Um passo do _EWM para cada linha (média/peso/entrada em arrays)."""
+    ativa = media == media
+    valido = x == x
+    peso = np.where(ativa, peso * _FATOR, peso)
+    mistura = np.where(media != x, (peso * media + x) / (peso + 1.0), media)
+    media = np.where(ativa, np.where(valido, mistura, media), np.where(valido, x, media))
+    return media, np.where(ativa & valido, peso + 1.0, peso)
+
+
+def estocastico_linhas(ts: np.ndarray, precos: np.ndarray, barras: dict, passo: int) -> tuple:
+    """
+    (%K, %D) do timeframe em cada linha, como o painel os veria depois do
+    tick da linha: barras fechadas definitivas, barra em formação só com
+    os ticks até a linha e a barra do piso (floor do tick) com o último
+    preço (ajuste do MotorBarras). (0, 0) com menos de STO_LEN barras.
+    """
+    R, H, L, C = barras['rotulo'], barras['high'], barras['low'], barras['close']
+    rot = -(-ts // passo) * passo
+    j = np.searchsorted(R, rot)                        # barra em formação de cada linha
+
+    # barra em formação até a linha (máx/mín acumulados dentro da barra)
+    grupos = pd.Series(precos).groupby(j)
+    hp, lp = grupos.cummax().to_numpy(), grupos.cummin().to_numpy()
+
+    # barra anterior, com o último preço se for a barra do piso
+    a = np.maximum(j - 1, 0)
+    piso = ts // passo * passo
+    ajuste = (piso != rot) & (j >= 1) & (R[a] == piso)
+    h1 = np.where(ajuste, np.maximum(H[a], precos), H[a])
+    l1 = np.where(ajuste, np.minimum(L[a], precos), L[a])
+    c1 = np.where(ajuste, precos, C[a])
+
+    # extremos e médias das barras consolidadas (até a antepenúltima)
+    b = np.maximum(j - 2, 0)
+    alta, baixa = pd.Series(H), pd.Series(L)
+    max7 = alta.rolling(STO_LEN - 1, min_periods=1).max().to_numpy()
+    min7 = baixa.rolling(STO_LEN - 1, min_periods=1).min().to_numpy()
+    max6 = alta.rolling(STO_LEN - 2, min_periods=1).max().to_numpy()
+    min6 = baixa.rolling(STO_LEN - 2, min_periods=1).min().to_numpy()
+    fk_barras = _fk(C, alta.rolling(STO_LEN, min_periods=1).max().to_numpy(),
+                    baixa.rolling(STO_LEN, min_periods=1).min().to_numpy())
+    fk_barras[:STO_LEN - 1] = np.nan
+    mk, wk, md, wd = _estados_ewm(fk_barras)
+
+    fk1 = _fk(c1, np.maximum(max7[b], h1), np.minimum(min7[b], l1))
+    fk1[j < STO_LEN] = np.nan
+    fk0 = _fk(precos, np.maximum(np.maximum(max6[b], h1), hp), np.minimum(np.minimum(min6[b], l1), lp))
+
+    k1, pk = _passo_ewm(mk[b], wk[b], fk1)
+    d1, pd_ = _passo_ewm(md[b], wd[b], k1)
+    k0, _ = _passo_ewm(k1, pk, fk0)
+    d0, _ = _passo_ewm(d1, pd_, k0)
+    curta = j + 1 < STO_LEN
+    k0[curta] = 0.0
+    d0[curta] = 0.0
+    return k0, d0
+
+
+def tendencia_codigos(k: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """tendencia_estocastico vetorizada: índice em ESTADOS de cada linha."""
+    with np.errstate(invalid='ignore'):
+        return np.select(
+            [np.abs(k - d) < 1, k > 80, k < 20, k > d],
+            [ESTADOS.index('LATERAL'), ESTADOS.index('SOBRECOMPRADO'),
+             ESTADOS.index('SOBREVENDIDO'), ESTADOS.index('ALTA')],
+            ESTADOS.index('BAIXA'),
+        ).astype(np.int8)
+
+
+def tendencias_linhas(ts: np.ndarray, precos: np.ndarray, calendario=None) -> dict:
+    """{timeframe: códigos de tendência (ESTADOS) por linha} de todos os timeframes."""
+    barras = agregar_barras(ts, precos, calendario=calendario)
+    return {tf: tendencia_codigos(*estocastico_linhas(ts, precos, barras[tf], _PASSOS[tf])) for tf in TFS}
+
+
+def decisoes_linhas(codigos: dict, tabela: TabelaCenarios) -> tuple:
+    """
+    Cenário de cada linha: uma busca na tabela por combinação distinta de
+    tendências (no máximo 5^5), espalhada de volta para as linhas.
+    Retorna (decisão: +1 COMPRA / -1 VENDA / 0, CODIGO do cenário).
+    """
+    chave = np.zeros(len(next(iter(codigos.values()))), dtype=np.int64)
+    for tf in TFS:
+        chave = chave * len(ESTADOS) + codigos[tf]
+    combos, inverso = np.unique(chave, return_inverse=True)
+    lados = np.zeros(len(combos), dtype=np.int8)
+    nomes = np.empty(len(combos), dtype=object)
+    for n, c in enumerate(combos.tolist()):
+        trends = {}
+        for tf in reversed(TFS):
+            c, e = divmod(c, len(ESTADOS))
+            trends[tf] = ESTADOS[e]
+        sce = tabela.buscar(trends)
+        dec = str(sce.get('DECISAO', '')).strip().upper()
+        lados[n] = 1 if dec == 'COMPRA' else -1 if dec == 'VENDA' else 0
+        nomes[n] = sce.get('CODIGO')
+    return lados[inverso], nomes[inverso]
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Operações de um pregão (regras do gestor_trade)
+# —————————————————————————————————————————————————————————————————————————
+def simular_dia(precos, minimas, maximas, lados, plano: dict, valor_ponto: float) -> list:
+    """
+    Entradas e saídas de um pregão como a TradeSession faria linha a linha:
+
+      - entrada no preço da linha quando o cenário diz COMPRA/VENDA, sem
+        posição aberta e com menos de plano['operacoes'] operações no dia
+      - saída pelo stop/meta da operação ou do dia (niveis_plano) avaliado
+        na mínima/máxima das linhas seguintes (primeira_saida), ao preço
+        do nível; na mesma linha da saída pode haver nova entrada
+      - posição aberta no fim do pregão é zerada no último preço ('FIM')
+
+    Retorna [(linha entrada, linha saída, lado, preço entrada, preço saída,
+    motivo, P&L por contrato)], com o P&L em R$ como o daily_pnl do gestor.
+    """
+    operacoes = []
+    candidatas = np.flatnonzero(lados)
+    pnl_dia, i, n = 0.0, 0, len(precos)
+    while len(operacoes) < plano['operacoes']:
+        k = np.searchsorted(candidatas, i)
+        if k == len(candidatas):
+            break
+        e = int(candidatas[k])
+        lado = 'COMPRA' if lados[e] > 0 else 'VENDA'
+        entrada = float(precos[e])
+        stop, alvo = niveis_plano(plano, lado, entrada, pnl_dia, valor_ponto)
+        saida = primeira_saida(minimas[e + 1:], maximas[e + 1:], lado, stop, alvo)
+        if saida is None:
+            x, motivo, preco = n - 1, 'FIM', float(precos[-1])
+        else:
+            x, motivo, preco = e + 1 + saida[0], saida[1], float(saida[2])
+        sinal = 1 if lado == 'COMPRA' else -1
+        pl = sinal * (preco - entrada) * valor_ponto
+        pnl_dia += pl
+        operacoes.append((e, x, lado, entrada, preco, motivo, pl))
+        if saida is None:
+            break
+        i = x
+    return operacoes
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Tarefas do pool: blocos de pregões consecutivos com aquecimento
+# —————————————————————————————————————————————————————————————————————————
+def _iniciar(dados: dict):
+    """Inicializador do trabalhador: histórico, plano e tabela de cenários."""
+    global _dados, _tabela
+    _dados = dados
+    _tabela = TabelaCenarios(dados['cenarios'])
+
+
+def _executar_bloco(ini_aquecimento: int, dias: list) -> list:
+    """Tendências, cenários e operações de um bloco de pregões (linhas [ini, fim))."""
+    d = _dados
+    fim = dias[-1][1]
+    fatia = slice(ini_aquecimento, fim)
+    ts, precos = d['ts'][fatia], d['precos'][fatia]
+    lados, codigos = decisoes_linhas(tendencias_linhas(ts, precos, d['calendario']), _tabela)
+    lo, hi = d['minimas'][fatia], d['maximas'][fatia]
+
+    saida = []
+    for ini, fim in dias:
+        a, b = ini - ini_aquecimento, fim - ini_aquecimento
+        for e, x, lado, entrada, preco, motivo, pl in simular_dia(
+                precos[a:b], lo[a:b], hi[a:b], lados[a:b], d['plano'], d['valor_ponto']):
+            saida.append((ini + e, ini + x, lado, codigos[a + e], entrada, preco, motivo, pl))
+    return saida
+
+
+def _blocos(ts: np.ndarray, calendario, dias_por_tarefa: int, aquecimento: int) -> list:
+    """[(linha inicial do aquecimento, [(ini, fim) de cada pregão])] em ordem."""
+    dia = ts.astype('datetime64[ns]').astype('datetime64[D]')
+    inicios = np.flatnonzero(np.r_[True, dia[1:] != dia[:-1]])
+    limites = list(zip(inicios.tolist(), np.r_[inicios[1:], len(ts)].tolist()))
+    duracao = aquecimento * max(_PASSOS.values())
+    blocos = []
+    for k in range(0, len(limites), max(1, dias_por_tarefa)):
+        dias = limites[k:k + dias_por_tarefa]
+        t0 = int(ts[dias[0][0]])
+        corte = calendario.recuar(t0, duracao) if calendario is not None else t0 - duracao
+        blocos.append((int(np.searchsorted(ts, corte)), dias))
+    return blocos
+
+
+def backtest(historico: pd.DataFrame, cenarios: pd.DataFrame, plano: dict, valor_ponto: float = None,
+             processos: int = BACKTEST_PROCESSOS, dias_por_tarefa: int = BACKTEST_DIAS_TAREFA,
+             aquecimento: int = BACKTEST_AQUECIMENTO, calendario=None) -> pd.DataFrame:
+    """
+    Backtest da aba CENARIOS + regras de stop/meta do gestor_trade sobre o
+    histórico 1-min do Profit (DataFrame de le_csv_profit/CacheHistorico),
+    cada linha tratada como um tick do replay:
+
+      - tendências de todos os timeframes por linha, vetorizadas
+        (estocastico_linhas), cenário por combinação distinta de tendências
+      - operações pregão a pregão com o plano (load_trade_plan: contratos,
+        operacoes, stop_op, meta_op, stop_day, meta_day), limites diários
+        zerados a cada pregão
+      - blocos de 'dias_por_tarefa' pregões distribuídos num pool de
+        'processos' processos (0 = um por núcleo, 1 = sem pool); cada bloco
+        aquece o estocástico com 'aquecimento' barras do maior timeframe
+
+    Retorna uma linha por operação (DataHora de entrada/saída, lado,
+    cenário, preços, motivo, pontos, P&L por contrato e resultado com os
+    contratos do plano). Sem perfil sniper: todos os timeframes entram.
+    """
+    if valor_ponto is None:
+        from gestor_trade import VALOR_PONTO_INDICE as valor_ponto
+    h = historico[historico['DataHora'].notna() & historico['Último'].notna()]
+    ts = h['DataHora'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    unicos = np.ones(len(ts), dtype=bool)
+    unicos[1:] = ts[1:] > ts[:-1]                      # o loop só anexa DataHora crescente
+    h, ts = h[unicos], ts[unicos]
+    precos = h['Último'].to_numpy(dtype=np.float64)
+    dados = {
+        'ts':          ts,
+        'precos':      precos,
+        'minimas':     np.fmin(precos, h['Mínimo'].to_numpy(dtype=np.float64)),
+        'maximas':     np.fmax(precos, h['Máximo'].to_numpy(dtype=np.float64)),
+        'cenarios':    cenarios,
+        'plano':       plano,
+        'valor_ponto': float(valor_ponto),
+        'calendario':  calendario,
+    }
+    # histórico vazio (ou sem DataHora/Último válidos): nenhuma operação
+    blocos = _blocos(ts, calendario, dias_por_tarefa, aquecimento) if len(ts) else []
+
+    processos = processos or os.cpu_count() or 1
+    if processos <= 1 or len(blocos) <= 1:
+        _iniciar(dados)
+        resultados = [_executar_bloco(*b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(min(processos, len(blocos)), initializer=_iniciar,
+                                 initargs=(dados,)) as pool:
+            resultados = list(pool.map(_executar_bloco, *zip(*blocos)))
+
+    colunas = ['entrada', 'saida', 'lado', 'cenario', 'preco_entrada', 'preco_saida', 'motivo', 'pl']
+    ops = pd.DataFrame([op for r in resultados for op in r], columns=colunas)
+    dh = ts.view('datetime64[ns]')
+    ops['entrada'] = dh[ops['entrada'].to_numpy(dtype=np.int64)]
+    ops['saida']   = dh[ops['saida'].to_numpy(dtype=np.int64)]
+    ops.insert(0, 'dia', ops['entrada'].dt.normalize())
+    sinal = np.where(ops['lado'] == 'COMPRA', 1.0, -1.0)
+    ops['pontos'] = sinal * (ops['preco_saida'] - ops['preco_entrada'])
+    ops['resultado'] = ops['pl'] * plano.get('contratos', 1)
+    return ops
+
+
+def resumo(ops: pd.DataFrame) -> dict:
+    """Totais do backtest: operações, acerto, resultado, fator de lucro e pior sequência."""
+    if ops.empty:
+        return {'operacoes': 0}
+    por_dia = ops.groupby('dia')['resultado'].sum()
+    curva = por_dia.cumsum()
+    ganhos, perdas = ops['resultado'][ops['resultado'] > 0].sum(), -ops['resultado'][ops['resultado'] < 0].sum()
+    return {
+        'pregoes':      len(por_dia),
+        'operacoes':    len(ops),
+        'acerto':       float((ops['resultado'] > 0).mean()),
+        'resultado':    float(ops['resultado'].sum()),
+        'fator_lucro':  float(ganhos / perdas) if perdas else float('inf'),
+        'drawdown_max': float((curva.cummax().clip(lower=0) - curva).max()),
+        'motivos':      ops['motivo'].value_counts().to_dict(),
+    }
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Um ano do histórico (ou sintético): tempo com e sem pool + paridade com o
+# loop de ticks (MotorBarras + GrafoIndicadores + TradeSession)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    from config import PASTA_HISTORICO, ATIVO_PRINCIPAL_BASE, FALCAO_EXCEL_PATH
+    from calendario_b3 import calendario_config, CalendarioB3
+    from cache_historico import CacheHistorico
+
+    cal = calendario_config() or CalendarioB3()
+    csv = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PASTA_HISTORICO, f"{ATIVO_PRINCIPAL_BASE}_F_0_1min.csv")
+    rng = np.random.default_rng(25)
+    if os.path.isfile(csv):
+        historico = CacheHistorico(csv).carregar()
+    else:
+        print(f"[Aviso] {csv} não encontrado: usando um ano sintético de pregões 1-min")
+        datas = pd.bdate_range("2025-01-02", "2025-12-30")
+        datas = datas[cal.dia_util(datas.to_numpy().astype("datetime64[D]").astype(np.int64))]
+        dh = np.concatenate([(d + pd.Timedelta(hours=9) + pd.to_timedelta(np.arange(1, 571), "min")).to_numpy()
+                             for d in datas])
+        ult = 120_000 + np.cumsum(rng.choice([-10.0, -5.0, 0.0, 5.0, 10.0], len(dh)) * 3)
+        amp = rng.integers(0, 8, len(dh)) * 5.0
+        historico = pd.DataFrame({"DataHora": dh, "Último": ult, "Fechamento": ult,
+                                  "Máximo": ult + amp, "Mínimo": ult - amp[::-1]})
+
+    if os.path.isfile(FALCAO_EXCEL_PATH):
+        from falcao_panel import load_scenarios
+        from planotrade import load_trade_plan
+        cenarios, plano = load_scenarios(FALCAO_EXCEL_PATH), load_trade_plan(FALCAO_EXCEL_PATH)
+    else:
+        print(f"[Aviso] {FALCAO_EXCEL_PATH} não encontrado: cenários e plano de exemplo")
+        # cada regra fixa a tendência de dois timeframes (curinga nos demais)
+        cenarios = pd.DataFrame('*', index=range(60), columns=TFS)
+        for i in range(len(cenarios)):
+            for tf in rng.choice(TFS, 2, replace=False):
+                cenarios.loc[i, tf] = rng.choice(ESTADOS)
+        cenarios['CODIGO']  = [f"R{i:02d}" for i in range(len(cenarios))]
+        cenarios['DECISAO'] = rng.choice(['COMPRA', 'VENDA', 'AGUARDA'], len(cenarios), p=[0.3, 0.3, 0.4])
+        cenarios.loc[0, 'DECISAO'] = 'AGUARDA'          # sem cenário que case: aguarda
+        plano = {'carteira': 1000.0, 'banca': 1000.0, 'contratos': 2, 'operacoes': 5,
+                 'stop_op': -40.0, 'meta_op': 60.0, 'stop_day': -100.0, 'meta_day': 150.0}
+
+    print(f"{len(historico)} linhas 1-min | {len(cenarios)} cenários | plano: {plano}")
+    for processos in (1, BACKTEST_PROCESSOS or os.cpu_count() or 1):
+        t0 = time.perf_counter()
+        ops = backtest(historico, cenarios, plano, processos=processos, calendario=cal)
+        print(f"  {processos:>2} processo(s): {time.perf_counter() - t0:6.2f} s")
+    r = resumo(ops)
+    print(f"{r['pregoes']} pregões, {r['operacoes']} operações | acerto {r['acerto']:.1%} | "
+          f"resultado R$ {r['resultado']:,.2f} | fator de lucro {r['fator_lucro']:.2f} | "
+          f"drawdown máx. R$ {r['drawdown_max']:,.2f} | {r['motivos']}")
+
+    # paridade: os primeiros pregões linha a linha pelo caminho ao vivo
+    from barras import MotorBarras
+    from agendador import GrafoIndicadores
+    from gestor_trade import TradeSession
+
+    dias = 3
+    h = historico.dropna(subset=["DataHora", "Último"])
+    ts = h['DataHora'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    (ini_aq, blocos), = _blocos(ts, cal, dias, BACKTEST_AQUECIMENTO)[2:3]
+    fim = blocos[-1][1]
+    ref = backtest(h.iloc[ini_aq:fim], cenarios, plano, processos=1, dias_por_tarefa=dias,
+                   aquecimento=10 ** 6, calendario=cal)
+    ult = h['Último'].to_numpy()
+    lo = np.fmin(ult, h['Mínimo'].to_numpy())
+    hi = np.fmax(ult, h['Máximo'].to_numpy())
+    codigos = tendencias_linhas(ts[ini_aq:fim], ult[ini_aq:fim], cal)
+
+    motor = MotorBarras(max_barras=10 ** 5, calendario=cal)
+    grafo = GrafoIndicadores(motor)
+    tabela = TabelaCenarios(cenarios)
+    sessao = TradeSession('backtest', enviar_ordens=False, registrar=False, planilha=False)
+    difs, pl_vivo = 0, []
+    for ini, fim_dia in blocos:
+        for i in range(ini_aq if ini == blocos[0][0] else ini, ini):
+            motor.tick(int(ts[i]), float(ult[i]))
+        sessao.configurar_plano(plano)
+        for i in range(ini, fim_dia):
+            motor.tick(int(ts[i]), float(ult[i]))
+            grafo.atualizar()
+            trends = grafo.tendencias()
+            difs += any(trends[tf] != ESTADOS[codigos[tf][i - ini_aq]] for tf in TFS)
+            sessao.update_trade_state(tabela.buscar(trends), float(ult[i]), faixa=((lo[i],), (hi[i],)))
+        sessao.check_exits(forcar_saida=True)
+        pl_vivo.append(sessao.daily_pnl)
+    pl_vet = ref.groupby('dia')['pl'].sum().reindex(
+        pd.to_datetime([pd.Timestamp(ts[a]).normalize() for a, _ in blocos]), fill_value=0.0).to_numpy()
+    print(f"paridade com o loop de ticks ({dias} pregões): tendências divergentes em {difs} linhas | "
+          f"P&L por pregão: vetorizado {np.round(pl_vet, 2).tolist()} x ao vivo {np.round(pl_vivo, 2).tolist()}")
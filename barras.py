@@ -0,0 +1,363 @@
+# barras.py
+
+import numpy as np
+import pandas as pd
+
+from indicador_medias import PERIODOS
+from agregador_barras import agregar_barras
+
+# timeframe ('1M', '5M', ...) → regra de resample, na ordem de PERIODOS
+RULES = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
+
+
+class SerieBarras:
+    """
+    Barras OHLC de um timeframe, montadas tick a tick com a mesma semântica
+    de serie.resample(rule, closed='right', label='right').ohlc().ffill():
+
+      - o tick em t cai na barra de rótulo ceil(t): intervalo (rótulo-passo, rótulo]
+      - intervalos sem tick viram barras de preenchimento, cópia da anterior
+        (no máximo max_barras delas por lacuna: as mais antigas seriam
+        descartadas de qualquer forma)
+      - com calendário (calendario_b3.CalendarioB3), só há preenchimento
+        dentro do pregão: noites, fins de semana e feriados não geram barras
+
+    Os arrays funcionam como o TickStore com max_linhas: capacidade de
+    2 x max_barras e deslocamento do bloco vivo quando enche. A barra em
+    formação ocupa sempre a última posição.
+    """
+
+    def __init__(self, rule: str, max_barras: int = 1000, calendario=None):
+        self.rule       = rule
+        self.passo      = pd.Timedelta(rule).value
+        self.max_barras = max(2, int(max_barras))
+        self.calendario = calendario
+        self._cap    = 2 * self.max_barras
+        self._rotulo = np.empty(self._cap, dtype=np.int64)
+        self._ohlc   = np.empty((4, self._cap), dtype=np.float64)
+        self.geracao = 0
+        self.versao  = 0           # muda quando alguma barra muda (agendador de indicadores)
+        self.resetar()
+
+    def resetar(self):
+        self.geracao += 1          # indicadores incrementais recomeçam do zero
+        self.versao  += 1
+        self._ini   = 0
+        self._fim   = 0            # posição após a barra em formação
+        self._vazia = True         # barra em formação ainda sem tick válido
+
+    # ——————————————————————————————————————————————————————————————
+    # Escrita
+    # ——————————————————————————————————————————————————————————————
+    def _nova_barra(self, rotulo: int):
+        """Abre uma barra (cópia da anterior, como o ffill) no rótulo dado."""
+        if self._fim == self._cap:
+            n = self._fim - self._ini
+            self._rotulo[:n] = self._rotulo[self._ini:self._fim]
+            self._ohlc[:, :n] = self._ohlc[:, self._ini:self._fim]
+            self._ini, self._fim = 0, n
+        i = self._fim
+        self._rotulo[i] = rotulo
+        if i > self._ini:
+            self._ohlc[:, i] = self._ohlc[:, i - 1]
+        else:
+            self._ohlc[:, i] = np.nan
+        self._fim = i + 1
+        if self._fim - self._ini > self.max_barras:
+            self._ini = self._fim - self.max_barras
+        self._vazia  = True
+        self.versao += 1
+
+    def _lacuna(self, atual: int, rotulo: int) -> list:
+        """Rótulos das barras de preenchimento entre atual e rotulo (exclusive)."""
+        n = (rotulo - atual) // self.passo - 1
+        if self.calendario is None:
+            return [rotulo - k * self.passo for k in range(min(n, self.max_barras), 0, -1)]
+        grade = atual + self.passo * np.arange(1, n + 1, dtype=np.int64)
+        grade = grade[self.calendario.mascara(grade, self.passo)]
+        return grade[-self.max_barras:].tolist()
+
+    def carregar(self, rotulos: np.ndarray, o, h, l, c):
+        """
+        Substitui a série por barras já agregadas (grade completa, como as de
+        agregador_barras.agregar_barras); mantém só as max_barras finais e
+        considera a última como a barra em formação, já com tick.
+        """
+        self.resetar()
+        n = min(len(rotulos), self.max_barras)
+        if n == 0:
+            return
+        self._rotulo[:n] = rotulos[-n:]
+        for k, col in enumerate((o, h, l, c)):
+            self._ohlc[k, :n] = col[-n:]
+        self._fim   = n
+        self._vazia = False
+        self.versao += 1
+
+    def tick(self, ts: int, preco: float):
+        """Aplica um tick (epoch em ns, preço); ts deve ser não decrescente."""
+        rotulo = -(-ts // self.passo) * self.passo
+        if self._fim == self._ini:
+            self._nova_barra(rotulo)
+        else:
+            atual = self._rotulo[self._fim - 1]
+            if rotulo > atual:
+                if rotulo - atual > self.passo:
+                    for r in self._lacuna(atual, rotulo):
+                        self._nova_barra(r)
+                self._nova_barra(rotulo)
+            elif rotulo < atual:
+                return                     # fora de ordem: ignorado
+        if preco != preco:                 # NaN não altera a barra (como o ohlc)
+            return
+        i = self._fim - 1
+        o = self._ohlc
+        if self._vazia:
+            o[0, i] = o[1, i] = o[2, i] = o[3, i] = preco
+            self._vazia  = False
+            self.versao += 1
+        elif preco != o[3, i] or preco > o[1, i] or preco < o[2, i]:
+            if preco > o[1, i]:
+                o[1, i] = preco
+            if preco < o[2, i]:
+                o[2, i] = preco
+            o[3, i] = preco
+            self.versao += 1
+
+    # ——————————————————————————————————————————————————————————————
+    # Leitura
+    # ——————————————————————————————————————————————————————————————
+    def __len__(self) -> int:
+        return self._fim - self._ini
+
+    def rotulos(self) -> np.ndarray:
+        """Rótulos (epoch ns) das barras, a última é a barra em formação."""
+        v = self._rotulo[self._ini:self._fim]
+        v.flags.writeable = False
+        return v
+
+    def ohlc(self) -> np.ndarray:
+        """Matriz 4 x n (open, high, low, close), somente leitura."""
+        v = self._ohlc[:, self._ini:self._fim]
+        v.flags.writeable = False
+        return v
+
+
+class MotorBarras:
+    """
+    Motor único de barras multi-timeframe, compartilhado pelos painéis.
+
+    sincronizar() consome do TickStore só as linhas novas (O(1) por tick
+    por timeframe); se o TickStore foi recarregado (geracao mudou) refaz as
+    barras a partir da janela final do histórico que cabe em max_barras,
+    agregada de uma vez por agregar_barras.
+    """
+
+    def __init__(self, regras: dict = None, max_barras: int = 1000, calendario=None):
+        self.regras     = dict(regras or RULES)
+        self.max_barras = max_barras
+        self.calendario = calendario
+        self.series     = {tf: SerieBarras(rule, max_barras, calendario) for tf, rule in self.regras.items()}
+        self._geracao   = None
+        self.versao       = 0          # muda a cada tick/reset (cache de indicadores)
+        self.ultimo_ts    = None       # último tick aplicado (epoch ns)
+        self.ultimo_preco = None
+
+    def resetar(self):
+        for s in self.series.values():
+            s.resetar()
+        self.ultimo_ts = self.ultimo_preco = None
+        self.versao += 1
+
+    def tick(self, ts: int, preco: float):
+        for s in self.series.values():
+            s.tick(ts, preco)
+        self.ultimo_ts, self.ultimo_preco = ts, preco
+        self.versao += 1
+
+    def _inicio_janela(self, dh: np.ndarray) -> int:
+        """Primeira linha necessária para preencher max_barras do maior timeframe."""
+        passo = max(s.passo for s in self.series.values())
+        if self.calendario is None:
+            corte = (dh[-1] // passo - self.max_barras) * passo
+        else:
+            # max_barras do maior timeframe em tempo de pregão
+            corte = self.calendario.recuar(int(dh[-1]), self.max_barras * passo) // passo * passo
+        return int(np.searchsorted(dh, corte, side="right"))
+
+    def _aquecer(self, dh: np.ndarray, ult: np.ndarray) -> int:
+        """
+        Barras iniciais da janela final do histórico em uma passada vetorizada
+        (agregar_barras) em vez de tick a tick; as linhas após o último preço
+        válido (NaN) seguem pelo tick(), que abre a barra delas.
+        """
+        i0 = self._inicio_janela(dh)
+        validos = np.flatnonzero(ult[i0:] == ult[i0:])
+        j = i0 + int(validos[-1]) + 1 if len(validos) else i0
+        if j > i0:
+            barras = agregar_barras(dh[i0:j], ult[i0:j], regras=self.regras, calendario=self.calendario)
+            for tf, s in self.series.items():
+                b = barras[tf]
+                s.carregar(b["rotulo"], b["open"], b["high"], b["low"], b["close"])
+            self.ultimo_ts, self.ultimo_preco = int(dh[j - 1]), float(ult[j - 1])
+            self.versao += 1
+        for i in range(j, len(dh)):
+            self.tick(int(dh[i]), float(ult[i]))
+        return len(dh) - i0
+
+    def sincronizar(self, store) -> int:
+        """Aplica as linhas do TickStore ainda não vistas; retorna quantas."""
+        if store.vazio:
+            return 0
+        dh  = store.datahora().view(np.int64)
+        ult = store.coluna("Último")
+        if store.geracao != self._geracao:
+            self.resetar()
+            self._geracao = store.geracao
+            return self._aquecer(dh, ult)
+        elif self.ultimo_ts is None:
+            i0 = 0
+        else:
+            i0 = int(np.searchsorted(dh, self.ultimo_ts, side="right"))
+        for i in range(i0, len(dh)):
+            self.tick(int(dh[i]), float(ult[i]))
+        return len(dh) - i0
+
+    def _indice_piso(self, s: SerieBarras) -> int:
+        """Posição da barra de rótulo floor(último tick) na série, ou -1."""
+        if self.ultimo_ts is None:
+            return -1
+        rot  = s.rotulos()
+        piso = self.ultimo_ts // s.passo * s.passo
+        i = int(np.searchsorted(rot, piso))
+        return i if i < len(rot) and rot[i] == piso else -1
+
+    def finais(self, tf: str, n: int = 2) -> tuple:
+        """
+        (high, low, close) das n últimas barras, cópias já com o ajuste do
+        piso de ohlc() — as barras que ainda podem mudar a cada tick.
+        """
+        s = self.series[tf]
+        _, h, l, c = s.ohlc()[:, -n:].copy()
+        i = self._indice_piso(s) - (len(s) - len(h))
+        if i >= 0:
+            pr = self.ultimo_preco
+            h[i] = max(h[i], pr)
+            l[i] = min(l[i], pr)
+            c[i] = pr
+        return h, l, c
+
+    def assinatura(self, tf: str) -> tuple:
+        """
+        Muda sempre que ohlc(tf) pode mudar: barras da série, barra do piso
+        e último preço (usada pelo agendador de indicadores).
+        """
+        s = self.series[tf]
+        piso = None if self.ultimo_ts is None else self.ultimo_ts // s.passo
+        return s.geracao, s.versao, piso, self.ultimo_preco
+
+    def barra_piso(self, tf: str) -> tuple | None:
+        """(high, low, close) da barra de rótulo floor(último tick), já ajustada."""
+        s = self.series[tf]
+        i = self._indice_piso(s)
+        if i < 0:
+            return None
+        _, h, l, c = s.ohlc()[:, i]
+        pr = self.ultimo_preco
+        return max(h, pr), min(l, pr), pr
+
+    @property
+    def ultima_datahora(self) -> pd.Timestamp | None:
+        return None if self.ultimo_ts is None else pd.Timestamp(self.ultimo_ts)
+
+    def ohlc(self, tf: str, ajuste_piso: bool = True) -> pd.DataFrame:
+        """
+        Barras do timeframe (open/high/low/close, índice = rótulo), como o
+        resample().ohlc().ffill() dos painéis. Com ajuste_piso, aplica o
+        mesmo ajuste que os painéis faziam com bars.at[last_dt.floor(rule)]:
+        a barra de rótulo floor(último tick) recebe o último preço em
+        high/low/close (fora de uma virada de barra, é a barra anterior).
+        """
+        s = self.series[tf]
+        o, h, l, c = s.ohlc()
+        rot = s.rotulos()
+        i = self._indice_piso(s) if ajuste_piso else -1
+        if i >= 0:
+            pr = self.ultimo_preco
+            h, l, c = h.copy(), l.copy(), c.copy()
+            h[i] = max(h[i], pr)
+            l[i] = min(l[i], pr)
+            c[i] = pr
+        return pd.DataFrame(
+            {"open": o, "high": h, "low": l, "close": c},
+            index=pd.DatetimeIndex(rot.view("datetime64[ns]"), name="DataHora"),
+            copy=False,
+        )
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Paridade com o resample dos painéis + custo por tick
+# —————————————————————————————————————————————————————————————————————————
+def _barras_pandas(dh: np.ndarray, ult: np.ndarray, rule: str) -> pd.DataFrame:
+    """Caminho antigo dos painéis: resample completo + ajuste do piso."""
+    serie   = pd.Series(ult, index=pd.DatetimeIndex(dh))
+    last_dt = serie.index[-1]
+    last_pr = serie.iat[-1]
+    bars = serie.resample(rule, closed='right', label='right').ohlc().ffill()
+    ts = last_dt.floor(rule)
+    if ts in bars.index:
+        bars.at[ts, 'high']  = max(bars.at[ts, 'high'], last_pr)
+        bars.at[ts, 'low']   = min(bars.at[ts, 'low'],  last_pr)
+        bars.at[ts, 'close'] = last_pr
+    return bars
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from tick_store import TickStore
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(1)
+    # 1-min com pregões de 9h às 18h (noites/fins de semana viram lacunas)
+    dias = pd.bdate_range("2024-01-02", periods=n // 540 + 2)
+    dh   = np.concatenate([
+        (d + pd.Timedelta(hours=9) + pd.to_timedelta(np.arange(540), "min")).to_numpy()
+        for d in dias
+    ])[:n].astype("datetime64[ns]")
+    # alguns ticks fora da grade de minuto (DDE ao vivo) no fim
+    dh[-50:] = dh[-50:] + np.timedelta64(17, "s")
+    ult = 130_000 + np.cumsum(rng.choice([-5.0, 0.0, 5.0], n))
+
+    store = TickStore()
+    store.carregar(pd.DataFrame({"DataHora": dh[:-200], "Último": ult[:-200]}))
+    motor = MotorBarras()
+    motor.sincronizar(store)
+    for i in range(n - 200, n):
+        store.anexar({"DataHora": dh[i], "Último": ult[i]})
+        motor.sincronizar(store)
+
+    ok = True
+    for tf, rule in RULES.items():
+        ref = _barras_pandas(dh, ult, rule).iloc[-motor.max_barras:]
+        nov = motor.ohlc(tf)
+        igual = ref.index.equals(nov.index) and np.allclose(ref.to_numpy(), nov.to_numpy(), equal_nan=True)
+        ok &= igual
+        print(f"{tf:>4}: {len(nov)} barras | paridade={igual}")
+
+    # custo por tick: 5 resamples completos x motor incremental
+    t0 = time.perf_counter()
+    for rule in RULES.values():
+        _barras_pandas(dh, ult, rule)
+    t_pandas = time.perf_counter() - t0
+
+    amostras = 2_000
+    t_base = dh[-1].astype(np.int64)
+    t0 = time.perf_counter()
+    for k in range(amostras):
+        motor.tick(int(t_base + (k + 1) * 1_000_000_000), 130_000.0 + k % 7)
+        for tf in RULES:
+            motor.ohlc(tf)
+    t_motor = (time.perf_counter() - t0) / amostras
+    print(f"{n} linhas | resample x5: {t_pandas * 1e3:8.1f} ms/tick | "
+          f"motor (tick + ohlc x5): {t_motor * 1e3:6.3f} ms/tick | paridade geral={ok}")
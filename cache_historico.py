@@ -0,0 +1,263 @@
+# cache_historico.py
+
+import io
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from valores_profit import tratar_valores
+
+# Colunas numéricas do CSV do Profit → sufixo do arquivo binário (tags do DDE)
+COLUNAS_CACHE = {
+    "Abertura":   "ABE",
+    "Máximo":     "MAX",
+    "Mínimo":     "MIN",
+    "Fechamento": "FEC",
+    "Volume":     "VOL",
+    "Quantidade": "QTT",
+}
+VERSAO_CACHE = 1
+_JANELA_ASSINATURA = 4096
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Leitura do CSV do Profit (caminho lento, usado para montar o cache)
+# —————————————————————————————————————————————————————————————————————————
+def le_csv_profit(origem) -> pd.DataFrame:
+    """
+    Lê o CSV 1-min do Profit (caminho ou buffer) e devolve DataFrame com
+    DataHora + colunas numéricas normalizadas, ordenado por DataHora.
+    """
+    # 1) Lê CSV como strings
+    df = pd.read_csv(
+        origem,
+        sep=";",
+        encoding="latin1",
+        dtype=str,
+        na_filter=False
+    )
+    # 2) DataHora
+    df["DataHora"] = pd.to_datetime(
+        df["Data"].str.strip() + ' ' + df["Hora"].str.strip(),
+        format="%d/%m/%Y %H:%M:%S",
+        dayfirst=True,
+        errors="coerce"
+    )
+    # 3) Normaliza colunas numéricas (parser vetorizado, coluna inteira)
+    for c in COLUNAS_CACHE:
+        df[c] = tratar_valores(df[c])
+    # 4) Cria Último e ordena
+    df["Último"] = df["Fechamento"]
+    df = df.sort_values("DataHora").reset_index(drop=True)
+    return df
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Cache binário ao lado do CSV
+# —————————————————————————————————————————————————————————————————————————
+class CacheHistorico:
+    """
+    Cache binário do histórico em '<csv>.cache/':
+
+      - DataHora.i8 (epoch em ns) e uma coluna .f8 por campo numérico,
+        abertos com np.memmap na leitura
+      - meta.json com tamanho/mtime do CSV, bytes já processados e uma
+        assinatura dos últimos bytes processados
+
+    CSV inalterado → só mapeia os arquivos. CSV que apenas cresceu (append
+    do journal) → processa só os bytes novos e anexa às colunas. Qualquer
+    outra mudança → reconstrói tudo. Linhas com DataHora inválida são
+    descartadas.
+    """
+
+    def __init__(self, csv_path: str, pasta: str = None):
+        self.csv_path = csv_path
+        self.pasta    = pasta or csv_path + ".cache"
+        self._meta_fn = os.path.join(self.pasta, "meta.json")
+
+    # ——————————————————————————————————————————————————————————————
+    # Helpers
+    # ——————————————————————————————————————————————————————————————
+    def _arquivo(self, tag: str, ext: str = "f8") -> str:
+        return os.path.join(self.pasta, f"{tag}.{ext}")
+
+    def _le_meta(self) -> dict | None:
+        try:
+            with open(self._meta_fn, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("versao") == VERSAO_CACHE else None
+
+    def _grava_meta(self, meta: dict):
+        tmp = self._meta_fn + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._meta_fn)
+
+    def _assinatura(self, fim: int) -> str:
+        with open(self.csv_path, "rb") as f:
+            ini = max(0, fim - _JANELA_ASSINATURA)
+            f.seek(ini)
+            return hashlib.sha1(f.read(fim - ini)).hexdigest()
+
+    @staticmethod
+    def _para_colunas(df: pd.DataFrame) -> dict:
+        """Converte o DataFrame lido em arrays (descarta DataHora inválida)."""
+        df = df[df["DataHora"].notna()]
+        cols = {"DataHora": df["DataHora"].to_numpy(dtype="datetime64[ns]").view(np.int64)}
+        for c in COLUNAS_CACHE:
+            cols[c] = df[c].to_numpy(dtype=np.float64)
+        return cols
+
+    # ——————————————————————————————————————————————————————————————
+    # Construção / atualização
+    # ——————————————————————————————————————————————————————————————
+    def _reconstruir(self, st: os.stat_result) -> dict:
+        with open(self.csv_path, "rb") as f:
+            dados = f.read()
+        fim = dados.rfind(b"\n") + 1
+        cols = self._para_colunas(le_csv_profit(io.BytesIO(dados[:fim])))
+        n = len(cols["DataHora"])
+
+        os.makedirs(self.pasta, exist_ok=True)
+        cols["DataHora"].astype("<i8").tofile(self._arquivo("DataHora", "i8"))
+        for c, tag in COLUNAS_CACHE.items():
+            cols[c].astype("<f8").tofile(self._arquivo(tag))
+
+        meta = {
+            "versao":     VERSAO_CACHE,
+            "tamanho":    st.st_size,
+            "mtime_ns":   st.st_mtime_ns,
+            "offset":     fim,
+            "assinatura": self._assinatura(fim),
+            "cabecalho":  dados[:dados.find(b"\n") + 1].decode("latin1"),
+            "linhas":     n,
+        }
+        self._grava_meta(meta)
+        return meta
+
+    def _incremental(self, meta: dict, st: os.stat_result) -> dict | None:
+        """Processa só os bytes anexados ao CSV; None se exigir reconstrução."""
+        with open(self.csv_path, "rb") as f:
+            f.seek(meta["offset"])
+            novos = f.read(st.st_size - meta["offset"])
+        fim = novos.rfind(b"\n") + 1
+        meta = dict(meta, tamanho=st.st_size, mtime_ns=st.st_mtime_ns)
+        if fim == 0:
+            # só uma linha parcial foi anexada: nada completo para processar
+            self._grava_meta(meta)
+            return meta
+
+        buf  = io.BytesIO(meta["cabecalho"].encode("latin1") + novos[:fim])
+        cols = self._para_colunas(le_csv_profit(buf))
+        n    = meta["linhas"]
+        if n and len(cols["DataHora"]):
+            ultimo = np.fromfile(self._arquivo("DataHora", "i8"), dtype="<i8",
+                                 offset=(n - 1) * 8, count=1)
+            if cols["DataHora"][0] < ultimo[0]:
+                return None            # fora de ordem: reconstrução completa
+
+        # trunca sobras de um append interrompido e anexa as linhas novas
+        for fn, arr, dtype in [(self._arquivo("DataHora", "i8"), cols["DataHora"], "<i8")] + [
+            (self._arquivo(tag), cols[c], "<f8") for c, tag in COLUNAS_CACHE.items()
+        ]:
+            with open(fn, "r+b") as f:
+                f.truncate(n * 8)
+                f.seek(0, os.SEEK_END)
+                arr.astype(dtype).tofile(f)
+
+        meta["offset"]    += fim
+        meta["assinatura"] = self._assinatura(meta["offset"])
+        meta["linhas"]     = n + len(cols["DataHora"])
+        self._grava_meta(meta)
+        return meta
+
+    # ——————————————————————————————————————————————————————————————
+    # Leitura
+    # ——————————————————————————————————————————————————————————————
+    def _abrir(self, meta: dict) -> pd.DataFrame:
+        n = meta["linhas"]
+
+        def mapa(fn, dtype):
+            if n == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(fn, dtype=dtype, mode="r", shape=(n,))
+
+        dados = {"DataHora": mapa(self._arquivo("DataHora", "i8"), "<i8").view("datetime64[ns]")}
+        for c, tag in COLUNAS_CACHE.items():
+            dados[c] = mapa(self._arquivo(tag), "<f8")
+        dados["Último"] = dados["Fechamento"]
+        return pd.DataFrame(dados, copy=False)
+
+    def carregar(self) -> pd.DataFrame:
+        """
+        Retorna o histórico (DataHora + colunas numéricas + Último) apoiado
+        nos arquivos mapeados, atualizando o cache se o CSV mudou.
+        """
+        st   = os.stat(self.csv_path)
+        meta = self._le_meta()
+        if meta and meta["tamanho"] == st.st_size and meta["mtime_ns"] == st.st_mtime_ns:
+            return self._abrir(meta)
+
+        if meta and st.st_size >= meta["offset"] and meta["offset"] > 0 \
+                and self._assinatura(meta["offset"]) == meta["assinatura"]:
+            try:
+                atual = self._incremental(meta, st)
+                if atual is not None:
+                    return self._abrir(atual)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Aviso] cache incremental falhou, reconstruindo: {e}")
+
+        return self._abrir(self._reconstruir(st))
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: CSV x cache frio x cache quente x cache incremental
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+
+    def linhas_csv(ini, qtd):
+        dh = pd.date_range("2024-01-02 09:00", periods=ini + qtd, freq="min")[ini:]
+        return "".join(
+            f"WINQ25;{d:%d/%m/%Y};{d:%H:%M:%S};130.000,000;130.050,000;"
+            f"129.950,000;130.010,000;1.500.000,000;12.000,000\n"
+            for d in dh
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fn = os.path.join(tmp, "WINQ25_F_0_1min.csv")
+        with open(fn, "w", encoding="latin1", newline="") as f:
+            f.write("Ativo;Data;Hora;Abertura;Máximo;Mínimo;Fechamento;Volume;Quantidade\n")
+            f.write(linhas_csv(0, n))
+
+        cache = CacheHistorico(fn)
+        medidas = []
+        t0 = time.perf_counter(); le_csv_profit(fn)
+        medidas.append(("CSV (le_csv_profit)", time.perf_counter() - t0))
+        t0 = time.perf_counter(); cache.carregar()
+        medidas.append(("cache frio (constrói)", time.perf_counter() - t0))
+        t0 = time.perf_counter(); df = cache.carregar()
+        medidas.append(("cache quente (memmap)", time.perf_counter() - t0))
+        del df
+
+        with open(fn, "a", encoding="latin1", newline="") as f:
+            f.write(linhas_csv(n, 1_000))
+        t0 = time.perf_counter(); df = cache.carregar()
+        medidas.append(("cache incremental (+1000)", time.perf_counter() - t0))
+        assert len(df) == n + 1_000
+        del df
+
+        print(f"{n} linhas")
+        for nome, seg in medidas:
+            print(f"  {nome:<28} {seg * 1e3:>10.1f} ms")
@@ -0,0 +1,230 @@
+# calendario_b3.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CALENDARIO_SOMENTE_SESSAO,
+    CALENDARIO_SESSAO_INICIO,
+    CALENDARIO_SESSAO_FIM,
+    CALENDARIO_ARQUIVO_FERIADOS,
+)
+
+DIA_NS = 86_400 * 1_000_000_000
+
+
+def _hora_ns(hhmm: str) -> int:
+    """'HH:MM' → ns desde a meia-noite."""
+    h, m = (int(x) for x in hhmm.strip().split(":")[:2])
+    return (h * 60 + m) * 60 * 1_000_000_000
+
+
+def carregar_feriados(caminho: str) -> list:
+    """
+    Lê o arquivo de feriados (um dd/mm/aaaa por linha, '#' inicia comentário).
+    Linhas inválidas são avisadas e ignoradas; arquivo ausente → sem feriados.
+    """
+    if not os.path.isfile(caminho):
+        print(f"[Aviso] Arquivo de feriados não encontrado: {caminho}")
+        return []
+    feriados = []
+    with open(caminho, encoding="utf-8") as f:
+        for n, linha in enumerate(f, start=1):
+            texto = linha.split("#", 1)[0].strip()
+            if not texto:
+                continue
+            try:
+                feriados.append(pd.to_datetime(texto, format="%d/%m/%Y").date())
+            except ValueError:
+                print(f"[Aviso] {os.path.basename(caminho)}:{n}: data inválida '{texto}'")
+    return feriados
+
+
+class CalendarioB3:
+    """
+    Pregões da B3: dias úteis (seg-sex fora dos feriados) entre inicio e fim.
+
+    Os horários são os de DataHora (Brasília, sem fuso). Usado pelo
+    agregador e pelo motor de barras para não criar barras de preenchimento
+    fora do pregão: noites, fins de semana e feriados deixam de virar
+    sequências de barras repetidas.
+    """
+
+    def __init__(self, inicio: str = "09:00", fim: str = "18:30", feriados=()):
+        self.inicio = _hora_ns(inicio)
+        self.fim    = _hora_ns(fim)
+        dias = np.array([np.datetime64(d, "D") for d in feriados], dtype="datetime64[D]")
+        self._feriados = np.unique(dias.astype(np.int64))
+
+    def dia_util(self, dias: np.ndarray) -> np.ndarray:
+        """Dias (desde 1970-01-01) com pregão."""
+        dias = np.asarray(dias, dtype=np.int64)
+        util = (dias + 3) % 7 < 5          # 1970-01-01 foi uma quinta-feira
+        if len(self._feriados):
+            util &= ~np.isin(dias, self._feriados)
+        return util
+
+    def mascara(self, rotulos: np.ndarray, passo: int) -> np.ndarray:
+        """
+        Barras (rótulo-passo, rótulo] que cruzam algum pregão (inicio, fim];
+        rótulos em epoch ns, como os das barras closed/label='right'.
+        """
+        rotulos = np.asarray(rotulos, dtype=np.int64)
+        dia = (rotulos - 1) // DIA_NS      # barra de rótulo 00:00 pertence ao dia anterior
+        t   = rotulos - dia * DIA_NS
+        return (t > self.inicio) & (t - passo < self.fim) & self.dia_util(dia)
+
+    def grade(self, ini: int, fim: int, passo: int) -> np.ndarray:
+        """
+        Rótulos de todas as barras de pregão do passo entre ini e fim
+        (inclusive), em ordem: os mesmos de mascara() sobre a grade
+        completa, montados dia a dia sem passar pelas noites.
+        """
+        if DIA_NS % passo:
+            grade = np.arange(-(-ini // passo) * passo, fim + 1, passo, dtype=np.int64)
+            return grade[self.mascara(grade, passo)]
+        _, _, grade = self._grade_dias(ini, fim, passo)
+        return grade[(grade >= ini) & (grade <= fim)]
+
+    def _grade_dias(self, ini: int, fim: int, passo: int) -> tuple:
+        """
+        Para passo que divide o dia: (horários das barras do pregão, pregão
+        de cada dia corrido desde o de ini, grade dos pregões inteiros).
+        """
+        t = np.arange(self.inicio // passo + 1, DIA_NS // passo + 1, dtype=np.int64) * passo
+        t = t[t - passo < self.fim]
+        dias = np.arange((ini - 1) // DIA_NS, (fim - 1) // DIA_NS + 1, dtype=np.int64)
+        util = self.dia_util(dias)
+        return t, util, (dias[util][:, None] * DIA_NS + t[None, :]).ravel()
+
+    def posicoes(self, rotulos: np.ndarray, passo: int) -> tuple:
+        """
+        (grade, pos, fora) de rótulos em ordem, múltiplos do passo: grade()
+        de rotulos[0] a rotulos[-1], a posição de cada rótulo nela e a
+        máscara dos rótulos fora do pregão (que não estão na grade). Com o
+        passo dividindo o dia, a posição sai da aritmética dia/horário em
+        vez de uma busca binária na grade.
+        """
+        rotulos = np.asarray(rotulos, dtype=np.int64)
+        ini, fim = int(rotulos[0]), int(rotulos[-1])
+        if DIA_NS % passo:
+            grade = self.grade(ini, fim, passo)
+            pos   = np.minimum(np.searchsorted(grade, rotulos), max(len(grade) - 1, 0))
+            fora  = grade[pos] != rotulos if len(grade) else np.ones(len(rotulos), bool)
+            return grade, pos, fora
+        t, util, grade = self._grade_dias(ini, fim, passo)
+        a, b = np.searchsorted(grade, ini), np.searchsorted(grade, fim, side="right")
+        # rótulo → (dia corrido, barra do dia) e duas tabelas pequenas: início
+        # do pregão do dia na grade e posição da barra no pregão (negativas
+        # fora do pregão), sem busca por rótulo
+        por_dia  = DIA_NS // passo
+        fora_dia = -(1 << 40)
+        dia, barra = np.divmod(rotulos // passo - 1, por_dia)
+        inicio = np.where(util, (np.cumsum(util) - 1) * len(t) - a, fora_dia)
+        no_dia = np.full(por_dia, fora_dia, dtype=np.int64)
+        no_dia[t // passo - 1] = np.arange(len(t))
+        pos  = inicio[dia - dia[0]] + no_dia[barra]
+        fora = pos < 0
+        return grade[a:b], np.where(fora, 0, pos), fora
+
+    def recuar(self, ts: int, duracao: int) -> int:
+        """
+        Instante a partir do qual há 'duracao' ns de pregão até ts (janela
+        de aquecimento do motor de barras em tempo de pregão).
+        """
+        resta = duracao
+        dia   = ts // DIA_NS
+        for _ in range(3660):
+            if self.dia_util(np.array([dia]))[0]:
+                ini = dia * DIA_NS + self.inicio
+                fim = min(dia * DIA_NS + self.fim, ts)
+                if fim > ini:
+                    if fim - ini >= resta:
+                        return int(fim - resta)
+                    resta -= fim - ini
+            dia -= 1
+        return int(ts - duracao)
+
+
+def calendario_config() -> CalendarioB3 | None:
+    """Calendário do config.ini ([CALENDARIO]); None se SOMENTE_SESSAO = False."""
+    if not CALENDARIO_SOMENTE_SESSAO:
+        return None
+    caminho = CALENDARIO_ARQUIVO_FERIADOS
+    if not caminho:
+        base = os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__))
+        caminho = os.path.join(base, "feriados_b3.txt")
+    return CalendarioB3(CALENDARIO_SESSAO_INICIO, CALENDARIO_SESSAO_FIM, carregar_feriados(caminho))
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Relatório: barras de calendário x barras de pregão nos históricos 1-min
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import glob
+    import time
+    from config import PASTA_HISTORICO
+    from cache_historico import le_csv_profit
+    from agregador_barras import agregar_barras, RULES
+    from barras import MotorBarras
+
+    cal = calendario_config() or CalendarioB3()
+
+    arquivos = sys.argv[1:] or sorted(glob.glob(os.path.join(PASTA_HISTORICO, "*.csv")))
+    historicos = []
+    for fn in arquivos:
+        df = le_csv_profit(fn).dropna(subset=["DataHora"])
+        historicos.append((os.path.basename(fn), df["DataHora"].to_numpy().view(np.int64),
+                           df["Último"].to_numpy(), df["Volume"].to_numpy()))
+    if not historicos:
+        print(f"[Aviso] Nenhum CSV em {PASTA_HISTORICO}: usando um ano sintético de pregões 1-min")
+        rng   = np.random.default_rng(12)
+        datas = pd.bdate_range("2025-01-02", "2025-12-30")
+        datas = datas[cal.dia_util(datas.to_numpy().astype("datetime64[D]").astype(np.int64))]
+        ts = np.concatenate([
+            (d + pd.Timedelta(hours=9) + pd.to_timedelta(np.arange(1, 571), "min")).to_numpy()
+            for d in datas
+        ]).astype("datetime64[ns]").view(np.int64)
+        ts = ts[rng.random(len(ts)) > 0.02]
+        historicos.append(("sintético 2025", ts,
+                           120_000 + np.cumsum(rng.choice([-10.0, -5.0, 0.0, 5.0, 10.0], len(ts))),
+                           rng.uniform(1e5, 5e6, len(ts))))
+
+    def medir(fn, repeticoes=3):
+        melhor = np.inf
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            r = fn()
+            melhor = min(melhor, time.perf_counter() - t0)
+        return r, melhor
+
+    def tamanho(barras):
+        return sum(a.nbytes for b in barras.values() for a in b.values())
+
+    for nome, ts, precos, volumes in historicos:
+        cheio, t_cheio = medir(lambda: agregar_barras(ts, precos, volumes))
+        sessao, t_sessao = medir(lambda: agregar_barras(ts, precos, volumes, calendario=cal))
+        print(f"{nome}: {len(ts)} linhas")
+        for tf in RULES:
+            a, b = len(cheio[tf]["rotulo"]), len(sessao[tf]["rotulo"])
+            print(f"  {tf:>4}: {a:>8} → {b:>8} barras ({100 * (1 - b / max(a, 1)):5.1f}% a menos)")
+        m_cheio, m_sessao = tamanho(cheio), tamanho(sessao)
+        print(f"  memória: {m_cheio / 2**20:7.1f} MB → {m_sessao / 2**20:7.1f} MB | "
+              f"tempo: {t_cheio * 1e3:6.1f} ms → {t_sessao * 1e3:6.1f} ms")
+
+        # o motor tick a tick produz as mesmas barras de pregão
+        n = min(len(ts), 20_000)
+        motor = MotorBarras(max_barras=300, calendario=cal)
+        for i in range(len(ts) - n, len(ts)):
+            motor.tick(int(ts[i]), float(precos[i]))
+        ref = agregar_barras(ts[-n:], precos[-n:], calendario=cal)
+        ok = all(
+            np.array_equal(motor.series[tf].rotulos(), ref[tf]["rotulo"][-300:])
+            and np.array_equal(motor.series[tf].ohlc(),
+                               np.vstack([ref[tf][k][-300:] for k in ("open", "high", "low", "close")]))
+            for tf in RULES
+        )
+        print(f"  paridade motor tick a tick x agregar_barras (últimas {n} linhas): {ok}")
@@ -1,153 +1,208 @@
 #!/usr/bin/env python3
 import os
 import time
-import win32ui              # inicializa MFC para PyWin32
-import dde
 import pandas as pd
 from datetime import datetime
-import pygetwindow as gw
 
 from config import (
     NOME_TELA_PROFIT,
     PASTA_HISTORICO,
     ATIVO_PRINCIPAL,
-    ATIVO_PRINCIPAL_BASE
+    ATIVO_PRINCIPAL_BASE,
+    PERSISTENCIA_HISTORICO,
+    INTERVALO_COMPACTACAO,
+    MAX_LINHAS_MEMORIA,
+    CACHE_HISTORICO,
+    MAX_BARRAS_TIMEFRAME,
+    FEED_TRANSPORTE,
+    FEED_ENDERECO_SIMULADO,
+    FEED_INTERVALO_DDE,
+    FEED_TRABALHADORES_DDE,
+    REPLAY_ARQUIVO,
+    REPLAY_VELOCIDADE,
+    REPLAY_INICIO,
+    ATIVOS_CORRELACAO,
+    VERIFICA_CORRELACAO,
+    MODO_SNIPER,
+    BUFFER_CORRELACAO
 )
+from feed_cotacoes import FeedCotacoes, TransporteDDE, TransporteSocket
+from feed_replay import FeedReplay, carregar_replay
+from poller_ativos import PollerMultiAtivos
+from persistencia_ticks import PersistenciaTicks, COLUNAS_CSV
+from tick_store import TickStore
+from barras import MotorBarras
+from calendario_b3 import calendario_config
+from medias_incrementais import MediasIncrementais
+from agendador import GrafoIndicadores
+from perfil_sniper import PerfilSniper, perfil_ativo, regras_ativas
+from cache_historico import CacheHistorico, le_csv_profit
 
 # —————————————————————————————————————————————————————————————————————————
-# Variáveis globais para servidor e conversa DDE e histórico
+# Variáveis globais para feed de cotações e histórico
 # —————————————————————————————————————————————————————————————————————————
-server       = None
-conversation = None
-_df_ht       = None
+_feed        = None
+_store       = None
 _dt_ant      = None
-
-# Mapeamento de campos DDE → nome legível
-CAMPOS_DDE = {
-    "Data": "DAT",
-    "Hora": "HOR",
-    "Último": "ULT",
-    "Abertura": "ABE",
-    "Máximo": "MAX",
-    "Mínimo": "MIN",
-    "Fechamento Anterior": "FEC",
-    "Variação": "VAR",
-    "Negócios": "NEG",
-    "Quantidade": "QTT",
-    "Volume": "VOL",
-    "Of. Compra": "OCP",
-    "Of. Venda": "OVD",
-}
+_persist     = None
+_poller      = None
+_motor       = None
+_medias      = None
+_grafo       = None
+_perfil      = None
+_faixa       = ([], [])      # (mínimas, máximas) dos ticks novos desde obter_faixa()
+_extremos    = None          # (Máximo, Mínimo) do dia no tick anterior (DDE)
 
 # —————————————————————————————————————————————————————————————————————————
 # Funções de suporte DDE
 # —————————————————————————————————————————————————————————————————————————
 def verificar_profit_aberto() -> bool:
     """Retorna True se a janela do Profit estiver aberta."""
+    import pygetwindow as gw          # só existe no Windows
     return bool(gw.getWindowsWithTitle(NOME_TELA_PROFIT))
 
 
-def tratar_valor_dde(raw: str) -> float:
-    """
-    Limpa formatação do Profit e dos nossos CSVs:
-
-      - Se vier com vírgula (formato europeu: “1.234,56”),
-        remove pontos de milhar e troca vírgula por ponto.
-      - Senão (formato americano: “1234.56”), mantém o ponto decimal.
-    """
-    if not raw or raw.strip() in ("", "--", "-"):
-        return 0.0
-
-    s = raw.strip()
-
-    if ',' in s and s.count(',') >= 1:
-        # vírgula indica decimal, pontos são milhares
-        clean = s.replace('.', '').replace(',', '.')
-    else:
-        # sem vírgula: ponto já é decimal
-        clean = s
-
-    try:
-        return float(clean)
-    except ValueError:
-        return 0.0
-
-
-def _conectar_dde() -> bool:
-    """
-    Inicializa servidor/conversa DDE na primeira chamada.
-    Retorna True se conectar com sucesso.
-    """
-    global server, conversation
-    if conversation is None:
-        try:
-            server = dde.CreateServer()
-            server.Create("ProfitPython")
-            conversation = dde.CreateConversation(server)
-            conversation.ConnectTo("profitchart", "cot")
-            return True
-        except dde.error as e:
-            print(f"[Aviso] DDE indisponível: {e}")
-            return False
-    return True
+def _obter_feed() -> FeedCotacoes | FeedReplay:
+    """Cria o feed de cotações (DDE, simulado ou replay) na primeira chamada."""
+    global _feed
+    if _feed is None:
+        if FEED_TRANSPORTE == "REPLAY":
+            _feed = carregar_replay(
+                ATIVO_PRINCIPAL,
+                REPLAY_ARQUIVO or _caminho_historico(),
+                _caminho_historico(),
+                REPLAY_VELOCIDADE,
+                REPLAY_INICIO
+            )
+            return _feed
+        if FEED_TRANSPORTE == "SIMULADO":
+            host, _, porta = FEED_ENDERECO_SIMULADO.rpartition(":")
+            transporte = TransporteSocket(host or "127.0.0.1", int(porta))
+        else:
+            transporte = TransporteDDE(FEED_INTERVALO_DDE, FEED_TRABALHADORES_DDE)
+        _feed = FeedCotacoes(transporte)
+    return _feed
 
 
 def obter_dados_dde(ativo: str) -> dict | None:
     """
-    Lê cada campo via DDE para o ativo.
-    Retorna dict com valores ou None em caso de erro/Profit fechado.
+    Retorna a última cotação do ativo (dict com os campos de CAMPOS_DDE),
+    lida da tabela em memória do feed — sem round-trips DDE.
+    Na primeira chamada assina o ativo e aguarda a cotação inicial.
+    Retorna None se o Profit estiver fechado ou a cotação ainda incompleta.
     """
     # 1) Verifica Profit aberto
-    if not verificar_profit_aberto():
+    if FEED_TRANSPORTE == "DDE" and not verificar_profit_aberto():
         print("[ERRO] Profit não está aberto.")
         return None
-    # 2) Tenta conectar DDE
-    if not _conectar_dde():
-        return None
+    # 2) Assina (uma vez) e lê a tabela
+    feed = _obter_feed()
+    feed.assinar(ativo, timeout=2.0)
+    return feed.cotacao(ativo)
 
-    tick: dict = {}
-    for nome, tag in CAMPOS_DDE.items():
-        try:
-            raw = conversation.Request(f"{ativo}.{tag}").strip()
-            tick[nome] = raw if nome in ("Data", "Hora") else tratar_valor_dde(raw)
-        except Exception as e:
-            print(f"[ERRO] DDE {ativo} {nome}: {e}")
-            tick[nome] = None
-    return tick
+
+def obter_correlacoes() -> PollerMultiAtivos | None:
+    """
+    Poller do ativo principal + ATIVOS_CORRELACAO (None se VERIFICA_CORRELACAO
+    estiver desligado). Na primeira chamada assina todos os ativos no feed.
+    """
+    global _poller
+    if not VERIFICA_CORRELACAO:
+        return None
+    if _poller is None:
+        _poller = PollerMultiAtivos(
+            _obter_feed(),
+            ATIVO_PRINCIPAL,
+            ATIVOS_CORRELACAO,
+            int(BUFFER_CORRELACAO)
+        )
+        _poller.assinar()
+    return _poller
 
 # —————————————————————————————————————————————————————————————————————————
 # Histórico CSV (1-min) — carrega apenas uma vez
 # —————————————————————————————————————————————————————————————————————————
-def _carrega_historico_csv() -> pd.DataFrame:
-    fn = os.path.join(
+def _caminho_historico() -> str:
+    return os.path.join(
         PASTA_HISTORICO,
         f"{ATIVO_PRINCIPAL_BASE}_F_0_1min.csv"
     )
+
+
+def _persistencia() -> PersistenciaTicks | None:
+    """
+    Retorna o gravador append-only (modo APPEND), iniciando-o na primeira
+    chamada — o que também compacta journals deixados por um crash.
+    """
+    global _persist
+    if PERSISTENCIA_HISTORICO != "APPEND" or FEED_TRANSPORTE == "REPLAY":
+        return None
+    if _persist is None:
+        _persist = PersistenciaTicks(_caminho_historico(), INTERVALO_COMPACTACAO)
+        _persist.iniciar()
+    return _persist
+
+
+def _max_linhas_memoria() -> int:
+    """
+    Limite de linhas do TickStore. No modo REESCRITA o CSV é regravado a
+    partir da memória: com limite, o primeiro tick encolheria o arquivo
+    para a janela, então o histórico fica inteiro em memória.
+    """
+    if MAX_LINHAS_MEMORIA and PERSISTENCIA_HISTORICO != "APPEND" and FEED_TRANSPORTE != "REPLAY":
+        print(f"[Aviso] MAX_LINHAS_MEMORIA = {MAX_LINHAS_MEMORIA} ignorado no modo "
+              f"{PERSISTENCIA_HISTORICO}: o CSV é regravado a partir da memória")
+        return 0
+    return MAX_LINHAS_MEMORIA
+
+
+def encerrar():
+    """Para o feed e descarrega o journal de ticks no CSV (chamar ao finalizar)."""
+    if _feed is not None:
+        _feed.parar()
+    if _persist is not None:
+        _persist.encerrar()
+
+
+def replay_esgotado() -> bool:
+    """True quando o feed é um replay e todas as linhas já foram reproduzidas."""
+    return isinstance(_feed, FeedReplay) and _feed.esgotado
+
+
+def _carrega_historico_csv() -> pd.DataFrame:
+    # replay: o histórico inicial são as linhas anteriores ao início do replay
+    if FEED_TRANSPORTE == "REPLAY":
+        return _obter_feed().historico()
+
+    fn = _caminho_historico()
+    # incorpora ao CSV ticks que ainda estejam só no journal
+    p = _persistencia()
+    if p is not None:
+        p.compactar()
     if not os.path.isfile(fn):
         raise FileNotFoundError(f"Histórico não encontrado: {fn}")
 
-    # 1) Lê CSV como strings
-    df = pd.read_csv(
-        fn,
+    # Cache binário (memmap) ou leitura direta do CSV
+    if CACHE_HISTORICO:
+        return CacheHistorico(fn).carregar()
+    return le_csv_profit(fn)
+
+
+def _regrava_csv():
+    """Modo REESCRITA: regrava o CSV inteiro a partir do _store (O(histórico))."""
+    df2 = _store.frame()
+    df2["Ativo"] = ATIVO_PRINCIPAL_BASE
+    df2["Data"] = df2["DataHora"].dt.strftime("%d/%m/%Y")
+    df2["Hora"] = df2["DataHora"].dt.strftime("%H:%M:%S")
+    df2.to_csv(
+        _caminho_historico(),
         sep=";",
+        index=False,
+        columns=COLUNAS_CSV,
         encoding="latin1",
-        dtype=str,
-        na_filter=False
-    )
-    # 2) DataHora
-    df["DataHora"] = pd.to_datetime(
-        df["Data"].str.strip() + ' ' + df["Hora"].str.strip(),
-        format="%d/%m/%Y %H:%M:%S",
-        dayfirst=True,
-        errors="coerce"
+        decimal=",",
+        float_format="%.3f"
     )
-    # 3) Normaliza colunas numéricas
-    for c in ("Abertura","Máximo","Mínimo","Fechamento","Volume","Quantidade"):
-        df[c] = df[c].apply(tratar_valor_dde)
-    # 4) Cria Último e ordena
-    df["Último"] = df["Fechamento"]
-    df = df.sort_values("DataHora").reset_index(drop=True)
-    return df
 
 # —————————————————————————————————————————————————————————————————————————
 # Função pública usada pelo falcao.py
@@ -157,18 +212,25 @@ def obter_intraday() -> pd.DataFrame | None:
     Retorna DataFrame intraday atualizado e persiste histórico:
       - carrega histórico CSV na primeira chamada
       - anexa novo tick se DataHora for maior
-      - regrava CSV para manter histórico atualizado
+      - grava o tick no journal (APPEND) ou regrava o CSV (REESCRITA)
+
+    O DataFrame é uma visão somente leitura do TickStore (sem cópia),
+    válida até a próxima chamada.
     """
-    global _df_ht, _dt_ant
+    global _store, _dt_ant
     # 1) Carrega histórico inicial
-    if _df_ht is None:
+    if _store is None:
         try:
-            _df_ht = _carrega_historico_csv()
+            store = TickStore(max_linhas=_max_linhas_memoria())
+            store.carregar(_carrega_historico_csv())
+            _store = store
         except Exception as e:
             print(f"[ERRO] falha ao carregar histórico CSV: {e}")
             return None
 
-    # 2) Pega tick DDE
+    # 2) Pega tick DDE (no replay, libera antes a próxima linha)
+    if FEED_TRANSPORTE == "REPLAY":
+        _obter_feed().avancar()
     tick = obter_dados_dde(ATIVO_PRINCIPAL)
     if not tick or tick.get("Último") is None:
         return None
@@ -180,15 +242,21 @@ def obter_intraday() -> pd.DataFrame | None:
             "%d/%m/%Y %H:%M:%S"
         )
     except Exception:
-        return _df_ht.copy()
+        return _store.frame()
 
     # 4) Se em modo replay, reset histórico
     if _dt_ant and dt < _dt_ant:
-        _df_ht = _carrega_historico_csv()
+        _store.carregar(_carrega_historico_csv())
     _dt_ant = dt
 
+    # 4.1) Amostra os ativos de correlação no relógio do ativo principal
+    poller = obter_correlacoes()
+    if poller is not None:
+        poller.coletar(dt)
+
     # 5) Se é novo tick, anexa e persiste
-    if dt > _df_ht["DataHora"].iat[-1]:
+    ultima = _store.ultima_datahora()
+    if ultima is None or dt > ultima:
         nova = {
             "Ativo":      ATIVO_PRINCIPAL_BASE,
             "DataHora":   dt,
@@ -202,30 +270,108 @@ def obter_intraday() -> pd.DataFrame | None:
             "Quantidade": tick["Quantidade"],
             "Último":     tick["Último"]
         }
-        _df_ht = pd.concat([_df_ht, pd.DataFrame([nova])], ignore_index=True)
+        _store.anexar(nova)
+        _acumula_faixa(tick)
 
-        # Persiste de volta no CSV original
-        fn = os.path.join(
-            PASTA_HISTORICO,
-            f"{ATIVO_PRINCIPAL_BASE}_F_0_1min.csv"
-        )
-        df2 = _df_ht.copy()
-        df2["Data"] = df2["DataHora"].dt.strftime("%d/%m/%Y")
-        df2["Hora"] = df2["DataHora"].dt.strftime("%H:%M:%S")
-        cols = [
-            "Ativo","Data","Hora",
-            "Abertura","Máximo","Mínimo",
-            "Fechamento","Volume","Quantidade"
-        ]
-        df2.to_csv(
-            fn,
-            sep=";",
-            index=False,
-            columns=cols,
-            encoding="latin1",
-            decimal=",",
-            float_format="%.3f"
-        )
+        # Persiste apenas a linha nova (ou regrava tudo no modo legado);
+        # o replay nunca grava sobre o histórico
+        p = _persistencia()
+        if p is not None:
+            p.anexar(nova)
+        elif FEED_TRANSPORTE != "REPLAY":
+            _regrava_csv()
+
+    # 6) Retorna visão somente leitura (O(1), sem cópia do histórico)
+    return _store.frame()
+
+
+def _acumula_faixa(tick: dict):
+    """
+    Mínima/máxima de preço desde o tick anterior. No replay cada linha é
+    uma barra 1-min (Mínimo/Máximo dela); no DDE Máximo/Mínimo são do dia,
+    então só contam quando mudaram: o preço foi até lá entre os polls.
+    """
+    global _extremos
+    ult = tick["Último"]
+    lo = hi = ult
+    if FEED_TRANSPORTE == "REPLAY":
+        lo, hi = min(ult, tick["Mínimo"]), max(ult, tick["Máximo"])
+    else:
+        maximo, minimo = tick["Máximo"], tick["Mínimo"]
+        if _extremos is not None:
+            if maximo and maximo > _extremos[0]:
+                hi = max(hi, maximo)
+            if minimo and minimo < _extremos[1]:
+                lo = min(lo, minimo)
+        _extremos = (maximo, minimo)
+    _faixa[0].append(lo)
+    _faixa[1].append(hi)
+
+
+def obter_faixa() -> tuple | None:
+    """
+    (mínimas, máximas) de cada tick anexado desde a chamada anterior, para
+    a avaliação de stop/meta (check_exits): o que foi tocado e voltou entre
+    dois polls, ou durante um travamento do loop, aparece aqui. None se
+    não chegou tick novo.
+    """
+    global _faixa
+    if not _faixa[0]:
+        return None
+    faixa, _faixa = _faixa, ([], [])
+    return faixa
+
+
+def obter_perfil() -> PerfilSniper | None:
+    """
+    Perfil sniper ativo (MODO_SNIPER + PERFIL_INVESTIDOR); None = todos os
+    timeframes. Barras, médias e indicadores só calculam os timeframes dele.
+    """
+    global _perfil
+    if _perfil is None and MODO_SNIPER:
+        _perfil = perfil_ativo()
+    return _perfil
+
+
+def obter_barras() -> MotorBarras | None:
+    """
+    Motor de barras multi-timeframe sincronizado com o histórico em memória
+    (aplica só os ticks novos). Chamar depois de obter_intraday().
+    """
+    global _motor
+    if _store is None:
+        return None
+    if _motor is None:
+        _motor = MotorBarras(regras_ativas(obter_perfil()), MAX_BARRAS_TIMEFRAME, calendario_config())
+    _motor.sincronizar(_store)
+    return _motor
 
-    # 6) Retorna cópia para evitar efeitos colaterais
-    return _df_ht.copy()
+
+def obter_medias() -> MediasIncrementais | None:
+    """
+    EMA21/EMA50 incrementais de cada timeframe, sincronizadas com o
+    histórico em memória. Chamar depois de obter_intraday().
+    """
+    global _medias
+    if _store is None:
+        return None
+    if _medias is None:
+        _medias = MediasIncrementais(regras=list(regras_ativas(obter_perfil()).values()))
+    _medias.sincronizar(_store)
+    return _medias
+
+
+def obter_indicadores() -> GrafoIndicadores | None:
+    """
+    Grafo de indicadores dos painéis (estocástico, tendência, range e
+    médias por timeframe) sobre o motor de barras e as médias incrementais;
+    recalcula só os timeframes que mudaram. Chamar depois de obter_intraday().
+    """
+    global _grafo
+    motor, medias = obter_barras(), obter_medias()
+    if motor is None:
+        return None
+    if _grafo is None:
+        _grafo = GrafoIndicadores(motor, medias, timeframes=list(motor.series))
+    _grafo.atualizar()
+    return _grafo
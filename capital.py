@@ -5,6 +5,7 @@ import colorama
 from datetime import datetime
 
 import indicador_estocastico as ies
+from avaliador_risco import primeira_saida, melhor_preco, STOP
 
 # --------------------------------------------------
 # Parâmetros de gestão de risco
@@ -231,3 +232,33 @@ class CapitalManager:
             return 'close_take_profit'
 
         return None
+
+
+    def update_intervalo(self, minimas, maximas) -> tuple | None:
+        """
+        Como update(), mas sobre todos os ticks desde a última avaliação (ou a
+        mínima/máxima de cada intervalo entre polls): stop ou trailing tocado
+        e recuperado entre polls, ou durante um travamento do loop, não passa
+        em branco. Retorna (código de update(), preço da saída) ou None.
+        """
+        if not self.active:
+            return None
+
+        lado  = 'COMPRA' if self.position == 'long' else 'VENDA'
+        sinal = 1 if self.position == 'long' else -1
+        alvo  = self.entry_price + sinal * TAKE_PROFIT_PONTOS
+        pico  = self.trailing_stop + sinal * DISTANCIA_TRAILING_STOP if self.trailing_active else None
+
+        saida = primeira_saida(minimas, maximas, lado, self.stop_loss, alvo, DISTANCIA_TRAILING_STOP, pico)
+        if saida is not None:
+            _, motivo, preco = saida
+            return ('close_stop_loss' if motivo == STOP else 'close_trailing_stop'), preco
+
+        # sem saída: o trailing anda até o melhor preço do lote
+        pico = melhor_preco(minimas, maximas, lado, pico)
+        if pico is not None and sinal * (pico - alvo) >= 0:
+            self.trailing_active = True
+            novo_ts = pico - sinal * DISTANCIA_TRAILING_STOP
+            if sinal * (novo_ts - self.trailing_stop) > 0:
+                self.trailing_stop = novo_ts
+        return None
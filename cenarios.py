@@ -0,0 +1,402 @@
+# cenarios.py
+
+import os
+import threading
+import unicodedata
+
+import pandas as pd
+
+from indicador_medias import PERIODOS
+
+# timeframes na ordem de PERIODOS ('1M', '5M', ...) = colunas da aba CENARIOS
+TFS = [tf.strip().upper() for tf in PERIODOS]
+
+# estados de tendência que o estocástico produz
+ESTADOS = ('ALTA', 'BAIXA', 'LATERAL', 'SOBRECOMPRADO', 'SOBREVENDIDO')
+
+# células que casam com qualquer tendência; coluna opcional de prioridade
+CURINGAS   = ('', '*')
+PRIORIDADE = 'PRIORIDADE'
+
+# no máximo tantos avisos por carga (o resto vira "... e mais N")
+MAX_AVISOS = 10
+
+_AUSENTE = object()
+
+
+def normalize_header(name: str) -> str:
+    if not isinstance(name, str):
+        return ''
+    s = unicodedata.normalize('NFD', name.strip().upper())
+    return ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
+
+
+class TabelaCenarios:
+    """
+    Aba CENARIOS compilada uma vez numa tabela de decisão:
+
+      - célula de timeframe vazia ou '*' casa com qualquer tendência, então
+        uma linha cobre várias combinações (não precisa de uma linha por
+        combinação dos 5 timeframes)
+      - coluna opcional PRIORIDADE (número, vazia = 0): entre as linhas que
+        casam, vence a de maior prioridade; empate → a primeira da aba
+      - sem linha que case, devolve a linha 0 (ou Series vazia)
+      - só os timeframes presentes em trends são comparados (modo sniper)
+
+    Cada (timeframe, estado) vira um bitset (int) das linhas que o aceitam,
+    com os bits na ordem de precedência: a busca é o AND dos bitsets das
+    tendências e o bit mais baixo é a linha vencedora. Na compilação, as
+    linhas que nunca vencem (cobertas por outras) e as que se sobrepõem a
+    outra de mesma prioridade (decididas só pela ordem) vão para 'avisos'.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        valores = df.to_numpy(dtype=object)
+        celulas = {
+            tf: [normalize_header(str(c)) for c in df[tf]] if tf in df.columns else [''] * len(df)
+            for tf in TFS
+        }
+        prioridades = self._prioridades(df)
+        # linhas totalmente vazias (fim da aba no Excel) não são regras
+        regras = [i for i in range(len(df)) if any(str(v).strip() for v in valores[i])]
+        self._ordem = sorted(regras, key=lambda i: (-prioridades[i], i))   # bit → linha
+
+        self._curingas = dict.fromkeys(TFS, 0)     # tf → linhas com curinga no tf
+        self._mascaras = {tf: {} for tf in TFS}    # tf → estado → linhas que o aceitam
+        for b, i in enumerate(self._ordem):
+            for tf in TFS:
+                estado = celulas[tf][i]
+                if estado in CURINGAS:
+                    self._curingas[tf] |= 1 << b
+                else:
+                    self._mascaras[tf][estado] = self._mascaras[tf].get(estado, 0) | 1 << b
+        for tf in TFS:
+            for estado in self._mascaras[tf]:
+                self._mascaras[tf][estado] |= self._curingas[tf]
+        self._todas = (1 << len(self._ordem)) - 1
+
+        self._textos = {}    # texto cru da tendência → estado normalizado
+        self._memo   = {}    # tendências → linha (-1 = nenhuma)
+        self._linhas = {}
+        self.avisos  = self._analisar(celulas, prioridades)
+
+    @staticmethod
+    def _prioridades(df: pd.DataFrame) -> list:
+        coluna = next((c for c in df.columns if normalize_header(str(c)) == PRIORIDADE), None)
+        if coluna is None:
+            return [0.0] * len(df)
+        prioridades = []
+        for n, v in enumerate(df[coluna], start=2):
+            try:
+                prioridades.append(float(v) if str(v).strip() else 0.0)
+            except ValueError:
+                print(f"[Aviso] CENARIOS linha {n}: PRIORIDADE inválida '{v}', usando 0")
+                prioridades.append(0.0)
+        return prioridades
+
+    def _mascara(self, tf: str, valor) -> int:
+        estado = self._textos.get(valor)
+        if estado is None:
+            estado = self._textos[valor] = normalize_header(valor or '')
+        # tendência que nenhuma linha cita explicitamente só casa com curingas
+        return self._mascaras[tf].get(estado, self._curingas[tf])
+
+    def _resolver(self, chave: tuple) -> int:
+        m = self._todas
+        for tf, valor in zip(TFS, chave):
+            if valor is not _AUSENTE:
+                m &= self._mascara(tf, valor)
+                if not m:
+                    return -1
+        return self._ordem[(m & -m).bit_length() - 1]
+
+    def linha(self, i: int) -> pd.Series:
+        s = self._linhas.get(i)
+        if s is None:
+            s = self._linhas[i] = self.df.iloc[i]
+        return s
+
+    def buscar(self, trends: dict) -> pd.Series:
+        """Linha vencedora para as tendências; senão a linha 0."""
+        chave = tuple(trends.get(tf, _AUSENTE) for tf in TFS)
+        i = self._memo.get(chave)
+        if i is None:
+            i = self._memo[chave] = self._resolver(chave)
+        if i < 0:
+            return self.linha(0) if len(self.df) else pd.Series(dtype=object)
+        return self.linha(i)
+
+    # ——————————————————————————————————————————————————————————————
+    # Análise das regras (na compilação)
+    # ——————————————————————————————————————————————————————————————
+    def _nome(self, i: int) -> str:
+        codigo = str(self.df['CODIGO'].iloc[i]).strip() if 'CODIGO' in self.df.columns else ''
+        return f"linha {i + 2}" + (f" ({codigo})" if codigo else '')
+
+    def _analisar(self, celulas: dict, prioridades: list) -> list:
+        # linhas que vencem em alguma combinação de tendências (todos os
+        # timeframes presentes; estados fora da aba = só curingas)
+        opcoes = [list(self._mascaras[tf].values()) + [self._curingas[tf]] for tf in TFS]
+        vencem = 0
+
+        def descer(nivel: int, m: int):
+            nonlocal vencem
+            if not m & ~vencem:        # nenhuma linha nova pode vencer aqui
+                return
+            if nivel == len(TFS):
+                vencem |= m & -m
+                return
+            for op in opcoes[nivel]:
+                descer(nivel + 1, m & op)
+
+        descer(0, self._todas)
+
+        mesma = {}                     # prioridade → linhas com ela
+        for b, i in enumerate(self._ordem):
+            mesma[prioridades[i]] = mesma.get(prioridades[i], 0) | 1 << b
+
+        avisos = []
+        for b, i in enumerate(self._ordem):
+            # linhas que casam com alguma combinação que a linha i também casa
+            compat = self._todas
+            for tf in TFS:
+                if celulas[tf][i] not in CURINGAS:
+                    compat &= self._mascaras[tf][celulas[tf][i]]
+            antes = compat & ((1 << b) - 1)
+            if not vencem >> b & 1:
+                outra = self._ordem[(antes & -antes).bit_length() - 1]
+                avisos.append(f"{self._nome(i)} nunca é usada: coberta por {self._nome(outra)}"
+                              + (" e outras" if antes & (antes - 1) else ''))
+                continue
+            empate = antes & mesma[prioridades[i]]
+            if empate:
+                outra = self._ordem[(empate & -empate).bit_length() - 1]
+                avisos.append(f"{self._nome(i)} se sobrepõe à {self._nome(outra)} com a mesma "
+                              f"prioridade: nas combinações em comum vence a {self._nome(outra)}")
+        return avisos
+
+    def avisar(self, origem: str = 'CENARIOS'):
+        """Imprime os avisos da análise (até MAX_AVISOS)."""
+        for texto in self.avisos[:MAX_AVISOS]:
+            print(f"[Aviso] {origem}: {texto}")
+        if len(self.avisos) > MAX_AVISOS:
+            print(f"[Aviso] {origem}: ... e mais {len(self.avisos) - MAX_AVISOS} avisos")
+
+
+class CacheCenarios:
+    """
+    Tabela de cenários compilada a partir da planilha, recarregada só quando
+    o mtime ou o tamanho do arquivo mudam.
+
+      - a 1ª carga é síncrona (iniciar); depois uma thread de fundo confere
+        os.stat a cada 'intervalo' segundos e, se mudou, lê a aba com o
+        leitor (load_scenarios), compila e troca a referência de uma vez
+      - tabela() só lê essa referência: o loop nunca abre a planilha nem
+        espera uma recarga (vê a tabela antiga até a nova ficar pronta)
+      - só relê quando a assinatura nova se repete em dois ciclos seguidos
+        (não pega o arquivo no meio de um salvamento); falha na leitura
+        (planilha travada no Excel) mantém a tabela atual e tenta de novo
+    """
+
+    def __init__(self, caminho: str, leitor, intervalo: float = 1.0):
+        self.caminho   = caminho
+        self.leitor    = leitor
+        self.intervalo = intervalo
+        self.recargas  = 0
+        self._atual    = None
+        self._marca    = None
+        self._nova     = None      # assinatura vista no ciclo anterior, ainda não lida
+        self._parar    = threading.Event()
+        self._thread   = None
+
+    def _assinatura(self) -> tuple | None:
+        try:
+            st = os.stat(self.caminho)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def recarregar(self) -> bool:
+        """Relê a planilha se mudou; retorna True se trocou a tabela."""
+        marca = self._assinatura()
+        if marca is None or marca == self._marca:
+            return False
+        if marca != self._nova:
+            self._nova = marca         # espera o arquivo parar de mudar
+            return False
+        try:
+            tabela = TabelaCenarios(self.leitor(self.caminho))
+        except Exception as e:
+            print(f"[Aviso] recarga dos cenários adiada ({self.caminho}): {e}")
+            return False
+        tabela.avisar(os.path.basename(self.caminho))
+        # combinações que o loop já buscou ficam resolvidas antes da troca
+        for chave in list(self._atual._memo if self._atual else ()):
+            tabela._memo[chave] = tabela._resolver(chave)
+        self._atual = tabela       # troca atômica: leitores veem a antiga ou a nova
+        self._marca = marca
+        self.recargas += 1
+        return True
+
+    def tabela(self) -> TabelaCenarios:
+        if self._atual is None:
+            self.iniciar()
+        return self._atual
+
+    # ——————————————————————————————————————————————————————————————
+    # Ciclo de vida
+    # ——————————————————————————————————————————————————————————————
+    def iniciar(self):
+        """Primeira carga (síncrona) e thread de recarga."""
+        if self._atual is None:
+            self._atual = TabelaCenarios(self.leitor(self.caminho))
+            self._marca = self._assinatura()
+            self._atual.avisar(os.path.basename(self.caminho))
+        if self._thread is None and self.intervalo > 0:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="recarga-cenarios", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.recarregar()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Paridade com o iterrows anterior / com a busca regra a regra + custo por busca
+# —————————————————————————————————————————————————————————————————————————
+def _busca_iterrows(df: pd.DataFrame, trends: dict) -> pd.Series:
+    for _, row in df.iterrows():
+        if all(
+            normalize_header(str(row.get(tf, ''))) == normalize_header(trends.get(tf, ''))
+            for tf in TFS
+        ):
+            return row
+    return df.iloc[0] if not df.empty else pd.Series()
+
+
+def _busca_regras(df: pd.DataFrame, trends: dict) -> pd.Series:
+    melhor = None
+    for i, row in df.iterrows():
+        if all(
+            normalize_header(str(row.get(tf, ''))) in CURINGAS + (normalize_header(trends[tf]),)
+            for tf in TFS if tf in trends
+        ):
+            chave = (-float(row.get(PRIORIDADE) or 0), i)
+            melhor = min(melhor or chave, chave)
+    return df.iloc[melhor[1]] if melhor else df.iloc[0]
+
+
+if __name__ == '__main__':
+    import itertools
+    import time
+    import numpy as np
+
+    rng = np.random.default_rng(15)
+    # aba antiga: uma linha por combinação exata (1/4 das 5^5), grafias
+    # variadas e linhas repetidas
+    combos = [c for c in itertools.product(ESTADOS, repeat=len(TFS)) if rng.random() < 0.25]
+    combos += [combos[i] for i in rng.integers(0, len(combos), 50)]
+    grafia = {'ALTA': ['ALTA', 'alta', ' Alta '], 'BAIXA': ['BAIXA', 'baixa'], 'LATERAL': ['LATERAL'],
+              'SOBRECOMPRADO': ['SOBRECOMPRADO'], 'SOBREVENDIDO': ['SOBREVENDIDO', 'sobrevendido']}
+    df = pd.DataFrame([[grafia[e][rng.integers(len(grafia[e]))] for e in c] for c in combos], columns=TFS)
+    df['CODIGO']  = [f"C{i:04d}" for i in range(len(df))]
+    df['DECISAO'] = rng.choice(['COMPRA', 'VENDA', 'AGUARDA'], len(df))
+
+    consultas = [dict(zip(TFS, rng.choice(ESTADOS, len(TFS)))) for _ in range(300)]
+
+    t0 = time.perf_counter()
+    tabela = TabelaCenarios(df)
+    t_compila = time.perf_counter() - t0
+
+    ok = True
+    t_ref = t_nov = 0.0
+    for trends in consultas:
+        t0 = time.perf_counter(); a = _busca_iterrows(df, trends); t_ref += time.perf_counter() - t0
+        t0 = time.perf_counter(); b = tabela.buscar(trends);       t_nov += time.perf_counter() - t0
+        ok &= a.equals(b) and a.name == b.name
+    n = len(consultas)
+    print(f"{len(df)} cenários exatos | compilação + análise: {t_compila * 1e3:.1f} ms | paridade={ok} | "
+          f"{len(tabela.avisos)} avisos (linhas repetidas)")
+    print(f"iterrows: {t_ref / n * 1e3:8.2f} ms/busca | tabela: {t_nov / n * 1e6:6.1f} us/busca")
+
+    # aba compacta: curingas + prioridade, expandida de volta em combinações
+    # exatas para conferir que decide igual
+    regras = pd.DataFrame(
+        [[e if rng.random() < 0.35 else rng.choice(['', '*']) for e in rng.choice(ESTADOS, len(TFS))]
+         for _ in range(40)], columns=TFS)
+    regras['PRIORIDADE'] = rng.choice(['', '1', '2'], len(regras))
+    regras['CODIGO']     = [f"R{i:02d}" for i in range(len(regras))]
+    regras['DECISAO']    = rng.choice(['COMPRA', 'VENDA', 'AGUARDA'], len(regras))
+    compacta = TabelaCenarios(regras)
+    compacta.avisar('compacta')
+
+    todas = [dict(zip(TFS, c)) for c in itertools.product(ESTADOS, repeat=len(TFS))]
+    ok = all(_busca_regras(regras, t).name == compacta.buscar(t).name for t in todas[::7])
+    sniper = [{tf: t[tf] for tf in ('5M', '15M')} for t in todas[:200]]
+    ok &= all(_busca_regras(regras, t).name == compacta.buscar(t).name for t in sniper)
+    exata = pd.DataFrame([dict(t, CODIGO=compacta.buscar(t)['CODIGO']) for t in todas])
+    expandida = TabelaCenarios(exata)
+    ok &= all(expandida.buscar(t)['CODIGO'] == compacta.buscar(t)['CODIGO'] for t in todas)
+
+    compacta._memo.clear()
+    t0 = time.perf_counter()
+    for t in todas:
+        compacta.buscar(t)
+    t_frio = (time.perf_counter() - t0) / len(todas)
+    t0 = time.perf_counter()
+    for t in todas:
+        compacta.buscar(t)
+    t_memo = (time.perf_counter() - t0) / len(todas)
+    print(f"{len(regras)} regras com curinga = {len(exata)} linhas exatas | paridade={ok} | "
+          f"{len(compacta.avisos)} avisos | busca: {t_frio * 1e6:.1f} us (1ª vez), {t_memo * 1e6:.1f} us (memo)")
+
+    # planilha real: load_scenarios a cada tick x cache com recarga em fundo,
+    # com a planilha regravada (edição do trader) no meio do loop
+    import tempfile
+    from falcao_panel import load_scenarios
+
+    df = df[~df[TFS].apply(lambda c: c.map(normalize_header)).duplicated()]   # sem os avisos das repetidas
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, "FALCAO.xlsx")
+        with pd.ExcelWriter(xlsx, engine="openpyxl") as w:
+            df.to_excel(w, sheet_name="CENARIOS", index=False)
+
+        t0 = time.perf_counter()
+        for trends in consultas[:5]:
+            TabelaCenarios(load_scenarios(xlsx)).buscar(trends)
+        t_xlsx = (time.perf_counter() - t0) / 5
+
+        cache = CacheCenarios(xlsx, load_scenarios, intervalo=0.05)
+        cache.iniciar()
+
+        def editar():
+            time.sleep(0.5)
+            df2 = df.copy()
+            df2['DECISAO'] = 'AGUARDA'
+            with pd.ExcelWriter(xlsx, engine="openpyxl") as w:
+                df2.to_excel(w, sheet_name="CENARIOS", index=False)
+        threading.Thread(target=editar, daemon=True).start()
+
+        latencias = []
+        fim = time.perf_counter() + 3.0
+        i = 0
+        while time.perf_counter() < fim:
+            t0 = time.perf_counter()
+            sce = cache.tabela().buscar(consultas[i % len(consultas)])
+            latencias.append(time.perf_counter() - t0)
+            i += 1
+            time.sleep(0.001)
+        cache.encerrar()
+        lat = np.array(latencias) * 1e6
+        print(f"load_scenarios + busca por tick: {t_xlsx * 1e3:.0f} ms | cache: mediana {np.median(lat):.1f} us, "
+              f"p99 {np.percentile(lat, 99):.1f} us, máx {lat.max():.0f} us em {len(lat)} ticks | "
+              f"recargas={cache.recargas} | nova tabela em uso={sce['DECISAO'] == 'AGUARDA'}")
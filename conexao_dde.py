@@ -4,6 +4,7 @@ import win32ui              # deve ser importado antes do dde
 import dde
 import pygetwindow as gw
 from config import NOME_TELA_PROFIT, ATIVO_PRINCIPAL, ATIVOS_CORRELACAO
+from valores_profit import tratar_valor_cotacao
 
 # Variáveis globais para servidor e conversa DDE
 server = None
@@ -31,12 +32,8 @@ def _profit_aberto() -> bool:
     return bool(gw.getWindowsWithTitle(NOME_TELA_PROFIT))
 
 def _tratar_valor_dde(valor: str) -> float:
-    """Remove formatação do Profit e converte para float."""
-    if not valor or valor.strip() in ("", "--", "-"):
-        return 0.0
-    if "/" in valor:
-        valor = valor.split("/")[0].strip()
-    return float(valor.replace(".", "").replace(",", "."))
+    """Remove formatação do Profit e converte para float (ponto de milhar, vírgula decimal)."""
+    return tratar_valor_cotacao(valor)
 
 def _conectar_dde() -> bool:
     """
@@ -42,11 +42,53 @@ PASTA_HISTORICO = _cfg.get('PASTAS', 'PASTA_HISTORICO')
 PASTA_CENARIO   = _cfg.get('PASTAS', 'PASTA_CENARIO')
 PASTA_LOGS      = _cfg.get('PASTAS', 'PASTA_LOGS')
 
+# ┌── Seção HISTORICO ─────────────────────────────────────────────────────────
+PERSISTENCIA_HISTORICO = _cfg.get('HISTORICO', 'PERSISTENCIA_HISTORICO', fallback='APPEND').strip().upper()
+INTERVALO_COMPACTACAO  = _cfg.getfloat('HISTORICO', 'INTERVALO_COMPACTACAO', fallback=30.0)
+MAX_LINHAS_MEMORIA     = _cfg.getint('HISTORICO', 'MAX_LINHAS_MEMORIA', fallback=0)
+CACHE_HISTORICO        = _cfg.getboolean('HISTORICO', 'CACHE_HISTORICO', fallback=True)
+MAX_BARRAS_TIMEFRAME   = _cfg.getint('HISTORICO', 'MAX_BARRAS_TIMEFRAME', fallback=1000)
+
+# ┌── Seção CALENDARIO ────────────────────────────────────────────────────────
+CALENDARIO_SOMENTE_SESSAO   = _cfg.getboolean('CALENDARIO', 'SOMENTE_SESSAO', fallback=True)
+CALENDARIO_SESSAO_INICIO    = _cfg.get('CALENDARIO', 'SESSAO_INICIO', fallback='09:00').strip()
+CALENDARIO_SESSAO_FIM       = _cfg.get('CALENDARIO', 'SESSAO_FIM', fallback='18:30').strip()
+CALENDARIO_ARQUIVO_FERIADOS = _cfg.get('CALENDARIO', 'ARQUIVO_FERIADOS', fallback='').strip()
+
+# ┌── Seção FEED ──────────────────────────────────────────────────────────────
+FEED_TRANSPORTE        = _cfg.get('FEED', 'TRANSPORTE', fallback='DDE').strip().upper()
+FEED_ENDERECO_SIMULADO = _cfg.get('FEED', 'ENDERECO_SIMULADO', fallback='127.0.0.1:12001').strip()
+FEED_INTERVALO_DDE     = _cfg.getfloat('FEED', 'INTERVALO_DDE', fallback=0.05)
+FEED_TRABALHADORES_DDE = _cfg.getint('FEED', 'TRABALHADORES_DDE', fallback=6)
+REPLAY_ARQUIVO         = _cfg.get('FEED', 'REPLAY_ARQUIVO', fallback='').strip()
+REPLAY_VELOCIDADE      = _cfg.getfloat('FEED', 'REPLAY_VELOCIDADE', fallback=0.0)
+REPLAY_INICIO          = _cfg.get('FEED', 'REPLAY_INICIO', fallback='').strip()
+
 # ┌── Seção TRADE ────────────────────────────────────────────────────────────
 ENVIAR_ORDENS = _cfg.getboolean('TRADE', 'ENVIAR_ORDENS', fallback=True)
+BACKEND_ORDENS   = _cfg.get('TRADE', 'BACKEND_ORDENS', fallback='HOTKEY').split('#', 1)[0].strip().upper()
+INTERVALO_HOTKEY = _cfg.getfloat('TRADE', 'INTERVALO_HOTKEY', fallback=0.5)
 
 # ┌── Seção ARQUIVOS ──────────────────────────────────────────────────────────
 FALCAO_EXCEL_PATH = _cfg.get('ARQUIVOS', 'FALCAO_EXCEL_PATH')
+CENARIOS_INTERVALO_RECARGA = _cfg.getfloat('ARQUIVOS', 'INTERVALO_RECARGA_CENARIOS', fallback=1.0)
+CARTEIRA_RETENTATIVA       = _cfg.getfloat('ARQUIVOS', 'RETENTATIVA_GRAVACAO_CARTEIRA', fallback=2.0)
+
+# ┌── Seção SIMULADOR ─────────────────────────────────────────────────────────
+SIMULADOR_LATENCIA_MS   = _cfg.getfloat('SIMULADOR', 'LATENCIA_MS', fallback=50.0)
+SIMULADOR_DESLIZE_TICKS = _cfg.getfloat('SIMULADOR', 'DESLIZE_TICKS', fallback=0.0)
+SIMULADOR_TAMANHO_TICK  = _cfg.getfloat('SIMULADOR', 'TAMANHO_TICK', fallback=5.0)
+SIMULADOR_LIQUIDEZ      = _cfg.getint('SIMULADOR', 'LIQUIDEZ_POR_TICK', fallback=0)
+SIMULADOR_ESPERA_MAX    = _cfg.getfloat('SIMULADOR', 'ESPERA_MAX', fallback=30.0)
+
+# ┌── Seção OPERACOES ─────────────────────────────────────────────────────────
+OPERACOES_BANCO = _cfg.get('OPERACOES', 'BANCO_OPERACOES', fallback='').strip()
+OPERACOES_LOTE  = _cfg.getint('OPERACOES', 'LOTE_COMMIT', fallback=1)
+
+# ┌── Seção BACKTEST ──────────────────────────────────────────────────────────
+BACKTEST_PROCESSOS   = _cfg.getint('BACKTEST', 'PROCESSOS', fallback=0)
+BACKTEST_DIAS_TAREFA = _cfg.getint('BACKTEST', 'DIAS_POR_TAREFA', fallback=20)
+BACKTEST_AQUECIMENTO = _cfg.getint('BACKTEST', 'BARRAS_AQUECIMENTO', fallback=50)
 
 # ┌── Seção ATIVOS ────────────────────────────────────────────────────────────
 # Usamos o conf ATIVO_PRINCIPAL ou, se faltar, ATIVO_PRINCIPAL_BASE
@@ -58,6 +100,8 @@ ATIVO_PRINCIPAL = f"{PREFIXO_REPLAY}{base}"
 ATIVO_PRINCIPAL_BASE = _cfg.get('ATIVOS', 'ATIVO_PRINCIPAL_BASE')
 ATIVOS_CORRELACAO_BASE = [s.strip() for s in _cfg.get('ATIVOS', 'ATIVOS_CORRELACAO_BASE').split(',')]
 ATIVOS_CORRELACAO_INVERSA = [s.strip() for s in _cfg.get('ATIVOS', 'ATIVOS_CORRELACAO_INVERSA').split(',')]
+# Todos os ativos de correlação (diretos + inversos), já com o prefixo de replay
+ATIVOS_CORRELACAO = [f"{PREFIXO_REPLAY}{a}" for a in ATIVOS_CORRELACAO_BASE + ATIVOS_CORRELACAO_INVERSA if a]
 
 # ┌── Seção MODO ─────────────────────────────────────────────────────────────
 MODO_OPERACAO = _cfg.get('MODO', 'MODO_OPERACAO')
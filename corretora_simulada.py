@@ -0,0 +1,187 @@
+# corretora_simulada.py
+
+import threading
+
+from config import (
+    SIMULADOR_LATENCIA_MS,
+    SIMULADOR_DESLIZE_TICKS,
+    SIMULADOR_TAMANHO_TICK,
+    SIMULADOR_LIQUIDEZ,
+    SIMULADOR_ESPERA_MAX,
+)
+
+_MS = 1_000_000
+
+
+class CorretoraSimulada:
+    """
+    Corretora de papel que executa as ordens contra o mesmo fluxo de ticks
+    do robô (tick(ts, preço), chamado pelo loop ou pelo replay):
+
+      - latência: a ordem só chega ao "livro" 'latencia_ms' depois do
+        último tick visto quando foi submetida (o relógio é o dos ticks,
+        então vale igual em tempo real e em replay acelerado); o atraso do
+        loop e da fila do despachante já entra aí, porque a submissão
+        acontece depois da decisão
+      - deslize: executa no primeiro tick após a chegada, 'deslize_ticks'
+        ticks de 'tamanho_tick' pontos contra a ordem (WIN: 5 pontos)
+      - execução parcial: no máximo 'liquidez' contratos por tick (0 =
+        sem limite); o resto fica para os ticks seguintes
+      - posição líquida, execuções e o deslize de cada ordem em relação
+        ao preço da decisão (ordem.preco_ref) ficam registrados
+
+    Como backend do DespachanteOrdens (BACKEND_ORDENS = SIMULADO), enviar()
+    bloqueia a thread do despachante até a ordem ser executada (ou
+    'espera_max' segundos sem ticks) e preenche executadas/preco_medio.
+    """
+
+    nome = 'SIMULADO'
+    informa_preco = True           # a sessão usa o preço executado no P&L
+
+    def __init__(self, latencia_ms: float = SIMULADOR_LATENCIA_MS,
+                 deslize_ticks: float = SIMULADOR_DESLIZE_TICKS,
+                 tamanho_tick: float = SIMULADOR_TAMANHO_TICK,
+                 liquidez: int = SIMULADOR_LIQUIDEZ,
+                 espera_max: float = SIMULADOR_ESPERA_MAX):
+        self.latencia_ns  = int(latencia_ms * _MS)
+        self.deslize      = deslize_ticks * tamanho_tick
+        self.tamanho_tick = tamanho_tick
+        self.liquidez     = int(liquidez)
+        self.espera_max   = espera_max
+        self.posicao      = 0
+        self.execucoes    = []     # (id, ts, lado, quantidade, preço)
+        self.resultados   = []     # (id, lado, quantidade, deslize em pontos, atraso ns)
+        self.ultimo_ts    = None
+        self.ultimo_preco = None
+        self.parciais     = 0      # ordens executadas em mais de um tick
+        self._livro       = []     # [ordem, chegada_ns, evento, ts_ref, soma px*qtd], por chegada
+        self._lock        = threading.Lock()
+
+    # ——————————————————————————————————————————————————————————————
+    # Ordens
+    # ——————————————————————————————————————————————————————————————
+    def submeter(self, ordem, ts_ref: int | None = None) -> threading.Event:
+        """
+        Põe a ordem no livro sem esperar. ts_ref é o instante da decisão
+        (padrão: último tick); o evento é sinalizado quando ela termina.
+        """
+        evento = threading.Event()
+        with self._lock:
+            if ordem.lado == 'ZERAR':
+                ordem.lado = 'VENDA' if self.posicao > 0 else 'COMPRA'
+                ordem.quantidade = abs(self.posicao)
+            if ordem.quantidade <= 0:
+                evento.set()
+                return evento
+            base = self.ultimo_ts if self.ultimo_ts is not None else 0
+            ts_ref = ts_ref if ts_ref is not None else base
+            self._livro.append([ordem, base + self.latencia_ns, evento, ts_ref, 0.0])
+        return evento
+
+    def enviar(self, ordem):
+        """Backend do despachante: submete e espera a execução."""
+        evento = self.submeter(ordem)
+        if not evento.wait(self.espera_max):
+            self.cancelar(ordem)
+            ordem.erro = f"sem execução em {self.espera_max:.0f} s (sem ticks?)"
+
+    def cancelar(self, ordem):
+        with self._lock:
+            self._livro = [item for item in self._livro if item[0] is not ordem]
+
+    # ——————————————————————————————————————————————————————————————
+    # Fluxo de ticks
+    # ——————————————————————————————————————————————————————————————
+    def tick(self, ts: int, preco: float):
+        """Novo tick: executa as ordens que já chegaram ao livro."""
+        with self._lock:
+            self.ultimo_ts, self.ultimo_preco = int(ts), float(preco)
+            if not self._livro:
+                return
+            resta = self.liquidez or None
+            concluidas = []
+            for item in self._livro:
+                ordem, chegada, _, ts_ref, soma = item
+                if chegada > ts or resta == 0:
+                    continue
+                falta = ordem.quantidade - ordem.executadas
+                qtd = falta if resta is None else min(falta, resta)
+                if resta is not None:
+                    resta -= qtd
+                if qtd < falta and not ordem.executadas:
+                    self.parciais += 1
+                sinal = 1 if ordem.lado == 'COMPRA' else -1
+                px = preco + sinal * self.deslize
+                item[4] = soma = soma + qtd * px
+                ordem.executadas += qtd
+                ordem.preco_medio = soma / ordem.executadas
+                self.posicao += sinal * qtd
+                self.execucoes.append((ordem.id, ts, ordem.lado, qtd, px))
+                if ordem.executadas >= ordem.quantidade:
+                    deslize = sinal * (ordem.preco_medio - ordem.preco_ref)
+                    self.resultados.append((ordem.id, ordem.lado, ordem.quantidade, deslize, ts - ts_ref))
+                    concluidas.append(item)
+            for item in concluidas:
+                self._livro.remove(item)
+                item[2].set()
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._livro)
+
+    def relatorio(self) -> dict:
+        """Deslize médio (pontos e ticks) e atraso médio da decisão à execução (ms)."""
+        if not self.resultados:
+            return {'ordens': 0}
+        n = len(self.resultados)
+        deslize = sum(r[3] for r in self.resultados) / n
+        return {
+            'ordens':         n,
+            'parciais':       self.parciais,
+            'deslize_pontos': deslize,
+            'deslize_ticks':  deslize / self.tamanho_tick,
+            'atraso_ms':      sum(r[4] for r in self.resultados) / n / _MS,
+        }
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Latência do loop x deslize de execução (ordens a mercado num fluxo sintético)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import numpy as np
+    from despachante_ordens import Ordem
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(22)
+    # ~8 ticks/s, passos de 5 pontos; movimentos tendem a continuar
+    passos = rng.exponential(125, n).astype(np.int64) * _MS + _MS
+    ts     = np.datetime64("2025-03-10T09:05:00", "ns").astype(np.int64) + np.cumsum(passos)
+    mov    = rng.choice([-1, 0, 1], n, p=[0.3, 0.4, 0.3])
+    for i in range(1, n):
+        if mov[i - 1] and rng.random() < 0.5:
+            mov[i] = mov[i - 1]
+    precos = 128_000 + 5.0 * np.cumsum(mov)
+    # decisões no rompimento (3 ticks seguidos no mesmo sentido), a favor dele
+    decisoes, ult = [], -100
+    for i in range(3, n):
+        if mov[i] and mov[i] == mov[i - 1] == mov[i - 2] and i - ult >= 50:
+            decisoes.append(i)
+            ult = i
+
+    print(f"{len(decisoes)} ordens de 5 contratos em {n} ticks")
+    print(f"{'latência':>16} | {'deslize (pts)':>13} | {'ticks WIN':>9} | {'atraso (ms)':>11} | parciais")
+    for latencia in (0, 50, 200, 500, 1000):
+        for liquidez in ((0, 2) if latencia == 200 else (0,)):
+            cor = CorretoraSimulada(latencia_ms=latencia, deslize_ticks=0, liquidez=liquidez)
+            j = 0
+            for i in range(n):
+                cor.tick(ts[i], precos[i])
+                if j < len(decisoes) and decisoes[j] == i:
+                    lado = 'COMPRA' if mov[i] > 0 else 'VENDA'
+                    cor.submeter(Ordem(lado, 5, precos[i]), ts_ref=int(ts[i]))
+                    j += 1
+            r = cor.relatorio()
+            rotulo = f"{latencia} ms" + (f" (liq. {liquidez})" if liquidez else "")
+            print(f"{rotulo:>16} | {r['deslize_pontos']:13.2f} | {r['deslize_ticks']:9.2f} | "
+                  f"{r['atraso_ms']:11.0f} | {r['parciais']}")
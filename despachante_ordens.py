@@ -0,0 +1,239 @@
+# despachante_ordens.py
+
+import itertools
+import queue
+import threading
+import time
+
+from config import BACKEND_ORDENS, INTERVALO_HOTKEY
+from executa_ordem import debug, envio_habilitado, verificar_tela_profit, ativar_tela_profit
+from corretora_simulada import CorretoraSimulada
+from latencia import medidor
+
+# lado da ordem → atalho do Profit (boleta configurada para 1 contrato)
+_ATALHOS = {'COMPRA': ('alt', 'c'), 'VENDA': ('alt', 'v'), 'ZERAR': ('alt', 'z')}
+
+
+class Ordem:
+    """Uma ordem (lado + quantidade) e o resultado do envio."""
+
+    __slots__ = ('id', 'lado', 'quantidade', 'preco_ref', 'ao_concluir', 'motivo', 'contexto',
+                 'criada', 'tick_ns', 'estado', 'executadas', 'preco_medio', 'erro', 'concluida')
+
+    _ids = itertools.count(1)
+
+    def __init__(self, lado: str, quantidade: int, preco_ref: float = 0.0, ao_concluir=None,
+                 motivo: str = '', contexto=None):
+        self.id          = next(Ordem._ids)
+        self.lado        = lado
+        self.quantidade  = quantidade
+        self.preco_ref   = preco_ref       # último preço visto por quem mandou
+        self.ao_concluir = ao_concluir     # chamado (na thread do despachante) ao terminar
+        self.motivo      = motivo          # ex.: 'ENTRADA' / 'SAIDA'
+        self.contexto    = contexto        # dado livre de quem mandou
+        self.criada      = time.perf_counter()
+        self.tick_ns     = medidor.tick_inicio   # início do tick que decidiu (ou None)
+        self.estado      = 'PENDENTE'      # → EXECUTADA | PARCIAL | FALHOU
+        self.executadas  = 0
+        self.preco_medio = None            # só nos backends que sabem o preço executado
+        self.erro        = None
+        self.concluida   = None            # perf_counter do fim do envio
+
+    def __repr__(self) -> str:
+        return f"Ordem#{self.id}({self.lado} {self.executadas}/{self.quantidade} {self.estado})"
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Backends: enviar(ordem) preenche executadas/preco_medio (pode demorar)
+# —————————————————————————————————————————————————————————————————————————
+class BackendHotkey:
+    """Atalhos do Profit via pyautogui: ativa a janela uma vez por ordem."""
+
+    nome = 'HOTKEY'
+
+    def __init__(self, intervalo: float = INTERVALO_HOTKEY):
+        self.intervalo = intervalo
+
+    def enviar(self, ordem: Ordem):
+        if not envio_habilitado():
+            ordem.erro = 'envio desabilitado'
+            return
+        if not verificar_tela_profit() or not ativar_tela_profit():
+            ordem.erro = 'Profit não encontrado'
+            return
+        import pyautogui
+        debug(f"[NEGOCIAÇÃO] Enviando ordem de {ordem.lado} x{ordem.quantidade}...")
+        for _ in range(ordem.quantidade):
+            pyautogui.hotkey(*_ATALHOS[ordem.lado])
+            ordem.executadas += 1
+            time.sleep(self.intervalo)
+
+
+class BackendDryRun:
+    """Não envia nada: só registra a ordem e a dá como executada."""
+
+    nome = 'DRYRUN'
+
+    def enviar(self, ordem: Ordem):
+        debug(f"[DRYRUN] {ordem.lado} x{ordem.quantidade} @ {ordem.preco_ref:.0f}")
+        ordem.executadas  = ordem.quantidade
+        ordem.preco_medio = ordem.preco_ref
+
+
+BACKENDS = {b.nome: b for b in (BackendHotkey, CorretoraSimulada, BackendDryRun)}
+
+
+def backend_config():
+    """Backend de [TRADE] BACKEND_ORDENS; HOTKEY sem envio habilitado vira DRYRUN."""
+    nome = BACKEND_ORDENS if BACKEND_ORDENS in BACKENDS else 'HOTKEY'
+    if nome != BACKEND_ORDENS:
+        print(f"[Aviso] BACKEND_ORDENS '{BACKEND_ORDENS}' desconhecido: usando HOTKEY")
+    if nome == 'HOTKEY' and not envio_habilitado():
+        nome = 'DRYRUN'
+    return BACKENDS[nome]()
+
+
+class DespachanteOrdens:
+    """
+    Fila de ordens enviadas por uma thread própria: o loop de ticks só
+    enfileira (enviar() retorna na hora) e segue atualizando stops e
+    painéis enquanto o backend trabalha (no HOTKEY, ~0,5 s por contrato).
+
+      - uma ordem por decisão, com a quantidade de contratos
+      - as ordens saem na ordem em que chegaram (uma de cada vez)
+      - ao terminar, ordem.ao_concluir(ordem) é chamado na thread do
+        despachante: quem mandou recebe o resultado sem esperar
+        (TradeSession só anexa numa deque e confere no próximo tick)
+    """
+
+    def __init__(self, backend=None):
+        self.backend  = backend or backend_config()
+        self.enviadas = 0
+        self._fila    = queue.Queue()
+        self._thread  = None
+
+    def enviar(self, lado: str, quantidade: int = 1, preco_ref: float = 0.0, ao_concluir=None,
+               motivo: str = '', contexto=None) -> Ordem:
+        ordem = Ordem(lado, int(quantidade), preco_ref, ao_concluir, motivo, contexto)
+        if self._thread is None:
+            self.iniciar()
+        self._fila.put(ordem)
+        return ordem
+
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    def tick(self, ts: int, preco: float):
+        """Repassa o tick ao backend que executa contra o fluxo (SIMULADO)."""
+        tick = getattr(self.backend, 'tick', None)
+        if tick is not None:
+            tick(ts, preco)
+
+    def _executar(self, ordem: Ordem):
+        inicio = time.perf_counter_ns()
+        if ordem.tick_ns is not None:
+            medidor.registrar('tick_ordem', inicio - ordem.tick_ns)   # tick → backend
+        try:
+            self.backend.enviar(ordem)
+        except Exception as e:
+            ordem.erro = str(e)
+        medidor.registrar('envio', time.perf_counter_ns() - inicio)
+        if ordem.executadas >= ordem.quantidade:
+            ordem.estado = 'EXECUTADA'
+        else:
+            ordem.estado = 'PARCIAL' if ordem.executadas else 'FALHOU'
+        ordem.concluida = time.perf_counter()
+        self.enviadas += 1
+        if ordem.ao_concluir is not None:
+            try:
+                ordem.ao_concluir(ordem)
+            except Exception as e:
+                print(f"[Aviso] retorno da {ordem}: {e}")
+
+    # ——————————————————————————————————————————————————————————————
+    # Ciclo de vida
+    # ——————————————————————————————————————————————————————————————
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="despacho-ordens", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            ordem = self._fila.get()
+            if ordem is None:
+                break
+            self._executar(ordem)
+
+    def encerrar(self, timeout: float = 30.0):
+        """Envia o que já está na fila e para a thread."""
+        if self._thread is not None:
+            self._fila.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+_despachante = None
+
+
+def despachante_padrao() -> DespachanteOrdens:
+    """Despachante do processo (backend do config.ini), compartilhado pelas sessões."""
+    global _despachante
+    if _despachante is None:
+        _despachante = DespachanteOrdens()
+    return _despachante
+
+
+def tick_mercado(ts: int, preco: float):
+    """Tick do loop para o despachante do processo (corretora simulada)."""
+    despachante_padrao().tick(ts, preco)
+
+
+def encerrar_despachante():
+    global _despachante
+    if _despachante is not None:
+        _despachante.encerrar()
+        _despachante = None
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Loop de ticks bloqueado: envio síncrono x despachante (corretora simulada
+# com a demora do HOTKEY, ~0,1 s por contrato no relógio dos ticks)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import numpy as np
+    from collections import deque
+
+    contratos, tick = 5, 0.01
+    demora = 0.1                          # por contrato (HOTKEY real: ~0,5-1 s)
+
+    # antigo: o loop fica parado enquanto cada contrato é enviado
+    t0 = time.perf_counter()
+    for _ in range(contratos):
+        time.sleep(demora)
+    t_sync = time.perf_counter() - t0
+
+    # novo: uma ordem x5 enfileirada; o loop segue com ticks de 10 ms
+    desp = DespachanteOrdens(CorretoraSimulada(latencia_ms=demora * contratos * 1e3))
+    concluidas = deque()
+    lat = []
+    ts, preco = time.time_ns(), 128_000.0
+    desp.tick(ts, preco)
+    t0 = time.perf_counter()
+    ordem = desp.enviar('VENDA', contratos, preco, ao_concluir=concluidas.append)
+    lat.append(time.perf_counter() - t0)
+    ticks = 0
+    while not concluidas:
+        t1 = time.perf_counter()
+        time.sleep(tick)                  # trabalho do tick (indicadores, stops, painel)
+        preco += 5.0 * np.sign(np.sin(ticks))
+        desp.tick(time.time_ns(), preco)
+        ticks += 1
+        lat.append(time.perf_counter() - t1 - tick)
+    desp.encerrar()
+    lat = np.array(lat) * 1e6
+    print(f"{contratos} contratos: loop parado {t_sync * 1e3:.0f} ms no envio síncrono | "
+          f"despachante: enviar() {lat[0]:.0f} us, {ticks} ticks processados durante o envio "
+          f"(atraso extra por tick: mediana {np.median(lat[1:]):.0f} us)")
+    print(f"{ordem} em {(ordem.concluida - ordem.criada) * 1e3:.0f} ms a {ordem.preco_medio:.0f} | "
+          f"posição simulada: {desp.backend.posicao}")
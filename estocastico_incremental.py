@@ -0,0 +1,218 @@
+# estocastico_incremental.py
+
+from collections import deque
+
+import numpy as np
+
+# parâmetros do estocástico lento (usados também pelos painéis)
+STO_LEN = 8
+D_LEN   = 3
+
+
+class _EWM:
+    """
+    Média exponencial com a mesma recorrência do pandas
+    ewm(span, adjust=True, ignore_na=False).mean(): NaN não entra na média,
+    mas conta na decadência dos pesos.
+    """
+    __slots__ = ("fator", "media", "peso")
+
+    def __init__(self, span: int):
+        self.fator = 1.0 - 2.0 / (span + 1.0)
+        self.media = np.nan
+        self.peso  = 1.0
+
+    def estado(self) -> tuple:
+        return self.media, self.peso
+
+    def restaurar(self, estado: tuple):
+        self.media, self.peso = estado
+
+    def passo(self, x: float) -> float:
+        if self.media == self.media:
+            self.peso *= self.fator
+            if x == x:
+                if self.media != x:
+                    self.media = (self.peso * self.media + x) / (self.peso + 1.0)
+                self.peso += 1.0
+        elif x == x:
+            self.media = x
+        return self.media
+
+
+class _Extremo:
+    """
+    Máximo (ou mínimo) das últimas 'janela' barras fechadas por deque
+    monotônica de (índice, valor). Também responde o extremo de um sufixo
+    da janela: é o primeiro elemento da deque com índice >= início.
+    """
+    __slots__ = ("janela", "sinal", "fila", "ultimo_nan")
+
+    def __init__(self, janela: int, maximo: bool):
+        self.janela     = janela
+        self.sinal      = 1.0 if maximo else -1.0
+        self.fila       = deque()
+        self.ultimo_nan = -1
+
+    def anexar(self, idx: int, valor: float):
+        if valor != valor:
+            self.ultimo_nan = idx
+        else:
+            v = self.sinal * valor
+            fila = self.fila
+            while fila and fila[-1][1] <= v:
+                fila.pop()
+            fila.append((idx, v))
+        while self.fila and self.fila[0][0] <= idx - self.janela:
+            self.fila.popleft()
+
+    def sufixo(self, inicio: int) -> float:
+        """Extremo das barras fechadas com índice >= inicio (NaN se houver NaN)."""
+        if self.ultimo_nan >= inicio:
+            return np.nan
+        for idx, v in self.fila:
+            if idx >= inicio:
+                return self.sinal * v
+        return -self.sinal * np.inf
+
+
+class EstocasticoIncremental:
+    """
+    Estocástico lento de um timeframe mantido barra a barra, com o mesmo
+    resultado de:
+
+        hr = high.rolling(STO_LEN).max(); lr = low.rolling(STO_LEN).min()
+        fk = 100 * (close - lr) / (hr - lr)
+        sk = fk.ewm(span=D_LEN).mean();   sd = sk.ewm(span=D_LEN).mean()
+
+    sobre motor.ohlc(tf). As barras fechadas até a antepenúltima entram no
+    estado de vez (deques monotônicas + recorrência EWM); as duas últimas
+    (barra em formação e a anterior, que recebe o ajuste do piso) são
+    provisórias e recalculadas a partir do estado a cada tick: O(1) por tick.
+    """
+
+    def __init__(self, sto_len: int = STO_LEN, d_len: int = D_LEN):
+        self.sto_len = sto_len
+        self.d_len   = d_len
+        self._geracao = None
+        self.resetar()
+
+    def resetar(self):
+        self._max  = _Extremo(self.sto_len - 1, maximo=True)
+        self._min  = _Extremo(self.sto_len - 1, maximo=False)
+        self._sk   = _EWM(self.d_len)
+        self._sd   = _EWM(self.d_len)
+        self._n    = 0                    # barras já consolidadas
+        self._rotulo = None               # rótulo da última barra consolidada
+
+    def _passo(self, idx: int, h: float, l: float, c: float, extra_h, extra_l) -> tuple:
+        """
+        %K e %D da barra idx a partir das barras consolidadas, com as barras
+        provisórias anteriores a ela em extra_h/extra_l.
+        """
+        if idx + 1 < self.sto_len:
+            fk = np.nan
+        else:
+            ini = idx - self.sto_len + 1
+            hr  = max(self._max.sufixo(ini), h, *extra_h)
+            lr  = min(self._min.sufixo(ini), l, *extra_l)
+            if hr != hr or lr != lr or any(v != v for v in (h, l, *extra_h, *extra_l)):
+                fk = np.nan
+            else:
+                den = hr - lr
+                fk  = 100 * (c - lr) / den if den != 0 else (np.nan if c == lr else np.inf)
+        k = self._sk.passo(fk)
+        return k, self._sd.passo(k)
+
+    def _consolidar(self, h: float, l: float, c: float):
+        self._passo(self._n, h, l, c, (), ())
+        self._max.anexar(self._n, h)
+        self._min.anexar(self._n, l)
+        self._n += 1
+
+    def atualizar(self, motor, tf: str) -> tuple:
+        """
+        Consome as barras novas do timeframe e retorna (k, d) da última
+        barra; (0.0, 0.0) com menos de sto_len barras, como nos painéis.
+        """
+        s = motor.series[tf]
+        n = len(s)
+        if s.geracao != self._geracao:
+            self.resetar()
+            self._geracao = s.geracao
+        if n < self.sto_len:
+            return 0.0, 0.0
+
+        # consolida as barras fechadas além das duas provisórias
+        rot = s.rotulos()
+        ini = 0 if self._rotulo is None else int(np.searchsorted(rot, self._rotulo, side="right"))
+        if ini < n - 2:
+            _, h, l, c = s.ohlc()
+            for i in range(ini, n - 2):
+                self._consolidar(float(h[i]), float(l[i]), float(c[i]))
+            self._rotulo = int(rot[n - 3])
+
+        # barras provisórias sobre uma cópia do estado das médias
+        h, l, c = motor.finais(tf, 2)
+        sk0, sd0 = self._sk.estado(), self._sd.estado()
+        self._passo(self._n, h[0], l[0], c[0], (), ())
+        k, d = self._passo(self._n + 1, h[1], l[1], c[1], (h[0],), (l[0],))
+        self._sk.restaurar(sk0)
+        self._sd.restaurar(sd0)
+        return float(k), float(d)
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Paridade com o cálculo pandas dos painéis, tick a tick
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    import pandas as pd
+    from barras import MotorBarras, RULES
+
+    def estocastico_pandas(bars: pd.DataFrame) -> tuple:
+        if len(bars) < STO_LEN:
+            return 0.0, 0.0
+        hr = bars['high'].rolling(STO_LEN).max()
+        lr = bars['low'].rolling(STO_LEN).min()
+        fk = 100 * (bars['close'] - lr) / (hr - lr)
+        sk = fk.ewm(span=D_LEN).mean()
+        sd = sk.ewm(span=D_LEN).mean()
+        return sk.iat[-1], sd.iat[-1]
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    rng = np.random.default_rng(7)
+    # ticks a cada 1-40 s (fora da grade de minuto), com lacunas de até 3 h,
+    # trechos de preço parado (high == low) e saltos
+    passos = rng.integers(1, 40, n).astype(np.int64)
+    passos[rng.random(n) < 0.01] = 3 * 3600
+    ts     = np.datetime64("2025-01-02T09:00:00", "ns").astype(np.int64) + np.cumsum(passos) * 1_000_000_000
+    mov    = rng.choice([-10.0, -5.0, 0.0, 0.0, 5.0, 10.0], n)
+    mov[(np.arange(n) // 200) % 7 == 3] = 0.0
+    precos = 130_000 + np.cumsum(mov)
+
+    # o incremental roda sobre um motor de janela curta (testa o buffer
+    # circular); a referência pandas usa o histórico inteiro de barras
+    motor = MotorBarras(max_barras=300)
+    ref   = MotorBarras(max_barras=int((ts[-1] - ts[0]) // 60_000_000_000) + 10)
+    estos = {tf: EstocasticoIncremental() for tf in RULES}
+    pior  = 0.0
+    divergencias = 0
+    t_inc = t_pd = 0.0
+    for i in range(n):
+        motor.tick(int(ts[i]), float(precos[i]))
+        ref.tick(int(ts[i]), float(precos[i]))
+        for tf, est in estos.items():
+            t0 = time.perf_counter(); k, d = est.atualizar(motor, tf); t_inc += time.perf_counter() - t0
+            t0 = time.perf_counter(); rk, rd = estocastico_pandas(ref.ohlc(tf)); t_pd += time.perf_counter() - t0
+            for a, b in ((k, rk), (d, rd)):
+                if (a != a) != (b != b) or (a == a and not np.isclose(a, b, rtol=1e-9, atol=1e-9)):
+                    divergencias += 1
+                elif a == a and np.isfinite(a):
+                    pior = max(pior, abs(a - b))
+
+    total = n * len(estos)
+    print(f"{n} ticks x {len(estos)} timeframes | divergências: {divergencias} | maior |Δ|: {pior:.2e}")
+    print(f"pandas: {t_pd / total * 1e6:8.1f} us/atualização | incremental: {t_inc / total * 1e6:6.1f} us/atualização")
+    sys.exit(1 if divergencias else 0)
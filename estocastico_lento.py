@@ -1,15 +1,12 @@
 # estocastico_lento.py
 
 import sys
-import pandas as pd
 import unicodedata
 from indicador_medias import COL_W, PERIODOS
 import colorama
 from colorama import Fore, Style
 
 # parâmetros do estocástico
-STO_LEN = 8
-D_LEN   = 3
 RULES   = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
 TFS     = list(RULES.keys())
 
@@ -23,6 +20,17 @@ def normalize_header(name: str) -> str:
     return ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
 
 
+def tendencia_estocastico(k_val: float, d_val: float) -> str:
+    """Classifica a tendência a partir de %K e %D."""
+    if abs(k_val - d_val) < 1:
+        return 'LATERAL'
+    if k_val > 80:
+        return 'SOBRECOMPRADO'
+    if k_val < 20:
+        return 'SOBREVENDIDO'
+    return 'ALTA' if k_val > d_val else 'BAIXA'
+
+
 def color_trend(trend: str) -> str:
     t = trend.strip().upper().center(COL_W)
     if t.strip() == 'ALTA':
@@ -61,53 +69,28 @@ def draw_layout(start_row: int = 1):
     sys.stdout.write(f"\x1b[{start_row+5};0H{sep1}")
 
 
-def draw_values(df: pd.DataFrame, start_row: int = 1):
+def draw_values(ind, start_row: int = 1):
     """
-    Calcula e escreve os valores de MEDIA 8, MEDIA 3 e TENDENCIA
-    abaixo da estrutura estática já desenhada por draw_layout.
+    Escreve os valores de MEDIA 8, MEDIA 3 e TENDENCIA abaixo da estrutura
+    estática já desenhada por draw_layout. Os valores vêm do grafo de
+    indicadores (calibrador.obter_indicadores), recalculados só nos
+    timeframes cujas barras mudaram.
     """
-    last_dt = pd.to_datetime(df['DataHora'].iat[-1])
-    last_pr = df['Último'].iat[-1]
-    serie   = df.set_index('DataHora')['Último']
+    valores   = ind.estocastico()
+    tendencia = ind.tendencias()
 
-    # cálculo para cada timeframe
     for idx, tf in enumerate(TFS):
-        bars = (
-            serie
-            .resample(RULES[tf], closed='right', label='right')
-            .ohlc()
-            .ffill()
-        )
-        ts = last_dt.floor(RULES[tf])
-        if ts in bars.index:
-            bars.at[ts,'high']  = max(bars.at[ts,'high'], last_pr)
-            bars.at[ts,'low']   = min(bars.at[ts,'low'],  last_pr)
-            bars.at[ts,'close'] = last_pr
-
-        if len(bars) >= STO_LEN:
-            hr    = bars['high'].rolling(STO_LEN).max()
-            lr    = bars['low'].rolling(STO_LEN).min()
-            fk    = 100 * (bars['close'] - lr) / (hr - lr)
-            sk    = fk.ewm(span=D_LEN).mean()
-            sd    = sk.ewm(span=D_LEN).mean()
-            k_val = sk.iat[-1]
-            d_val = sd.iat[-1]
-        else:
-            k_val, d_val = 0.0, 0.0
-
-        # Tendência
-        if abs(k_val - d_val) < 1:
-            trend = 'LATERAL'
-        elif k_val > 80:
-            trend = 'SOBRECOMPRADO'
-        elif k_val < 20:
-            trend = 'SOBREVENDIDO'
-        else:
-            trend = 'ALTA' if k_val > d_val else 'BAIXA'
-
         # posicionamento no terminal
         col = COL_W + 1 + idx * (COL_W + 1)
 
+        # timeframe fora do perfil sniper: não calculado
+        if tf not in valores:
+            for r in (2, 3, 4):
+                sys.stdout.write(f"\x1b[{start_row+r};{col}H{'-':^{COL_W}}")
+            continue
+        k_val, d_val = valores[tf]
+        trend = tendencia[tf]
+
         # MEDIA 8
         sys.stdout.write(f"\x1b[{start_row+2};{col}H{k_val:^{COL_W}.2f}")
         # MEDIA 3
@@ -2,11 +2,11 @@
 
 #!/usr/bin/env python3
 import sys
-import pyautogui
 import time
-import pygetwindow as gw
-from pygetwindow import PyGetWindowException
-from config import NOME_TELA_PROFIT, ENVIAR_ORDENS
+from config import NOME_TELA_PROFIT, ENVIAR_ORDENS, FEED_TRANSPORTE
+
+# pyautogui/pygetwindow só são importados ao enviar ordens (Windows),
+# para que o robô rode sem interface gráfica no modo REPLAY
 
 # Debug helper: escreve a partir da linha 26 sem sujar o painel
 def debug(msg: str):
@@ -18,6 +18,7 @@ def debug(msg: str):
 
 # 🚀 Função para verificar se a tela do Profit está aberta
 def verificar_tela_profit():
+    import pygetwindow as gw
     janelas = gw.getWindowsWithTitle(NOME_TELA_PROFIT)
     if not janelas:
         debug("[ERRO] Profit não está aberto ou não encontrado!")
@@ -26,6 +27,8 @@ def verificar_tela_profit():
 
 # 🚀 Função para ativar a janela do Profit (ignora Error code 0)
 def ativar_tela_profit():
+    import pygetwindow as gw
+    from pygetwindow import PyGetWindowException
     janelas = gw.getWindowsWithTitle(NOME_TELA_PROFIT)
     if not janelas:
         debug("[ERRO] Não foi possível encontrar a janela do Profit.")
@@ -41,10 +44,18 @@ def ativar_tela_profit():
     time.sleep(0.5)  # deixa o Profit ganhar foco
     return True
 
-# 🚀 Função para executar compra
-def executar_compra():
+# 🚀 Envio habilitado? (nunca no replay: não há Profit para receber a ordem)
+def envio_habilitado() -> bool:
+    if FEED_TRANSPORTE == "REPLAY":
+        return False
     if not ENVIAR_ORDENS:
         debug("[INFO] Envio de ordens está desativado em config.ini")
+        return False
+    return True
+
+# 🚀 Função para executar compra
+def executar_compra():
+    if not envio_habilitado():
         return None
     if not verificar_tela_profit():
         return None
@@ -52,14 +63,14 @@ def executar_compra():
         return None
 
     debug("[NEGOCIAÇÃO] Enviando ordem de COMPRA...")
+    import pyautogui
     pyautogui.hotkey("alt", "c")
     time.sleep(0.5)
     return "compra"
 
 # 🚀 Função para executar venda
 def executar_venda():
-    if not ENVIAR_ORDENS:
-        debug("[INFO] Envio de ordens está desativado em config.ini")
+    if not envio_habilitado():
         return None
     if not verificar_tela_profit():
         return None
@@ -67,14 +78,14 @@ def executar_venda():
         return None
 
     debug("[NEGOCIAÇÃO] Enviando ordem de VENDA...")
+    import pyautogui
     pyautogui.hotkey("alt", "v")
     time.sleep(0.5)
     return "venda"
 
 # 🚀 Função para zerar posição
 def zerar_posicao():
-    if not ENVIAR_ORDENS:
-        debug("[INFO] Envio de ordens está desativado em config.ini")
+    if not envio_habilitado():
         return None
     if not verificar_tela_profit():
         return None
@@ -82,6 +93,7 @@ def zerar_posicao():
         return None
 
     debug("[NEGOCIAÇÃO] Enviando ordem de ZERAR POSIÇÃO...")
+    import pyautogui
     pyautogui.hotkey("alt", "z")
     time.sleep(0.5)
     return "zerado"
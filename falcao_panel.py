@@ -1,27 +1,23 @@
 # falcao_panel.py
 import sys
-import unicodedata
 import pandas as pd
 import colorama
 from colorama import Fore, Style
 from indicador_medias import COL_W, PERIODOS
 from openpyxl import load_workbook
+from cenarios import TabelaCenarios, CacheCenarios, normalize_header
+from config import CENARIOS_INTERVALO_RECARGA
 
 # Inicializa o Colorama para cores no terminal
 colorama.init(autoreset=True)
 
-# Parâmetros de cálculo de estocástico (mesmos do estocastico_lento)
-STO_LEN = 8
-D_LEN   = 3
 RULES   = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
 TFS     = list(RULES.keys())
 
-
-def normalize_header(name: str) -> str:
-    if not isinstance(name, str):
-        return ''
-    s = unicodedata.normalize('NFD', name.strip().upper())
-    return ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
+# última aba CENARIOS compilada (recompila só quando recebe outro DataFrame)
+_tabela = None
+# planilha → cache com recarga em fundo (cenarios_em_cache)
+_caches = {}
 
 
 def load_scenarios(path: str) -> pd.DataFrame:
@@ -36,15 +32,39 @@ def load_scenarios(path: str) -> pd.DataFrame:
     return pd.DataFrame(data, columns=headers).fillna('')
 
 
+def compile_scenarios(df: pd.DataFrame) -> TabelaCenarios:
+    # Tabela de decisão (curingas + PRIORIDADE), compilada uma vez por
+    # DataFrame; linhas inúteis ou sobrepostas são avisadas na compilação
+    global _tabela
+    if _tabela is None or _tabela.df is not df:
+        _tabela = TabelaCenarios(df)
+        _tabela.avisar()
+    return _tabela
+
+
+def cenarios_em_cache(path: str) -> CacheCenarios:
+    # Cenários da planilha relidos só quando o arquivo muda (thread de fundo);
+    # o loop usa cenarios_em_cache(path).tabela().buscar(trends)
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = CacheCenarios(path, load_scenarios, CENARIOS_INTERVALO_RECARGA)
+        cache.iniciar()
+    return cache
+
+
+def encerrar_cenarios():
+    # Para as threads de recarga das planilhas abertas
+    for cache in _caches.values():
+        cache.encerrar()
+    _caches.clear()
+
+
 def find_matching_scenario(df: pd.DataFrame, trends: dict) -> pd.Series:
-    # Retorna primeira linha onde cada coluna TF bate com trends[TF]
-    for _, row in df.iterrows():
-        if all(
-            normalize_header(str(row.get(tf, ''))) == normalize_header(trends.get(tf, ''))
-            for tf in TFS
-        ):
-            return row
-    return df.iloc[0] if not df.empty else pd.Series()
+    # Retorna a linha de maior PRIORIDADE (empate: a primeira) onde cada
+    # coluna TF bate com trends[TF] ou é curinga ('*' ou vazia), só nos
+    # timeframes calculados (no modo sniper, os do perfil); sem nenhuma,
+    # a linha 0. Busca por AND de bitsets na tabela compilada.
+    return compile_scenarios(df).buscar(trends)
 
 
 def color_val(text: str) -> str:
@@ -81,40 +101,9 @@ def draw_layout(start_row: int = 1):
     sys.stdout.write(f"\x1b[{top+8};0H{sep}")
 
 
-def draw_values(df: pd.DataFrame, excel_path: str, start_row: int = 1):
-    # Recalcula tendências via estocástico lento
-    last_dt = pd.to_datetime(df['DataHora'].iat[-1])
-    last_pr = df['Último'].iat[-1]
-    serie   = df.set_index('DataHora')['Último']
-    trends  = {}
-
-    for tf in TFS:
-        bars = serie.resample(RULES[tf], closed='right', label='right').ohlc().ffill()
-        ts = last_dt.floor(RULES[tf])
-        if ts in bars.index:
-            bars.at[ts,'high']  = max(bars.at[ts,'high'], last_pr)
-            bars.at[ts,'low']   = min(bars.at[ts,'low'],  last_pr)
-            bars.at[ts,'close'] = last_pr
-        if len(bars) >= STO_LEN:
-            hr = bars['high'].rolling(STO_LEN).max()
-            lr = bars['low'].rolling(STO_LEN).min()
-            fk = 100 * (bars['close'] - lr) / (hr - lr)
-            sk = fk.ewm(span=D_LEN).mean()
-            sd = sk.ewm(span=D_LEN).mean()
-            k_val, d_val = sk.iat[-1], sd.iat[-1]
-        else:
-            k_val, d_val = 0.0, 0.0
-        if abs(k_val - d_val) < 1:
-            trends[tf] = 'LATERAL'
-        elif k_val > 80:
-            trends[tf] = 'SOBRECOMPRADO'
-        elif k_val < 20:
-            trends[tf] = 'SOBREVENDIDO'
-        else:
-            trends[tf] = 'ALTA' if k_val > d_val else 'BAIXA'
-
-    # Escolhe o cenário que casa com as tendências
-    sce = find_matching_scenario(load_scenarios(excel_path), trends)
+def draw_values(ind, sce: pd.Series, start_row: int = 1):
+    # Cenário já escolhido pelo falcon.py (find_matching_scenario, uma vez por tick)
+    last_pr = ind.motor.ultimo_preco
     top = start_row + 7
     b1  = COL_W + 1
 
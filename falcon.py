@@ -1,38 +1,48 @@
 #!/usr/bin/env python3
 import os
+import sys
 import time
-import pandas as pd
 import config
 from datetime import datetime
 
-from calibrador import obter_intraday
-from config import FALCAO_EXCEL_PATH
+from calibrador import (
+    obter_intraday, obter_indicadores, obter_faixa, obter_perfil, replay_esgotado,
+    encerrar as encerrar_calibrador
+)
+from config import FALCAO_EXCEL_PATH, FEED_TRANSPORTE, REPLAY_VELOCIDADE, LOG_DEBUG_ATIVADO
 
 # Estocástico Lento
 from estocastico_lento import (
     draw_layout    as draw_stoch_layout,
-    draw_values    as draw_stoch_values,
-    STO_LEN, D_LEN, PERIODOS
+    draw_values    as draw_stoch_values
 )
 
 # Painel Falcão
 from falcao_panel import (
     draw_layout         as draw_falc_layout,
     draw_values         as draw_falc_values,
-    load_scenarios,
-    find_matching_scenario
+    cenarios_em_cache,
+    encerrar_cenarios
 )
 
 # Plano de Trade
 from planotrade import load_trade_plan, draw_panel as draw_plan_panel
 
 # Gestor de Operações
-from gestor_trade import init_gestor, update_trade_state, draw_operacao
+from gestor_trade import init_gestor, encerrar_gestor, update_trade_state, draw_operacao, posicao_aberta
+from despachante_ordens import despachante_padrao, tick_mercado
+
+# Latência por etapa do loop (histogramas, p50/p99/máx)
+from latencia import medidor, resumo_latencia, encerrar_latencia
 
 # Linha onde começamos a desenhar os painéis
 START_ROW = 2
 SLEEP     = 0.2
 
+# Replay “o mais rápido possível”: sem pausa entre ticks (mede ticks/s máximo)
+if FEED_TRANSPORTE == "REPLAY" and REPLAY_VELOCIDADE <= 0:
+    SLEEP = 0.0
+
 # Histórico de execução
 history_file = None
 
@@ -81,72 +91,106 @@ if __name__ == '__main__':
     init_gestor(FALCAO_EXCEL_PATH)
     log_history('Gestor inicializado com plano de trade')
 
+    # modo sniper: só os timeframes do perfil são calculados
+    perfil = obter_perfil()
+    if perfil is not None:
+        log_history(f'Modo sniper: {perfil}')
+
+    # contadores de desempenho (reportados ao fim do replay)
+    ticks_processados = 0
+    t_inicio = None
+    ind = None
+
     try:
         # loop principal
         while True:
             df = None
+            medidor.inicio()
             try:
                 df = obter_intraday()
             except IndexError:
+                medidor.descartar()
                 log_history('Aguardando dados iniciais do intraday')
                 time.sleep(SLEEP)
                 continue
 
             if df is None or df.empty:
+                medidor.descartar()
+                if replay_esgotado():
+                    break
                 time.sleep(SLEEP)
                 continue
+            if t_inicio is None:
+                t_inicio = time.perf_counter()
+            medidor.marcar('feed')
+
+            # indicadores multi-timeframe: barras atualizadas só com os ticks
+            # novos e recálculo só dos timeframes que mudaram
+            ind = obter_indicadores()
+            medidor.marcar('barras')
 
             # 1) atualiza Estocástico Lento
-            draw_stoch_values(df, start_row=START_ROW)
-
-            # 2) atualiza Painel Falcão (coluna Cenário Atual)
-            draw_falc_values(df, FALCAO_EXCEL_PATH, start_row=START_ROW)
-
-            # 3) recomputa tendências para encontrar o cenário
-            last_dt = pd.to_datetime(df['DataHora'].iat[-1])
-            last_pr = df['Último'].iat[-1]
-            serie   = df.set_index('DataHora')['Último']
-
-            trends = {}
-            for tf, rule in {tf.strip().upper(): r for tf, r in PERIODOS.items()}.items():
-                bars = (
-                    serie
-                    .resample(rule, closed='right', label='right')
-                    .ohlc()
-                    .ffill()
-                )
-                ts = last_dt.floor(rule)
-                if ts in bars.index:
-                    bars.at[ts,'high']  = max(bars.at[ts,'high'], last_pr)
-                    bars.at[ts,'low']   = min(bars.at[ts,'low'],  last_pr)
-                    bars.at[ts,'close'] = last_pr
-                if len(bars) >= STO_LEN:
-                    hr = bars['high'].rolling(STO_LEN).max()
-                    lr = bars['low'].rolling(STO_LEN).min()
-                    fk = 100 * (bars['close'] - lr) / (hr - lr)
-                    sk = fk.ewm(span=D_LEN).mean()
-                    sd = sk.ewm(span=D_LEN).mean()
-                    trends[tf] = 'LATERAL' if abs(sk.iat[-1] - sd.iat[-1]) < 1 else (
-                        'SOBRECOMPRADO' if sk.iat[-1] > 80 else (
-                        'SOBREVENDIDO' if sk.iat[-1] < 20 else (
-                        'ALTA' if sk.iat[-1] > sd.iat[-1] else 'BAIXA')))
-                else:
-                    trends[tf] = 'LATERAL'
-
-            sce = find_matching_scenario(load_scenarios(FALCAO_EXCEL_PATH), trends)
-
-            # 4) atualiza o estado de trade
-            update_trade_state(sce, last_pr)
-
-            # 5) desenha EM OPERAÇÃO e GESTAO LUCRO
+            draw_stoch_values(ind, start_row=START_ROW)
+            medidor.marcar('estocastico')
+
+            # 2) cenário das tendências (já no grafo: só leitura), uma vez
+            #    por tick, e Painel Falcão (coluna Cenário Atual)
+            last_pr = ind.motor.ultimo_preco
+            quando  = ind.motor.ultima_datahora
+            if ind.motor.ultimo_ts is not None:
+                tick_mercado(ind.motor.ultimo_ts, last_pr)   # corretora simulada
+            trends  = ind.tendencias()
+            sce = cenarios_em_cache(FALCAO_EXCEL_PATH).tabela().buscar(trends)
+            medidor.marcar('cenario')
+            draw_falc_values(ind, sce, start_row=START_ROW)
+            medidor.marcar('painel')
+
+            # 3) atualiza o estado de trade (sniper: entrada por confluência
+            #    dos timeframes do perfil, saída pelo timeframe de saída);
+            #    stop/meta avaliados na mínima/máxima desde o tick anterior
+            faixa = obter_faixa()
+            if perfil is not None:
+                sair = perfil.deve_sair(trends, posicao_aberta())
+                update_trade_state(perfil.avaliar(sce, trends), last_pr, sair=sair, quando=quando,
+                                   faixa=faixa)
+            else:
+                update_trade_state(sce, last_pr, quando=quando, faixa=faixa)
+            medidor.marcar('decisao')
+
+            # 4) desenha EM OPERAÇÃO e GESTAO LUCRO
             draw_operacao(start_row=START_ROW)
+            medidor.marcar('painel')
+            if medidor.fim() and LOG_DEBUG_ATIVADO:
+                log_history(f'Tick lento: {medidor.ultimo()}')
 
+            ticks_processados += 1
+            if replay_esgotado():
+                break
             time.sleep(SLEEP)
 
+        if t_inicio is not None:
+            dur = time.perf_counter() - t_inicio
+            log_history(
+                f'Replay concluído: {ticks_processados} ticks em {dur:.1f}s '
+                f'({ticks_processados / max(dur, 1e-9):.1f} ticks/s)'
+            )
+        if ind is not None:
+            log_history(f'Indicadores: {ind.agendador.resumo()}')
+        relatorio = getattr(despachante_padrao().backend, 'relatorio', None)
+        if relatorio is not None:
+            log_history(f'Corretora simulada: {relatorio()}')
+        log_history(f'Latência por etapa:\n{resumo_latencia()}')
+
     except KeyboardInterrupt:
         log_history('Execução interrompida pelo usuário (KeyboardInterrupt)')
     finally:
+        encerrar_calibrador()
+        encerrar_cenarios()
+        encerrar_gestor()
+        arquivo = encerrar_latencia()
+        if arquivo:
+            log_history(f'Latência gravada em {arquivo}')
+        log_history('Falcon encerrado com segurança')
         if history_file:
             history_file.close()
-        log_history('Falcon encerrado com segurança')
         sys.exit(0)
@@ -0,0 +1,422 @@
+# feed_cotacoes.py
+
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from valores_profit import tratar_valor_cotacao
+
+# Mapeamento de campos DDE → nome legível
+CAMPOS_DDE = {
+    "Data": "DAT",
+    "Hora": "HOR",
+    "Último": "ULT",
+    "Abertura": "ABE",
+    "Máximo": "MAX",
+    "Mínimo": "MIN",
+    "Fechamento Anterior": "FEC",
+    "Variação": "VAR",
+    "Negócios": "NEG",
+    "Quantidade": "QTT",
+    "Volume": "VOL",
+    "Of. Compra": "OCP",
+    "Of. Venda": "OVD",
+}
+_NOME_POR_TAG = {tag: nome for nome, tag in CAMPOS_DDE.items()}
+
+SERVICO_PROFIT = "profitchart"
+TOPICO_PROFIT  = "cot"
+
+
+def itens_do_ativo(ativo: str) -> list:
+    """Itens DDE ('ATIVO.TAG') de todos os campos de um ativo."""
+    return [f"{ativo}.{tag}" for tag in CAMPOS_DDE.values()]
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Transportes: entregam (item, valor_bruto) apenas quando o valor muda
+# —————————————————————————————————————————————————————————————————————————
+class TransporteDDE:
+    """
+    Transporte DDE do Profit (profitchart|cot).
+
+    O módulo dde do PyWin32 não expõe advise/hot-link do lado cliente, então
+    threads próprias fazem os Requests e publicam somente os itens cujo valor
+    mudou. O loop principal nunca bloqueia em round-trips DDE.
+
+    Os itens são agrupados por ativo e cada ciclo varre os ativos em paralelo
+    num pool de 'trabalhadores' threads, cada uma com sua própria conversa
+    DDE (o DDEML exige conversa por thread): o ciclo custa o do ativo mais
+    lento, não a soma de todos.
+    """
+
+    def __init__(self, intervalo: float = 0.05, trabalhadores: int = 4):
+        self.intervalo     = intervalo
+        self.trabalhadores = max(1, int(trabalhadores))
+        self._itens    = []
+        self._ultimo   = {}
+        self._lock     = threading.Lock()
+        self._parar    = threading.Event()
+        self._thread   = None
+        self._callback = None
+        self._local    = threading.local()
+        self._servidores = []
+
+    def iniciar(self, ao_atualizar):
+        self._callback = ao_atualizar
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="transporte-dde", daemon=True)
+            self._thread.start()
+
+    def assinar(self, itens: list):
+        with self._lock:
+            for item in itens:
+                if item not in self._itens:
+                    self._itens.append(item)
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _conectar(self):
+        import win32ui  # noqa: F401  (inicializa MFC para PyWin32, antes do dde)
+        import dde
+        server = dde.CreateServer()
+        server.Create(f"ProfitPython_{threading.get_ident()}")
+        conversation = dde.CreateConversation(server)
+        conversation.ConnectTo(SERVICO_PROFIT, TOPICO_PROFIT)
+        return server, conversation
+
+    def _conversa(self):
+        """Conversa DDE da thread atual (criada na primeira varredura dela)."""
+        conversation = getattr(self._local, "conversa", None)
+        if conversation is None:
+            server, conversation = self._conectar()
+            self._local.conversa = conversation
+            with self._lock:
+                self._servidores.append(server)
+        return conversation
+
+    def _varrer(self, itens: list) -> bool:
+        """Requests de um grupo de itens; False se a conexão falhou."""
+        try:
+            conversation = self._conversa()
+        except Exception as e:
+            print(f"[Aviso] DDE indisponível: {e}")
+            return False
+        for item in itens:
+            try:
+                raw = conversation.Request(item).strip()
+            except Exception as e:
+                print(f"[ERRO] DDE {item}: {e}")
+                self._local.conversa = None
+                return False
+            if self._ultimo.get(item) != raw:
+                self._ultimo[item] = raw
+                self._callback(item, raw)
+        return True
+
+    def _grupos(self) -> list:
+        """Itens assinados agrupados por ativo ('ATIVO.TAG' → ATIVO)."""
+        grupos = {}
+        with self._lock:
+            for item in self._itens:
+                grupos.setdefault(item.rpartition(".")[0], []).append(item)
+        return list(grupos.values())
+
+    def _loop(self):
+        with ThreadPoolExecutor(max_workers=self.trabalhadores,
+                                thread_name_prefix="dde-ativo") as pool:
+            while not self._parar.is_set():
+                ok = all(pool.map(self._varrer, self._grupos()))
+                self._parar.wait(self.intervalo if ok else 1.0)
+        with self._lock:
+            servidores, self._servidores = self._servidores, []
+        for server in servidores:
+            try:
+                server.Destroy()
+            except Exception:
+                pass
+
+
+class TransporteSocket:
+    """
+    Transporte TCP para o ServidorCotacoesSimulado (mesmo protocolo de
+    itens do profitchart|cot), usado para rodar o pipeline no Linux.
+
+    Protocolo por linhas UTF-8:
+      cliente → 'CONNECT profitchart|cot', 'ADVISE <item>'
+      servidor → '<item>\\t<valor>' (valor atual no ADVISE e a cada mudança)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", porta: int = 12001):
+        self.endereco  = (host, porta)
+        self._itens    = []
+        self._lock     = threading.Lock()
+        self._sock     = None
+        self._parar    = threading.Event()
+        self._thread   = None
+        self._callback = None
+
+    def iniciar(self, ao_atualizar):
+        self._callback = ao_atualizar
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="transporte-socket", daemon=True)
+            self._thread.start()
+
+    def _enviar(self, linhas: list):
+        with self._lock:
+            if self._sock is None:
+                return
+            try:
+                self._sock.sendall("".join(l + "\n" for l in linhas).encode("utf-8"))
+            except OSError:
+                self._sock = None
+
+    def assinar(self, itens: list):
+        novos = []
+        with self._lock:
+            for item in itens:
+                if item not in self._itens:
+                    self._itens.append(item)
+                    novos.append(item)
+        self._enviar([f"ADVISE {i}" for i in novos])
+
+    def parar(self):
+        self._parar.set()
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                sock = socket.create_connection(self.endereco, timeout=2)
+            except OSError as e:
+                print(f"[Aviso] servidor de cotações indisponível {self.endereco}: {e}")
+                self._parar.wait(1.0)
+                continue
+            sock.settimeout(None)
+            with self._lock:
+                self._sock = sock
+                itens = list(self._itens)
+            self._enviar([f"CONNECT {SERVICO_PROFIT}|{TOPICO_PROFIT}"] + [f"ADVISE {i}" for i in itens])
+
+            try:
+                for linha in sock.makefile("r", encoding="utf-8"):
+                    item, sep, valor = linha.rstrip("\n").partition("\t")
+                    if sep:
+                        self._callback(item, valor)
+            except OSError:
+                pass
+            with self._lock:
+                self._sock = None
+            sock.close()
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Feed: tabela em memória com a última cotação de cada ativo
+# —————————————————————————————————————————————————————————————————————————
+class FeedCotacoes:
+    """
+    Assina os campos de cada ativo uma única vez e mantém a tabela com a
+    última cotação, atualizada pelo transporte só com os campos alterados.
+    cotacao() é uma leitura em memória, sem I/O.
+    """
+
+    def __init__(self, transporte):
+        self.transporte = transporte
+        self._tabela    = {}
+        self._versao    = {}
+        self._cond      = threading.Condition()
+        self.transporte.iniciar(self._ao_atualizar)
+
+    def _ao_atualizar(self, item: str, raw: str):
+        ativo, _, tag = item.rpartition(".")
+        nome = _NOME_POR_TAG.get(tag)
+        if nome is None:
+            return
+        raw = raw.strip()
+        if nome in ("Data", "Hora"):
+            valor = raw
+        else:
+            try:
+                valor = tratar_valor_cotacao(raw)
+            except ValueError:
+                print(f"[ERRO] DDE {item}: valor inválido '{raw}'")
+                valor = None
+        with self._cond:
+            self._tabela.setdefault(ativo, {})[nome] = valor
+            self._versao[ativo] = self._versao.get(ativo, 0) + 1
+            self._cond.notify_all()
+
+    def assinar(self, ativo: str, timeout: float = 0.0) -> bool:
+        """
+        Assina todos os campos do ativo (idempotente). Na primeira assinatura
+        com timeout > 0, aguarda a cotação inicial completa. Retorna True se
+        o ativo já tem cotação completa.
+        """
+        with self._cond:
+            novo = ativo not in self._versao
+            self._versao.setdefault(ativo, 0)
+        if novo:
+            self.transporte.assinar(itens_do_ativo(ativo))
+            if timeout > 0:
+                with self._cond:
+                    return self._cond.wait_for(lambda: self._completa(ativo), timeout)
+        return self.cotacao(ativo) is not None
+
+    def _completa(self, ativo: str) -> bool:
+        return len(self._tabela.get(ativo, ())) == len(CAMPOS_DDE)
+
+    def cotacao(self, ativo: str) -> dict | None:
+        """Cópia da última cotação completa do ativo (None enquanto incompleta)."""
+        with self._cond:
+            if not self._completa(ativo):
+                return None
+            return dict(self._tabela[ativo])
+
+    def versao(self, ativo: str) -> int:
+        """Contador de atualizações recebidas para o ativo."""
+        with self._cond:
+            return self._versao.get(ativo, 0)
+
+    def aguardar(self, ativo: str, versao: int, timeout: float) -> bool:
+        """Bloqueia até chegar atualização posterior a 'versao' (ou timeout)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._versao.get(ativo, 0) > versao, timeout)
+
+    def parar(self):
+        self.transporte.parar()
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Servidor local que imita o tópico profitchart|cot (testes no Linux)
+# —————————————————————————————————————————————————————————————————————————
+def formatar_valor_profit(v) -> str:
+    """Formata número como o Profit exibe (ex.: 130.050,00)."""
+    if isinstance(v, str):
+        return v
+    return f"{v:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+class ServidorCotacoesSimulado:
+    """
+    Servidor TCP local com a tabela de itens 'ATIVO.TAG'. publicar()
+    altera valores e envia a cada cliente só os itens assinados que mudaram,
+    como um hot-link DDE.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", porta: int = 12001):
+        self._valores  = {}
+        self._clientes = {}          # handler → set de itens assinados
+        self._lock     = threading.Lock()
+        servidor = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.lock_envio = threading.Lock()
+
+            def enviar(self, pares):
+                dados = "".join(f"{i}\t{v}\n" for i, v in pares).encode("utf-8")
+                with self.lock_envio:
+                    try:
+                        self.wfile.write(dados)
+                        self.wfile.flush()
+                    except OSError:
+                        pass
+
+            def handle(self):
+                itens = set()
+                with servidor._lock:
+                    servidor._clientes[self] = itens
+                try:
+                    for linha in self.rfile:
+                        cmd, _, arg = linha.decode("utf-8").rstrip("\r\n").partition(" ")
+                        if cmd == "CONNECT" and arg != f"{SERVICO_PROFIT}|{TOPICO_PROFIT}":
+                            break
+                        if cmd == "ADVISE":
+                            with servidor._lock:
+                                itens.add(arg)
+                                atual = servidor._valores.get(arg)
+                            if atual is not None:
+                                self.enviar([(arg, atual)])
+                finally:
+                    with servidor._lock:
+                        servidor._clientes.pop(self, None)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._srv = socketserver.ThreadingTCPServer((host, porta), _Handler)
+        self._srv.daemon_threads = True
+        self.endereco = self._srv.server_address
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._srv.serve_forever, name="servidor-cotacoes", daemon=True)
+        self._thread.start()
+        return self
+
+    def publicar(self, ativo: str, campos: dict):
+        """Atualiza campos (nome legível → valor) e notifica só o que mudou."""
+        mudou = []
+        with self._lock:
+            for nome, v in campos.items():
+                item = f"{ativo}.{CAMPOS_DDE[nome]}"
+                raw = formatar_valor_profit(v)
+                if self._valores.get(item) != raw:
+                    self._valores[item] = raw
+                    mudou.append((item, raw))
+            destinos = [(h, [(i, v) for i, v in mudou if i in itens])
+                        for h, itens in self._clientes.items()]
+        for h, pares in destinos:
+            if pares:
+                h.enviar(pares)
+
+    def parar(self):
+        self._srv.shutdown()
+        self._srv.server_close()
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Execução isolada: servidor simulado com passeio aleatório
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import random
+    from datetime import datetime
+
+    ativo = sys.argv[1] if len(sys.argv) > 1 else "WINQ25"
+    porta = int(sys.argv[2]) if len(sys.argv) > 2 else 12001
+    srv = ServidorCotacoesSimulado(porta=porta).iniciar()
+    print(f"Servidor simulado {SERVICO_PROFIT}|{TOPICO_PROFIT} em {srv.endereco} ({ativo})")
+
+    preco = 130_000.0
+    abertura = maxi = mini = preco
+    negocios = 0
+    try:
+        while True:
+            preco += random.choice((-10, -5, 0, 0, 5, 10))
+            maxi, mini = max(maxi, preco), min(mini, preco)
+            negocios += random.randint(1, 20)
+            agora = datetime.now()
+            srv.publicar(ativo, {
+                "Data": agora.strftime("%d/%m/%Y"), "Hora": agora.strftime("%H:%M:%S"),
+                "Último": preco, "Abertura": abertura, "Máximo": maxi, "Mínimo": mini,
+                "Fechamento Anterior": abertura, "Variação": (preco / abertura - 1) * 100,
+                "Negócios": negocios, "Quantidade": negocios * 5, "Volume": negocios * 5 * preco * 0.2,
+                "Of. Compra": preco - 5, "Of. Venda": preco + 5,
+            })
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        srv.parar()
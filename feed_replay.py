@@ -0,0 +1,173 @@
+# feed_replay.py
+
+import io
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cache_historico import CacheHistorico, le_csv_profit
+from feed_cotacoes import CAMPOS_DDE
+from persistencia_ticks import COLUNAS_CSV
+
+
+def _le_journal(caminho: str) -> pd.DataFrame:
+    """Lê um journal de ticks (linhas do CSV do Profit sem cabeçalho)."""
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    dados = dados[:dados.rfind(b"\n") + 1]          # descarta linha incompleta
+    cabecalho = (";".join(COLUNAS_CSV) + "\n").encode("latin1")
+    return le_csv_profit(io.BytesIO(cabecalho + dados))
+
+
+class FeedReplay:
+    """
+    Feed que reproduz um histórico 1-min (ou journal de ticks) com a mesma
+    interface do FeedCotacoes. Cada avancar() libera no máximo uma linha,
+    então a sequência de ticks é sempre a mesma (determinística):
+
+      - velocidade > 0: a linha i só é liberada quando
+        (t_i - t_0) / velocidade segundos de relógio se passaram
+      - velocidade = 0: o mais rápido possível (uma linha por avancar())
+
+    historico() devolve as linhas anteriores ao início do replay, usadas
+    como histórico inicial no lugar do CSV.
+    """
+
+    def __init__(self, ativo: str, fluxo: pd.DataFrame, historico: pd.DataFrame,
+                 velocidade: float = 1.0):
+        self.ativo      = ativo
+        self.velocidade = max(0.0, float(velocidade))
+        self._historico = historico
+        self._ts        = fluxo["DataHora"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        self._cols      = {c: fluxo[c].to_numpy(dtype=np.float64)
+                           for c in ("Abertura", "Máximo", "Mínimo", "Fechamento",
+                                     "Volume", "Quantidade")}
+        self._pos       = -1          # -1: ainda no fim do histórico
+        self._t0_relogio = None
+
+    # ——————————————————————————————————————————————————————————————
+    # Controle do replay
+    # ——————————————————————————————————————————————————————————————
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    @property
+    def esgotado(self) -> bool:
+        return self._pos >= len(self._ts) - 1
+
+    def historico(self) -> pd.DataFrame:
+        return self._historico
+
+    def avancar(self) -> bool:
+        """Libera a próxima linha se já for a hora dela; retorna True se avançou."""
+        if self.esgotado:
+            return False
+        prox = self._pos + 1
+        if self.velocidade > 0:
+            agora = time.perf_counter()
+            if self._t0_relogio is None:
+                self._t0_relogio = agora
+            devido = (self._ts[prox] - self._ts[0]) / 1e9 / self.velocidade
+            if agora - self._t0_relogio < devido:
+                return False
+        self._pos = prox
+        return True
+
+    # ——————————————————————————————————————————————————————————————
+    # Interface do FeedCotacoes
+    # ——————————————————————————————————————————————————————————————
+    def assinar(self, ativo: str, timeout: float = 0.0) -> bool:
+        return ativo == self.ativo
+
+    def versao(self, ativo: str) -> int:
+        return self._pos + 1 if ativo == self.ativo else 0
+
+    def cotacao(self, ativo: str) -> dict | None:
+        """Tick da linha corrente no formato de obter_dados_dde."""
+        if ativo != self.ativo:
+            return None
+        if self._pos < 0:
+            if self._historico.empty:
+                return None
+            linha = self._historico.iloc[-1]
+            dt = pd.Timestamp(linha["DataHora"])
+            valores = {c: float(linha[c]) for c in self._cols}
+        else:
+            dt = pd.Timestamp(self._ts[self._pos])
+            valores = {c: float(arr[self._pos]) for c, arr in self._cols.items()}
+
+        tick = {nome: 0.0 for nome in CAMPOS_DDE}
+        tick.update(
+            Data=dt.strftime("%d/%m/%Y"),
+            Hora=dt.strftime("%H:%M:%S"),
+            Abertura=valores["Abertura"],
+            Máximo=valores["Máximo"],
+            Mínimo=valores["Mínimo"],
+            Volume=valores["Volume"],
+            Quantidade=valores["Quantidade"],
+        )
+        tick["Último"] = valores["Fechamento"]
+        return tick
+
+    def parar(self):
+        pass
+
+
+def carregar_replay(ativo: str, arquivo: str, csv_historico: str,
+                    velocidade: float = 1.0, inicio: str = "") -> FeedReplay:
+    """
+    Monta o FeedReplay a partir de um CSV 1-min ou de um journal de ticks.
+
+      - CSV: o replay começa em 'inicio' ('dd/mm/aaaa HH:MM[:SS]') ou, se
+        vazio, na abertura do último dia do arquivo; as linhas anteriores
+        viram o histórico inicial.
+      - journal ('*.journal*'): reproduz o journal inteiro; o histórico
+        inicial são as linhas do csv_historico anteriores ao primeiro tick.
+    """
+    if ".journal" in os.path.basename(arquivo):
+        fluxo = _le_journal(arquivo)
+        fluxo = fluxo[fluxo["DataHora"].notna()].reset_index(drop=True)
+        base  = CacheHistorico(csv_historico).carregar()
+        corte = fluxo["DataHora"].iat[0] if len(fluxo) else pd.Timestamp.max
+        return FeedReplay(ativo, fluxo, base[base["DataHora"] < corte].reset_index(drop=True), velocidade)
+
+    dados = CacheHistorico(arquivo).carregar()
+    if inicio:
+        fmt = "%d/%m/%Y %H:%M:%S" if inicio.count(":") == 2 else "%d/%m/%Y %H:%M"
+        corte = pd.Timestamp(datetime.strptime(inicio.strip(), fmt))
+    elif len(dados):
+        corte = dados["DataHora"].iat[-1].normalize()
+    else:
+        corte = pd.Timestamp.max
+    antes = dados["DataHora"] < corte
+    return FeedReplay(
+        ativo,
+        dados[~antes].reset_index(drop=True),
+        dados[antes].reset_index(drop=True),
+        velocidade,
+    )
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Execução isolada: python feed_replay.py <csv|journal> [velocidade] [inicio]
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+
+    arquivo    = sys.argv[1]
+    velocidade = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    inicio     = sys.argv[3] if len(sys.argv) > 3 else ""
+
+    feed = carregar_replay("REPLAY", arquivo, arquivo, velocidade, inicio)
+    print(f"histórico inicial: {len(feed.historico())} linhas | replay: {len(feed)} linhas")
+    t0 = time.perf_counter()
+    n = 0
+    while not feed.esgotado:
+        if feed.avancar():
+            feed.cotacao("REPLAY")
+            n += 1
+    dur = time.perf_counter() - t0
+    print(f"{n} ticks em {dur:.2f}s ({n / max(dur, 1e-9):,.0f} ticks/s)")
@@ -2,15 +2,16 @@
 # gestor_trade.py
 
 import sys
-import os
+from collections import deque
 from datetime import datetime
 import config
-from persistencia_operacoes import init_log, append_operacao, read_operacoes
-from planotrade import load_trade_plan, normalize_header
+from persistencia_operacoes import abrir_operacoes
+from planotrade import load_trade_plan
 from indicador_medias import COL_W
 from colorama import init as colorama_init, Fore, Style
-from executa_ordem import executar_compra, executar_venda
-from openpyxl import load_workbook
+from despachante_ordens import despachante_padrao, encerrar_despachante
+from gravador_carteira import GravadorCarteira
+from avaliador_risco import primeira_saida, niveis_plano
 
 # configura colorama
 colorama_init(autoreset=True)
@@ -24,291 +25,535 @@ def fmt_brl(v):
 diff_raw = config._cfg.get('TRADE', 'VALOR_PONTO_INDICE')
 VALOR_PONTO_INDICE = float(diff_raw.split('#',1)[0].strip())
 
-# estado global
-defaults = {
-    'open_position': False,
-    'entry_code': None,
-    'entry_decision': None,
-    'entry_score': 0,
-    'entry_price': 0.0,
-    'entry_breakeven_val': 0.0,
-    'entry_trailing_val': 0.0,
-    'current_price': 0.0,
-    'current_score': 0
-}
-globals().update(defaults)
-plan_data = {}
-plan_values = {}
-log_file_path = None
-last_record = None
-operations_executed = 0
-daily_pnl = 0.0
-max_ops = 0
-contracts = 1
 
-
-def init_gestor(excel_path: str):
-    """
-    Carrega plano de trade, inicializa arquivo de log diário e recupera histórico.
-    """
-    global plan_data, plan_values, log_file_path, last_record
-    global operations_executed, daily_pnl, max_ops, contracts
-
-    # carrega plano de trade
-    plan = load_trade_plan(excel_path)
-    plan_data = plan.copy()
-    plan_values = {
-        'stop_op':  plan['stop_op'],
-        'meta_op':  plan['meta_op'],
-        'stop_day': plan['stop_day'],
-        'meta_day': plan['meta_day']
-    }
-
-    # limites diários
-    contracts = plan_data.get('contratos', 1)
-    max_ops = plan_data.get('operacoes', 1)
-    operations_executed = 0
-    daily_pnl = 0.0
-
-    # inicializa log e lê histórico
-    log_file_path = init_log()
-    history = read_operacoes(log_file_path)
-    last_record = history[-1] if history else None
-
-
-def check_exits():
-    """
-    Verifica critérios de saída e, se atingidos, fecha posição,
-    registra no CSV e atualiza planilha.
+class TradeSession:
     """
-    global open_position, operations_executed, daily_pnl, last_record
+    Estado de trade de um ativo/estratégia: plano, limites diários,
+    posição aberta e preço/score correntes.
 
-    if not open_position:
-        return
+    Várias sessões independentes podem rodar no mesmo processo sobre o
+    mesmo feed e o mesmo grafo de indicadores (outros ativos, perfis
+    "sombra"):
 
-    # calcula lucro/prejuízo por contrato e diário
-    diff_price = (current_price - entry_price) if entry_decision == 'COMPRA' else (entry_price - current_price)
-    pl_per_contract = diff_price * VALOR_PONTO_INDICE
-    new_daily = daily_pnl + pl_per_contract
+      - enviar_ordens=False: não manda ordens (só simula)
+      - despachante: DespachanteOrdens próprio (padrão: o do processo,
+        com o backend do config.ini); as ordens saem fora do loop de ticks
+      - registrar=False: não grava o diário de operações
+      - planilha=False: não atualiza a CARTEIRA na planilha
 
-    # critérios de saída
-    hit_op = (pl_per_contract >= plan_values['meta_op']) or (pl_per_contract <= plan_values['stop_op'])
-    hit_day = (new_daily >= plan_values['meta_day']) or (new_daily <= plan_values['stop_day'])
+    A sessão principal (módulo: init_gestor, update_trade_state, ...) faz
+    tudo; sessões com outro nome gravam num diário próprio.
+    """
 
-    if hit_op or hit_day:
-        # fecha posição em todos contratos
-        for _ in range(contracts):
-            if entry_decision == 'COMPRA':
-                executar_venda()
-            else:
-                executar_compra()
-        open_position = False
+    __slots__ = (
+        'nome', 'enviar_ordens', 'registrar', 'planilha', 'valor_ponto',
+        'operacoes', 'gravador', 'despachante', 'ordens', 'ordem_entrada', 'saida_adiada', 'saida_pendente',
+        'execucao', 'deslize',
+        'plan_data', 'plan_values', 'last_record',
+        'operations_executed', 'daily_pnl', 'max_ops', 'contracts',
+        'open_position', 'entry_qty', 'entry_code', 'entry_decision', 'entry_score', 'entry_price',
+        'entry_breakeven_val', 'entry_trailing_val', 'current_price', 'current_score',
+    )
+
+    def __init__(self, nome: str = 'principal', enviar_ordens: bool = True,
+                 registrar: bool = True, planilha: bool = True,
+                 valor_ponto: float = VALOR_PONTO_INDICE, despachante=None):
+        self.nome          = nome
+        self.enviar_ordens = enviar_ordens
+        self.registrar     = registrar
+        self.planilha      = planilha
+        self.valor_ponto   = valor_ponto
+        self.operacoes     = None      # BancoOperacoes (diário de operações)
+        self.gravador      = None      # grava a CARTEIRA fora do loop de ticks
+        self.despachante   = despachante
+        self.ordens        = deque()   # ordens concluídas (preenchida pelo despachante)
+        self.ordem_entrada = None
+        self.saida_adiada  = None      # (preço, quando) da saída decidida antes da entrada voltar
+        self.saida_pendente = None     # ordem de saída ainda sem retorno
+        self.execucao      = 0         # registros já gravados da operação (saída em partes)
+        self.deslize       = 0.0       # pontos perdidos (ou ganhos) entre decisão e execução
+        self.plan_data     = {}
+        self.plan_values   = {}
+        self.last_record   = None
+        self.operations_executed = 0
+        self.daily_pnl     = 0.0
+        self.max_ops       = 0
+        self.contracts     = 1
+        self.open_position = False
+        self.entry_qty     = 0         # contratos da posição (os executados na entrada)
+        self.entry_code    = None
+        self.entry_decision = None
+        self.entry_score   = 0
+        self.entry_price   = 0.0
+        self.entry_breakeven_val = 0.0
+        self.entry_trailing_val  = 0.0
+        self.current_price = 0.0
+        self.current_score = 0
+
+    # ——————————————————————————————————————————————————————————————
+    # Ciclo de vida
+    # ——————————————————————————————————————————————————————————————
+    def configurar_plano(self, plan: dict):
+        """Stops/metas e limites diários do plano de trade (load_trade_plan)."""
+        self.plan_data = plan.copy()
+        self.plan_values = {
+            'stop_op':  plan['stop_op'],
+            'meta_op':  plan['meta_op'],
+            'stop_day': plan['stop_day'],
+            'meta_day': plan['meta_day']
+        }
 
-        # atualiza contagem e acumulado
-        operations_executed += 1
-        daily_pnl = new_daily
-        op_num = operations_executed
+        # limites diários
+        self.contracts = self.plan_data.get('contratos', 1)
+        self.max_ops = self.plan_data.get('operacoes', 1)
+        self.operations_executed = 0
+        self.daily_pnl = 0.0
+
+    def iniciar(self, excel_path: str):
+        """
+        Carrega plano de trade, abre o diário de operações e recupera o histórico do dia.
+        """
+        self.configurar_plano(load_trade_plan(excel_path))
+
+        # abre o diário (a principal importa CSVs diários antigos) e lê o histórico do dia
+        if self.registrar and self.operacoes is None:
+            principal = self.nome == 'principal'
+            self.operacoes = abrir_operacoes(importar=principal, sessao=None if principal else self.nome)
+        history = self.operacoes.do_dia() if self.operacoes is not None else []
+        self.last_record = history[-1] if history else None
+
+        # gravação da planilha em segundo plano
+        if self.planilha and self.gravador is None:
+            self.gravador = GravadorCarteira(config.FALCAO_EXCEL_PATH, self.plan_data.get('sheet'),
+                                             config.CARTEIRA_RETENTATIVA)
+            self.gravador.iniciar()
+
+    def encerrar(self):
+        """Para a gravação em segundo plano, gravando a CARTEIRA pendente, e fecha o diário."""
+        if self.gravador is not None:
+            self.gravador.encerrar()
+            self.gravador = None
+        if self.operacoes is not None:
+            self.operacoes.fechar()
+            self.operacoes = None
+
+    # ——————————————————————————————————————————————————————————————
+    # Por tick
+    # ——————————————————————————————————————————————————————————————
+    def _ordem(self, lado: str, motivo: str, contexto=None, quantidade: int = None):
+        """Uma ordem (padrão: todos os contratos), enviada fora do loop (não bloqueia)."""
+        if not self.enviar_ordens:
+            return None
+        if self.despachante is None:
+            self.despachante = despachante_padrao()
+        return self.despachante.enviar(lado, quantidade or self.contracts, self.current_price,
+                                       ao_concluir=self.ordens.append, motivo=motivo, contexto=contexto)
+
+    def _conferir_ordens(self):
+        """
+        Retorno das ordens concluídas desde o último tick: a posição passa
+        a ter os contratos executados na entrada, ao preço médio quando o
+        backend o informa (corretora simulada); uma saída decidida antes
+        disso é enviada agora, com esses contratos. A saída só é
+        registrada pelos contratos que executou (o P&L sai das execuções,
+        não do preço da decisão).
+        """
+        while self.ordens:
+            ordem = self.ordens.popleft()
+            if ordem.estado != 'EXECUTADA':
+                print(f"[Aviso] {self.nome}: {ordem} {ordem.erro or ''}")
+            if ordem.motivo == 'ENTRADA' and ordem is self.ordem_entrada:
+                self.ordem_entrada = None
+                adiada, self.saida_adiada = self.saida_adiada, None
+                if not ordem.executadas and self.open_position:
+                    # nada executado: não há posição para gerenciar
+                    self.open_position = False
+                else:
+                    self.entry_qty = ordem.executadas
+                    if ordem.preco_medio is not None:
+                        self.entry_price = ordem.preco_medio
+                    if adiada is not None and self.open_position:
+                        self._sair(*adiada)
+            elif ordem.motivo == 'SAIDA' and ordem.contexto is not None:
+                self._concluir_saida(ordem)
+            if ordem.preco_medio is not None:
+                sinal = 1 if ordem.lado == 'COMPRA' else -1
+                self.deslize += sinal * (ordem.preco_medio - ordem.preco_ref) * ordem.executadas
+
+    def _concluir_saida(self, ordem):
+        """
+        Saída concluída: registra o P&L dos contratos executados e, se
+        faltou executar algum, reabre a posição com o que sobrou para o
+        próximo tick tentar a saída de novo (mesmo número de operação,
+        próximo número de execução no diário).
+        """
+        decisao, entrada, qtd, op_num, quando, nivel = ordem.contexto
+        if self.saida_pendente is ordem:
+            self.saida_pendente = None
+
+        fechados = min(ordem.executadas, qtd)
+        if fechados:
+            # sem preço executado (hotkey, dry-run), vale o nível da saída
+            preco = ordem.preco_medio if ordem.preco_medio is not None else nivel
+            diff = (preco - entrada) if decisao == 'COMPRA' else (entrada - preco)
+            self._registrar_saida(op_num, diff * self.valor_ponto * fechados / self.contracts, quando)
+
+        resta = qtd - fechados
+        if resta > 0:
+            print(f"[Aviso] {self.nome}: saída da operação {op_num} incompleta; "
+                  f"{resta} contrato(s) seguem em posição")
+            self.open_position  = True
+            self.entry_decision = decisao
+            self.entry_price    = entrada
+            self.entry_qty      = resta
+            self.operations_executed -= 1
+
+    def _registrar_saida(self, op_num: int, pl_per_contract: float, quando):
+        """Soma o P&L da operação, grava no diário e agenda a CARTEIRA na planilha."""
+        self.daily_pnl += pl_per_contract
+        pv = self.plan_values
 
         # prepara registro
         registro = {
             'hora':        datetime.now().strftime('%H:%M:%S'),
             'op_num':      op_num,
-            'carteira':    plan_data['carteira'] + daily_pnl,
-            'banca':       daily_pnl,
-            'contratos':   contracts,
-            'operacoes':   max_ops,
-            'stop_op':     plan_values['stop_op'],
-            'meta_op':     plan_values['meta_op'],
-            'stop_diario': plan_values['stop_day'],
-            'meta_diaria': plan_values['meta_day']
+            'carteira':    self.plan_data['carteira'] + self.daily_pnl,
+            'banca':       self.daily_pnl,
+            'contratos':   self.contracts,
+            'operacoes':   self.max_ops,
+            'stop_op':     pv['stop_op'],
+            'meta_op':     pv['meta_op'],
+            'stop_diario': pv['stop_day'],
+            'meta_diaria': pv['meta_day'],
+            'execucao':    self.execucao
         }
-        append_operacao(log_file_path, registro)
-        last_record = registro
+        self.execucao += 1
+        if self.operacoes is not None:
+            self.operacoes.anexar(registro, quando)
+        self.last_record = registro
 
         # atualiza célula resumo na planilha (linha 2, coluna CARTEIRA)
-        try:
-            path = os.path.expanduser(os.path.expandvars(config.FALCAO_EXCEL_PATH))
-            wb = load_workbook(path)
-            ws = wb[plan_data.get('sheet')] if plan_data.get('sheet') in wb.sheetnames else wb.active
-            col_idx = None
-            for cell in ws[1]:
-                if normalize_header(cell.value) == 'CARTEIRA':
-                    col_idx = cell.col_idx
-                    break
-            if col_idx:
-                cell = ws.cell(row=2, column=col_idx)
-                cell.value = registro['carteira']
-                cell.number_format = '#,##0.00'
-                wb.save(path)
-        except Exception as e:
-            print(f"Erro salvando Excel: {e}")
-
-
-def update_trade_state(scenario, last_price: float):
-    """
-    Atualiza preço/score, tenta saídas e abre nova entrada conforme limites.
-    """
-    global open_position, entry_code, entry_decision, entry_score, entry_price
-    global entry_breakeven_val, entry_trailing_val, current_price, current_score
-
-    current_price = last_price
-    current_score = int(scenario.get('SCORE') or 0)
-    dec = str(scenario.get('DECISAO','')).strip().upper()
-
-    # checa stop/meta
-    check_exits()
-    if open_position:
-        return
-
-    # nova entrada
-    if operations_executed < max_ops and dec in ('COMPRA','VENDA'):
-        for _ in range(contracts):
-            if dec == 'COMPRA':
-                executar_compra()
-            else:
-                executar_venda()
-        open_position = True
-        entry_code = scenario.get('CODIGO')
-        entry_decision = dec
-        entry_score = current_score
-        entry_price = current_price
-        entry_breakeven_val = float(scenario.get('BREAKEVEN') or 0)
-        entry_trailing_val = float(scenario.get('TRAILING') or 0)
-
+        # sem bloquear o loop: o gravador salva em segundo plano
+        if self.gravador is not None:
+            self.gravador.agendar('CARTEIRA', registro['carteira'])
+
+    def niveis_saida(self) -> tuple:
+        """
+        Preços (stop, alvo) da posição aberta: o mais próximo entre o
+        stop/meta da operação e o que falta para o stop/meta do dia.
+        """
+        return niveis_plano(self.plan_values, self.entry_decision, self.entry_price,
+                            self.daily_pnl, self.valor_ponto)
+
+    def check_exits(self, forcar_saida: bool = False, quando=None, faixa=None):
+        """
+        Verifica critérios de saída e, se atingidos, fecha posição,
+        registra no diário de operações (com a DataHora 'quando' do tick)
+        e agenda a atualização da planilha (gravada em segundo plano).
+        forcar_saida fecha a posição mesmo sem stop/meta (saída do perfil sniper).
+        Com envio de ordens, a saída só sai depois do retorno da entrada
+        (com a quantidade executada) e o registro espera o retorno da
+        saída (ver _concluir_saida).
+
+        faixa=(mínimas, máximas) dos ticks/intervalos desde a última
+        avaliação: stop ou meta tocado entre polls (ou durante um
+        travamento) também fecha, ao preço do nível. Sem faixa, só o
+        preço corrente é avaliado.
+        """
+        if not self.open_position or self.saida_adiada is not None:
+            return
+
+        # critérios de saída (operação e dia) como níveis de preço
+        stop, alvo = self.niveis_saida()
+        minimas, maximas = faixa if faixa is not None else ((self.current_price,), (self.current_price,))
+        saida = primeira_saida(minimas, maximas, self.entry_decision, stop, alvo)
+
+        if saida is None and not forcar_saida:
+            return
+        preco = saida[2] if saida is not None else self.current_price
+        if self.ordem_entrada is not None:
+            # entrada ainda no despachante: sai quando ela voltar, com o executado
+            self.saida_adiada = (preco, quando)
+            return
+        self._sair(preco, quando)
+
+    def _sair(self, preco: float, quando):
+        """Fecha a posição (entry_qty contratos) no preço 'preco' da saída."""
+        # lucro/prejuízo por contrato no preço da saída
+        diff_price = (preco - self.entry_price) if self.entry_decision == 'COMPRA' \
+            else (self.entry_price - preco)
+        pl_per_contract = diff_price * self.valor_ponto
+
+        self.open_position = False
+        self.operations_executed += 1
+        op_num = self.operations_executed
+        lado = 'VENDA' if self.entry_decision == 'COMPRA' else 'COMPRA'
+        contexto = (self.entry_decision, self.entry_price, self.entry_qty, op_num, quando, preco)
+        self.saida_pendente = self._ordem(lado, 'SAIDA', contexto, self.entry_qty)
+        if self.saida_pendente is None:
+            # sem envio de ordens (simulação, backtest): fecha no preço da saída
+            self._registrar_saida(op_num, pl_per_contract, quando)
+
+    def posicao_aberta(self) -> str | None:
+        """'COMPRA'/'VENDA' da posição aberta, ou None."""
+        return self.entry_decision if self.open_position else None
+
+    def update_trade_state(self, scenario, last_price: float, sair: bool = False, quando=None,
+                           faixa=None):
+        """
+        Atualiza preço/score, tenta saídas e abre nova entrada conforme limites.
+        sair=True encerra a posição aberta (timeframe de saída do perfil sniper).
+        'quando' é a DataHora do tick (registrada no diário se a posição fechar).
+        'faixa' = (mínimas, máximas) desde o tick anterior (ver check_exits).
+        """
+        self.current_price = last_price
+        self.current_score = int(scenario.get('SCORE') or 0)
+        self._conferir_ordens()
+        dec = str(scenario.get('DECISAO','')).strip().upper()
+
+        # checa stop/meta (e a saída do perfil)
+        self.check_exits(forcar_saida=sair, quando=quando, faixa=faixa)
+        if self.open_position or self.saida_pendente is not None:
+            return
+
+        # nova entrada
+        if self.operations_executed < self.max_ops and dec in ('COMPRA','VENDA'):
+            self.ordem_entrada = self._ordem(dec, 'ENTRADA')
+            self.open_position = True
+            self.entry_qty = self.contracts
+            self.execucao = 0
+            self.entry_code = scenario.get('CODIGO')
+            self.entry_decision = dec
+            self.entry_score = self.current_score
+            self.entry_price = self.current_price
+            self.entry_breakeven_val = float(scenario.get('BREAKEVEN') or 0)
+            self.entry_trailing_val = float(scenario.get('TRAILING') or 0)
+
+    # ——————————————————————————————————————————————————————————————
+    # Painel
+    # ——————————————————————————————————————————————————————————————
+    def draw_operacao(self, start_row: int = 1):
+        """
+        Desenha painel FALCAO (EM OPERAÇÃO / GESTAO LUCRO)
+        e linha OPERACAO do PLANO DE TRADE.
+        """
+        top = start_row + 7
+        b1 = COL_W + 1
+        b2 = b1 + (COL_W + 1)
+        b3 = b2 + (COL_W + 1)
+
+        # limpa painel FALCAO
+        for i in range(6):
+            row = top + 2 + i
+            sys.stdout.write(f"\x1b[{row};{b2}H{'':^{COL_W}}")
+            sys.stdout.write(f"\x1b[{row};{b3}H{'':^{COL_W}}")
+        sys.stdout.flush()
 
-def draw_operacao(start_row: int = 1):
-    """
-    Desenha painel FALCAO (EM OPERAÇÃO / GESTAO LUCRO)
-    e linha OPERACAO do PLANO DE TRADE.
-    """
-    top = start_row + 7
-    b1 = COL_W + 1
-    b2 = b1 + (COL_W + 1)
-    b3 = b2 + (COL_W + 1)
-
-    # limpa painel FALCAO
-    for i in range(6):
-        row = top + 2 + i
-        sys.stdout.write(f"\x1b[{row};{b2}H{'':^{COL_W}}")
-        sys.stdout.write(f"\x1b[{row};{b3}H{'':^{COL_W}}")
-    sys.stdout.flush()
-
-    # desenha FALCAO se houver posição
-    if open_position:
-        op_vals = [
-            str(entry_code),
-            entry_decision,
-            str(entry_score),
-            f"{entry_price:.0f}",
-            f"{entry_breakeven_val:.0f}",
-            f"{entry_trailing_val:.0f}"
-        ]
-        diff_score = current_score - entry_score
-        diff_price = (current_price - entry_price) if entry_decision=='COMPRA' else (entry_price - current_price)
-        valor_operacao = diff_price * VALOR_PONTO_INDICE
-        brk_price = entry_price + (entry_breakeven_val if entry_decision=='COMPRA' else -entry_breakeven_val)
-        trl_price = entry_price + (entry_trailing_val if entry_decision=='COMPRA' else -entry_trailing_val)
-
-        # formata diff_score
-        if diff_score>0:
-            diff_score_str = Fore.GREEN + str(diff_score).center(COL_W) + Style.RESET_ALL
-        elif diff_score<0:
-            diff_score_str = Fore.RED + str(diff_score).center(COL_W) + Style.RESET_ALL
-        else:
-            diff_score_str = ' '*COL_W
-
-        # formata valor operacao
-        raw_vo = f"{valor_operacao:,.2f}".center(COL_W)
-        if valor_operacao>0:
-            val_op_str = Fore.GREEN + raw_vo + Style.RESET_ALL
-        elif valor_operacao<0:
-            val_op_str = Fore.RED + raw_vo + Style.RESET_ALL
+        # desenha FALCAO se houver posição
+        if self.open_position:
+            op_vals = [
+                str(self.entry_code),
+                self.entry_decision,
+                str(self.entry_score),
+                f"{self.entry_price:.0f}",
+                f"{self.entry_breakeven_val:.0f}",
+                f"{self.entry_trailing_val:.0f}"
+            ]
+            diff_score = self.current_score - self.entry_score
+            diff_price = (self.current_price - self.entry_price) if self.entry_decision=='COMPRA' else (self.entry_price - self.current_price)
+            valor_operacao = diff_price * self.valor_ponto
+            brk_price = self.entry_price + (self.entry_breakeven_val if self.entry_decision=='COMPRA' else -self.entry_breakeven_val)
+            trl_price = self.entry_price + (self.entry_trailing_val if self.entry_decision=='COMPRA' else -self.entry_trailing_val)
+
+            # formata diff_score
+            if diff_score>0:
+                diff_score_str = Fore.GREEN + str(diff_score).center(COL_W) + Style.RESET_ALL
+            elif diff_score<0:
+                diff_score_str = Fore.RED + str(diff_score).center(COL_W) + Style.RESET_ALL
+            else:
+                diff_score_str = ' '*COL_W
+
+            # formata valor operacao
+            raw_vo = f"{valor_operacao:,.2f}".center(COL_W)
+            if valor_operacao>0:
+                val_op_str = Fore.GREEN + raw_vo + Style.RESET_ALL
+            elif valor_operacao<0:
+                val_op_str = Fore.RED + raw_vo + Style.RESET_ALL
+            else:
+                val_op_str = raw_vo
+
+            gl_vals = [
+                ' '*COL_W,
+                val_op_str,
+                diff_score_str,
+                f"{diff_price:.0f}".center(COL_W),
+                f"{brk_price:.0f}".center(COL_W),
+                f"{trl_price:.0f}".center(COL_W)
+            ]
+            for i,(op,gl) in enumerate(zip(op_vals,gl_vals)):
+                row = top+2+i
+                txt = op.center(COL_W)
+                if i==1:
+                    txt = (Fore.GREEN+txt+Style.RESET_ALL) if self.entry_decision=='COMPRA' else (Fore.RED+txt+Style.RESET_ALL)
+                sys.stdout.write(f"\x1b[{row};{b2}H{txt}")
+                sys.stdout.write(f"\x1b[{row};{b3}H{gl}")
+            sys.stdout.flush()
+
+        # exibe linha OPERACAO no PLANO DE TRADE
+        plan_start = start_row+17
+        w = 12
+        car_col = 1 + (w+1)*1 + 1
+        ban_col = 1 + (w+1)*2 + 1
+        ctr_col = 1 + (w+1)*3 + 1
+        op_col  = 1 + (w+1)*4 + 1
+        stopop_col  = 1 + (w+1)*5 + 1
+        metaop_col  = 1 + (w+1)*6 + 1
+        stopday_col = 1 + (w+1)*7 + 1
+        metaday_col = 1 + (w+1)*8 + 1
+        oper_row = plan_start + 5
+
+        # define valores
+        if self.open_position:
+            diff_price = (self.current_price-self.entry_price) if self.entry_decision=='COMPRA' else (self.entry_price-self.current_price)
+            val_op = diff_price * self.valor_ponto
+            new_car = self.plan_data['carteira'] + val_op
+            ban = self.plan_data['banca']
+            op_num = self.operations_executed + 1
+        elif self.last_record:
+            new_car = self.last_record['carteira']
+            ban = self.last_record['banca']
+            op_num = self.last_record.get('op_num',0)
         else:
-            val_op_str = raw_vo
-
-        gl_vals = [
-            ' '*COL_W,
-            val_op_str,
-            diff_score_str,
-            f"{diff_price:.0f}".center(COL_W),
-            f"{brk_price:.0f}".center(COL_W),
-            f"{trl_price:.0f}".center(COL_W)
-        ]
-        for i,(op,gl) in enumerate(zip(op_vals,gl_vals)):
-            row = top+2+i
-            txt = op.center(COL_W)
-            if i==1:
-                txt = (Fore.GREEN+txt+Style.RESET_ALL) if entry_decision=='COMPRA' else (Fore.RED+txt+Style.RESET_ALL)
-            sys.stdout.write(f"\x1b[{row};{b2}H{txt}")
-            sys.stdout.write(f"\x1b[{row};{b3}H{gl}")
+            new_car = self.plan_data['carteira']
+            ban = self.plan_data['banca']
+            op_num = 0
+
+        # escreve CARTEIRA/BANCA/CONTRATOS/OPERACOES
+        raw_car = fmt_brl(new_car)
+        car_txt = (
+            Fore.GREEN+raw_car+Style.RESET_ALL if ban>0 else
+            Fore.RED+raw_car+Style.RESET_ALL if ban<0 else
+            raw_car
+        )
+        raw_ban = fmt_brl(ban)
+        ban_txt = (
+            Fore.GREEN+raw_ban+Style.RESET_ALL if ban>0 else
+            Fore.RED+raw_ban+Style.RESET_ALL if ban<0 else
+            raw_ban
+        )
+        txt_ctr = str(self.contracts).center(w)
+        txt_op  = str(op_num).center(w)
+
+        sys.stdout.write(f"\x1b[{oper_row};{car_col}H{car_txt}")
+        sys.stdout.write(f"\x1b[{oper_row};{ban_col}H{ban_txt}")
+        sys.stdout.write(f"\x1b[{oper_row};{ctr_col}H{txt_ctr}")
+        sys.stdout.write(f"\x1b[{oper_row};{op_col}H{txt_op}")
+
+        # limpa STOP OP e META OP
+        sys.stdout.write(f"\x1b[{oper_row};{stopop_col}H{'':^{w}}")
+        sys.stdout.write(f"\x1b[{oper_row};{metaop_col}H{'':^{w}}")
+        # escreve P&L operação em STOP OP ou META OP
+        if self.open_position and val_op<0:
+            sys.stdout.write(f"\x1b[{oper_row};{stopop_col}H" + Fore.RED + fmt_brl(val_op) + Style.RESET_ALL)
+        elif self.open_position and val_op>0:
+            sys.stdout.write(f"\x1b[{oper_row};{metaop_col}H" + Fore.GREEN + fmt_brl(val_op) + Style.RESET_ALL)
+
+        # limpa STOP DIARIO e META DIARIA
+        sys.stdout.write(f"\x1b[{oper_row};{stopday_col}H{'':^{w}}")
+        sys.stdout.write(f"\x1b[{oper_row};{metaday_col}H{'':^{w}}")
+        # escreve P&L diário em STOP DIARIO ou META DIARIA
+        if self.daily_pnl<0:
+            sys.stdout.write(f"\x1b[{oper_row};{stopday_col}H" + Fore.RED + fmt_brl(self.daily_pnl) + Style.RESET_ALL)
+        elif self.daily_pnl>0:
+            sys.stdout.write(f"\x1b[{oper_row};{metaday_col}H" + Fore.GREEN + fmt_brl(self.daily_pnl) + Style.RESET_ALL)
+
         sys.stdout.flush()
 
-    # exibe linha OPERACAO no PLANO DE TRADE
-    plan_start = start_row+17
-    w = 12
-    car_col = 1 + (w+1)*1 + 1
-    ban_col = 1 + (w+1)*2 + 1
-    ctr_col = 1 + (w+1)*3 + 1
-    op_col  = 1 + (w+1)*4 + 1
-    stopop_col  = 1 + (w+1)*5 + 1
-    metaop_col  = 1 + (w+1)*6 + 1
-    stopday_col = 1 + (w+1)*7 + 1
-    metaday_col = 1 + (w+1)*8 + 1
-    oper_row = plan_start + 5
-
-    # define valores
-    if open_position:
-        diff_price = (current_price-entry_price) if entry_decision=='COMPRA' else (entry_price-current_price)
-        val_op = diff_price * VALOR_PONTO_INDICE
-        new_car = plan_data['carteira'] + val_op
-        ban = plan_data['banca']
-        op_num = operations_executed + 1
-    elif last_record:
-        new_car = last_record['carteira']
-        ban = last_record['banca']
-        op_num = last_record.get('op_num',0)
-    else:
-        new_car = plan_data['carteira']
-        ban = plan_data['banca']
-        op_num = 0
-
-    # escreve CARTEIRA/BANCA/CONTRATOS/OPERACOES
-    raw_car = fmt_brl(new_car)
-    car_txt = (
-        Fore.GREEN+raw_car+Style.RESET_ALL if ban>0 else
-        Fore.RED+raw_car+Style.RESET_ALL if ban<0 else
-        raw_car
-    )
-    raw_ban = fmt_brl(ban)
-    ban_txt = (
-        Fore.GREEN+raw_ban+Style.RESET_ALL if ban>0 else
-        Fore.RED+raw_ban+Style.RESET_ALL if ban<0 else
-        raw_ban
-    )
-    txt_ctr = str(contracts).center(w)
-    txt_op  = str(op_num).center(w)
-
-    sys.stdout.write(f"\x1b[{oper_row};{car_col}H{car_txt}")
-    sys.stdout.write(f"\x1b[{oper_row};{ban_col}H{ban_txt}")
-    sys.stdout.write(f"\x1b[{oper_row};{ctr_col}H{txt_ctr}")
-    sys.stdout.write(f"\x1b[{oper_row};{op_col}H{txt_op}")
-
-    # limpa STOP OP e META OP
-    sys.stdout.write(f"\x1b[{oper_row};{stopop_col}H{'':^{w}}")
-    sys.stdout.write(f"\x1b[{oper_row};{metaop_col}H{'':^{w}}")
-    # escreve P&L operação em STOP OP ou META OP
-    if open_position and val_op<0:
-        sys.stdout.write(f"\x1b[{oper_row};{stopop_col}H" + Fore.RED + fmt_brl(val_op) + Style.RESET_ALL)
-    elif open_position and val_op>0:
-        sys.stdout.write(f"\x1b[{oper_row};{metaop_col}H" + Fore.GREEN + fmt_brl(val_op) + Style.RESET_ALL)
-
-    # limpa STOP DIARIO e META DIARIA
-    sys.stdout.write(f"\x1b[{oper_row};{stopday_col}H{'':^{w}}")
-    sys.stdout.write(f"\x1b[{oper_row};{metaday_col}H{'':^{w}}")
-    # escreve P&L diário em STOP DIARIO ou META DIARIA
-    if daily_pnl<0:
-        sys.stdout.write(f"\x1b[{oper_row};{stopday_col}H" + Fore.RED + fmt_brl(daily_pnl) + Style.RESET_ALL)
-    elif daily_pnl>0:
-        sys.stdout.write(f"\x1b[{oper_row};{metaday_col}H" + Fore.GREEN + fmt_brl(daily_pnl) + Style.RESET_ALL)
-
-    sys.stdout.flush()
+
+# —————————————————————————————————————————————————————————————————————————
+# Sessão principal (a que o falcon desenha e que envia ordens)
+# —————————————————————————————————————————————————————————————————————————
+sessao = TradeSession()
+
+
+def init_gestor(excel_path: str):
+    sessao.iniciar(excel_path)
+
+
+def encerrar_gestor():
+    sessao.encerrar()
+    encerrar_despachante()
+
+
+def check_exits(forcar_saida: bool = False, quando=None, faixa=None):
+    sessao.check_exits(forcar_saida, quando, faixa)
+
+
+def posicao_aberta() -> str | None:
+    return sessao.posicao_aberta()
+
+
+def update_trade_state(scenario, last_price: float, sair: bool = False, quando=None, faixa=None):
+    sessao.update_trade_state(scenario, last_price, sair, quando, faixa)
+
+
+def draw_operacao(start_row: int = 1):
+    sessao.draw_operacao(start_row)
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Várias sessões "sombra" sobre o mesmo feed: custo por tick
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import time
+    import numpy as np
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = np.random.default_rng(20)
+    precos = 128_000 + np.cumsum(rng.choice([-5.0, 0.0, 5.0], n))
+    decisoes = rng.choice(['COMPRA', 'VENDA', 'AGUARDA'], n, p=[0.02, 0.02, 0.96])
+    cenarios = [{'CODIGO': f"C{i % 97}", 'DECISAO': d, 'SCORE': i % 7, 'BREAKEVEN': 50, 'TRAILING': 100}
+                for i, d in enumerate(decisoes)]
+    plano = {'carteira': 1000.0, 'banca': 1000.0, 'contratos': 1, 'operacoes': 40,
+             'stop_op': -30.0, 'meta_op': 60.0, 'stop_day': -300.0, 'meta_day': 600.0}
+
+    for qtd in (1, 8, 32):
+        sessoes = []
+        for k in range(qtd):
+            s = TradeSession(f"sombra{k}", enviar_ordens=False, registrar=False, planilha=False)
+            s.configurar_plano(dict(plano, stop_op=-10.0 - 5 * k, meta_op=20.0 + 10 * k))
+            sessoes.append(s)
+        t0 = time.perf_counter()
+        for i in range(n):
+            for s in sessoes:
+                s.update_trade_state(cenarios[i], precos[i], sair=False)
+        us = (time.perf_counter() - t0) / n * 1e6
+        ops = [s.operations_executed for s in sessoes]
+        print(f"{qtd:>3} sessões: {us:6.2f} us/tick ({us / qtd:5.2f} us por sessão) | "
+              f"operações por sessão: {min(ops)}-{max(ops)} | P&L: "
+              f"{min(s.daily_pnl for s in sessoes):.0f} a {max(s.daily_pnl for s in sessoes):.0f}")
+
+    # corretora de papel no mesmo fluxo: P&L pelas execuções x pelo preço da decisão
+    from despachante_ordens import DespachanteOrdens
+    from corretora_simulada import CorretoraSimulada
+
+    ts = np.datetime64("2025-03-10T09:05:00", "ns").astype(np.int64) + \
+        np.cumsum(rng.exponential(125, n).astype(np.int64) * 1_000_000 + 1_000_000)
+    print(f"{'latência':>9} | {'deslize':>7} | {'P&L papel':>9} | {'P&L decisão':>11} | ops | atraso médio")
+    for latencia in (0, 200, 1000):
+        desp  = DespachanteOrdens(CorretoraSimulada(latencia_ms=latencia, deslize_ticks=1, espera_max=1))
+        papel = TradeSession('papel', registrar=False, planilha=False, despachante=desp)
+        ideal = TradeSession('ideal', enviar_ordens=False, registrar=False, planilha=False)
+        for s in (papel, ideal):
+            s.configurar_plano(plano)
+        for i in range(n):
+            desp.tick(ts[i], precos[i])
+            for s in (papel, ideal):
+                s.update_trade_state(cenarios[i], precos[i])
+            if desp.pendentes() or desp.backend.pendentes():
+                time.sleep(0)              # deixa a thread do despachante andar
+        desp.encerrar()
+        papel._conferir_ordens()
+        rel = desp.backend.relatorio()
+        print(f"{latencia:>6} ms | {papel.deslize:7.0f} | {papel.daily_pnl:9.2f} | {ideal.daily_pnl:11.2f} | "
+              f"{papel.operations_executed:>3} | {rel.get('atraso_ms', 0):.0f} ms")
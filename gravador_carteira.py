@@ -0,0 +1,189 @@
+# gravador_carteira.py
+
+import os
+import threading
+import time
+
+from openpyxl import load_workbook
+
+from planotrade import normalize_header
+
+
+class GravadorCarteira:
+    """
+    Gravação em segundo plano (write-behind) das células-resumo da aba
+    PLANOTRADE (linha 2, ex.: CARTEIRA) na planilha do Falcão.
+
+      - agendar(coluna, valor) só guarda o valor pendente e acorda a
+        thread: o loop de ticks nunca abre nem salva a planilha
+      - valores agendados antes da gravação se fundem (vale o último de
+        cada coluna), então várias saídas seguidas viram um só save
+      - planilha travada (aberta/salvando no Excel → PermissionError) ou
+        outra falha de E/S: o pendente é mantido e a gravação é tentada de
+        novo a cada 'retentativa' segundos, sempre com os valores mais novos
+      - encerrar() para a thread e faz a última gravação do que ficou pendente
+    """
+
+    def __init__(self, caminho: str, aba: str | None = None, retentativa: float = 2.0):
+        self.caminho     = os.path.expanduser(os.path.expandvars(caminho))
+        self.aba         = aba
+        self.retentativa = retentativa
+        self.gravacoes   = 0
+        self.fundidos    = 0
+        self.falhas      = 0
+        self._lock       = threading.Lock()      # protege _pendentes
+        self._pendentes  = {}                    # coluna normalizada → valor
+        self._acordar    = threading.Event()
+        self._parar      = threading.Event()
+        self._thread     = None
+
+    # ——————————————————————————————————————————————————————————————
+    # Caminho quente
+    # ——————————————————————————————————————————————————————————————
+    def agendar(self, coluna: str, valor):
+        """Marca a célula da coluna (linha 2) para gravar com 'valor' (O(1))."""
+        with self._lock:
+            chave = normalize_header(coluna)
+            if chave in self._pendentes:
+                self.fundidos += 1
+            self._pendentes[chave] = valor
+        self._acordar.set()
+
+    def pendentes(self) -> dict:
+        with self._lock:
+            return dict(self._pendentes)
+
+    # ——————————————————————————————————————————————————————————————
+    # Gravação
+    # ——————————————————————————————————————————————————————————————
+    def _gravar(self, celulas: dict):
+        """Abre a planilha, escreve as células e salva (pode levar segundos)."""
+        wb = load_workbook(self.caminho)
+        try:
+            ws = wb[self.aba] if self.aba in wb.sheetnames else wb.active
+            colunas = {normalize_header(c.value): c.col_idx for c in ws[1]}
+            for chave, valor in celulas.items():
+                col_idx = colunas.get(chave)
+                if col_idx is None:
+                    print(f"[Aviso] coluna {chave} não encontrada na aba {ws.title}")
+                    continue
+                cell = ws.cell(row=2, column=col_idx)
+                cell.value = valor
+                cell.number_format = '#,##0.00'
+            wb.save(self.caminho)
+        finally:
+            wb.close()
+
+    def descarregar(self) -> bool:
+        """Grava o que estiver pendente; retorna False se a planilha recusou."""
+        with self._lock:
+            celulas = dict(self._pendentes)
+        if not celulas:
+            return True
+        try:
+            self._gravar(celulas)
+        except PermissionError as e:
+            self.falhas += 1
+            if self.falhas == 1 or self.falhas % 10 == 0:
+                print(f"[Aviso] planilha travada (Excel?), gravação adiada: {e}")
+            return False
+        except Exception as e:
+            self.falhas += 1
+            print(f"[Aviso] erro salvando Excel, gravação adiada: {e}")
+            return False
+        with self._lock:
+            # só tira o que foi gravado: valor agendado durante o save fica
+            for chave, valor in celulas.items():
+                if self._pendentes.get(chave) is valor:
+                    del self._pendentes[chave]
+        self.gravacoes += 1
+        self.falhas = 0
+        return True
+
+    # ——————————————————————————————————————————————————————————————
+    # Ciclo de vida
+    # ——————————————————————————————————————————————————————————————
+    def iniciar(self):
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="gravacao-carteira", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._acordar.wait()
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            while not self.descarregar():
+                # travada: espera a retentativa (ou o encerramento)
+                if self._parar.wait(self.retentativa):
+                    return
+
+    def encerrar(self, tentativas: int = 3):
+        """Para a thread e tenta gravar o que ficou pendente."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        for _ in range(tentativas):
+            if self.descarregar():
+                return
+            time.sleep(self.retentativa)
+        if self.pendentes():
+            print(f"[Aviso] valores não gravados na planilha: {self.pendentes()}")
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Custo no loop: save síncrono x agendar, com a planilha travada no meio
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import tempfile
+    import numpy as np
+    from openpyxl import Workbook
+
+    class _Travada(GravadorCarteira):
+        """Recusa os primeiros saves como o Excel faz com o arquivo aberto."""
+        travas = 3
+
+        def _gravar(self, celulas):
+            if self.travas:
+                self.travas -= 1
+                raise PermissionError(13, "Permission denied", self.caminho)
+            super()._gravar(celulas)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, "FALCAO.xlsx")
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "PLANOTRADE"
+        ws.append(["CARTEIRA", "BANCA", "CONTRATOS"])
+        ws.append([1000.0, 1000.0, 1])
+        cen = wb.create_sheet("CENARIOS")  # aba pesada que o save também regrava
+        for i in range(2000):
+            cen.append([f"C{i}", "ALTA", "BAIXA", "LATERAL", "ALTA", "BAIXA", "COMPRA", 3])
+        wb.save(xlsx)
+
+        sincrono = GravadorCarteira(xlsx, "PLANOTRADE")
+        t0 = time.perf_counter()
+        for k in range(5):
+            sincrono._gravar({'CARTEIRA': 1000.0 + k})
+        t_sync = (time.perf_counter() - t0) / 5
+
+        g = _Travada(xlsx, "PLANOTRADE", retentativa=0.2)
+        g.iniciar()
+        lat = []
+        for k in range(50):                # 50 saídas em sequência rápida
+            t0 = time.perf_counter()
+            g.agendar('CARTEIRA', 2000.0 + k)
+            lat.append(time.perf_counter() - t0)
+            time.sleep(0.01)
+        g.encerrar()
+
+        final = load_workbook(xlsx, read_only=True)["PLANOTRADE"]["A2"].value
+        lat = np.array(lat) * 1e6
+        print(f"save síncrono: {t_sync * 1e3:.0f} ms por saída | agendar: mediana {np.median(lat):.1f} us, "
+              f"máx {lat.max():.0f} us")
+        print(f"50 saídas → {g.gravacoes} saves ({g.fundidos} valores fundidos, 3 recusas da planilha) | "
+              f"CARTEIRA final={final} (esperado {2000.0 + 49})")
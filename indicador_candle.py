@@ -1,7 +1,6 @@
 # indicador_candle.py
 
 import sys
-import pandas as pd
 from indicador_medias import PERIODOS, COL_W
 import indicador_estocastico as ies
 
@@ -46,40 +45,29 @@ def draw_layout_candle():
     sys.stdout.flush()
 
 
-def draw_values_candle(df):
+def draw_values_candle(ind):
     """
     Atualiza valores de Range (High-Low) para cada timeframe,
     imediatamente abaixo do título “TAMANHO CANDLE”, sem invadir o Estocástico.
+    Os ranges vêm do grafo de indicadores (calibrador.obter_indicadores).
     """
-    if df is None or df.empty:
+    if ind is None or ind.motor.ultima_datahora is None:
         return
 
-    dt_max = pd.to_datetime(df['DataHora'].iat[-1])
-    serie  = df.set_index('DataHora')['Último']
-
     # Mesma lógica de posicionamento usada em draw_layout_candle():
     base_estoc  = ies.MEDIA_PANEL_HEIGHT + 5  # 12
     start_line  = base_estoc + 1              # 13 (onde imprimimos “TAMANHO CANDLE”)
     row         = start_line + 2              # 15 (onde imprimimos o valor RANGE)
 
-    for idx, (label, rule) in enumerate(PERIODOS.items()):
-        barras = serie.resample(rule, closed='right', label='right').ohlc()
-
-        barras['open']  = barras['open'].ffill()
-        barras['high']  = barras['high'].ffill().combine(barras['high'], max)
-        barras['low']   = barras['low'].ffill().combine(barras['low'], min)
-        barras['close'] = barras['close'].ffill()
-
-        last_idx = dt_max.floor(rule)
-        if last_idx in barras.index:
-            barras.at[last_idx, 'high']  = max(barras.at[last_idx, 'high'], df['Último'].iat[-1])
-            barras.at[last_idx, 'low']   = min(barras.at[last_idx, 'low'],  df['Último'].iat[-1])
-            barras.at[last_idx, 'close'] = df['Último'].iat[-1]
-            range_val = barras.at[last_idx, 'high'] - barras.at[last_idx, 'low']
-        else:
-            range_val = 0.0
+    ranges = ind.ranges()
+    for idx, label in enumerate(PERIODOS):
+        # high-low da barra de floor(último tick), já com o último preço
+        range_val = ranges.get(label.strip().upper())
 
         col = COL_W + 2 + idx * (COL_W + 1)
-        sys.stdout.write(f"\x1b[{row};{col}H{range_val:^{COL_W}.2f}")
+        if range_val is None:          # timeframe fora do perfil sniper
+            sys.stdout.write(f"\x1b[{row};{col}H{'-':^{COL_W}}")
+        else:
+            sys.stdout.write(f"\x1b[{row};{col}H{range_val:^{COL_W}.2f}")
 
     sys.stdout.flush()
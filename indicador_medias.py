@@ -4,7 +4,6 @@ import sys
 from datetime import datetime
 
 import pandas as pd
-import xlwings as xw
 
 # ————— CONFIGURAÇÕES ——————————————————————————————————————————————
 EMA_21 = 21
@@ -48,20 +47,27 @@ def draw_layout():
     print(sep)
 
 
-def draw_values(df: pd.DataFrame):
+def draw_values(ind):
     """
     Atualiza apenas os valores de EMA21, EMA50 e Tendência
     sobre a base que 'draw_layout()' construiu.
+    'ind' é o grafo de indicadores (calibrador.obter_indicadores): as EMAs
+    só são recalculadas nos timeframes que mudaram.
     """
-    resultados = [calcula_ema(df, rule) for rule in PERIODOS.values()]
-    e21s = [(r[0] or 0) for r in resultados]
-    e50s = [(r[1] or 0) for r in resultados]
+    medias = ind.medias_moveis()
+    resultados = [medias.get(tf.strip().upper()) for tf in PERIODOS]
 
     # As linhas fixas estão em row21=3, row50=4, rowT=5
     row21, row50, rowT = 3, 4, 5
 
-    for i, (e21, e50) in enumerate(zip(e21s, e50s)):
+    for i, r in enumerate(resultados):
         col_start = COL_W + 2 + i * (COL_W + 1)
+        # timeframe fora do perfil sniper: não calculado
+        if r is None:
+            for row in (row21, row50, rowT):
+                sys.stdout.write(f"\x1b[{row};{col_start}H{'-':^{COL_W}}")
+            continue
+        e21, e50 = (r[0] or 0), (r[1] or 0)
         sys.stdout.write(f"\x1b[{row21};{col_start}H{e21:^{COL_W}.0f}")
         sys.stdout.write(f"\x1b[{row50};{col_start}H{e50:^{COL_W}.0f}")
         diff = abs(e21 - e50)
@@ -82,6 +88,7 @@ def draw_values(df: pd.DataFrame):
 def calcula_ema(df: pd.DataFrame, rule: str):
     """
     Retorna (EMA21, EMA50, count) após resample
+    (cálculo completo; no loop use MediasIncrementais.valores)
     """
     s = df.set_index('DataHora')['Último'].resample(rule).last().dropna()
     if s.empty:
@@ -0,0 +1,227 @@
+# latencia.py
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import TEMPO_EXECUCAO, PASTA_LOGS
+
+_SUB     = 8                   # faixas por oitava (largura relativa ≤ 12,5%)
+_FAIXAS  = 64 * _SUB
+_MS      = 1_000_000
+
+
+def _faixa(ns: int) -> int:
+    """Índice da faixa logarítmica de 'ns' (exata abaixo de 16 ns)."""
+    if ns < 2 * _SUB:
+        return ns if ns > 0 else 0
+    desloc = ns.bit_length() - 4
+    return min(desloc * _SUB + (ns >> desloc), _FAIXAS - 1)
+
+
+def _limite(indice: int) -> int:
+    """Maior valor (ns) que cai na faixa 'indice'."""
+    if indice < 2 * _SUB:
+        return indice
+    desloc = indice // _SUB - 1
+    return ((indice % _SUB + _SUB + 1) << desloc) - 1
+
+
+class HistogramaLatencia:
+    """
+    Histograma de latências (ns) em faixas logarítmicas fixas: registrar()
+    é O(1) e sem alocação, a memória não cresce com o número de ticks e
+    os percentis saem com erro ≤ 12,5% (o máximo e a média são exatos).
+    """
+
+    __slots__ = ('contagens', 'n', 'soma', 'maximo')
+
+    def __init__(self):
+        self.contagens = [0] * _FAIXAS
+        self.n         = 0
+        self.soma      = 0
+        self.maximo    = 0
+
+    def registrar(self, ns: int):
+        self.contagens[_faixa(ns)] += 1
+        self.n    += 1
+        self.soma += ns
+        if ns > self.maximo:
+            self.maximo = ns
+
+    def percentil(self, p: float) -> int:
+        """Limite superior da faixa que contém o percentil p (0-100), em ns."""
+        if not self.n:
+            return 0
+        alvo, acumulado = p / 100.0 * self.n, 0
+        for indice, c in enumerate(self.contagens):
+            acumulado += c
+            if c and acumulado >= alvo:
+                return min(_limite(indice), self.maximo)
+        return self.maximo
+
+    def resumo(self) -> dict:
+        """n, média, p50, p99 e máximo (ms)."""
+        return {
+            'n':        self.n,
+            'media_ms': self.soma / self.n / _MS if self.n else 0.0,
+            'p50_ms':   self.percentil(50) / _MS,
+            'p99_ms':   self.percentil(99) / _MS,
+            'max_ms':   self.maximo / _MS,
+        }
+
+
+class MedidorLatencia:
+    """
+    Tempo de cada etapa do loop de ticks no relógio monotônico
+    (perf_counter_ns), um histograma por etapa:
+
+      - inicio() no começo do tick; marcar(etapa) soma o tempo desde a
+        marca anterior à etapa (a mesma etapa pode aparecer mais de uma
+        vez no tick); fim() registra as etapas e o total ('tick')
+      - descartar() abandona o tick em andamento (ex.: sem tick novo no feed)
+      - registrar(etapa, ns) grava uma medida avulsa, também de outras
+        threads (ex.: despachante: do início do tick ao envio da ordem)
+      - ticks acima de 'limite_lento' segundos (TEMPO_EXECUCAO) são
+        contados; com LOG_DEBUG_ATIVADO o falcon registra o detalhamento
+    """
+
+    def __init__(self, limite_lento: float = TEMPO_EXECUCAO):
+        self.limite_ns    = int(limite_lento * 1e9)
+        self.lentos       = 0
+        self.tick_inicio  = None       # perf_counter_ns do tick em andamento
+        self.histogramas  = {}         # etapa → HistogramaLatencia (ordem de criação)
+        self._marca       = 0
+        self._tick        = {}         # etapa → ns acumulados no tick em andamento
+        self._lock        = threading.Lock()
+
+    # ——————————————————————————————————————————————————————————————
+    # Caminho quente
+    # ——————————————————————————————————————————————————————————————
+    def inicio(self):
+        self.tick_inicio = self._marca = time.perf_counter_ns()
+        self._tick.clear()
+
+    def marcar(self, etapa: str):
+        agora = time.perf_counter_ns()
+        self._tick[etapa] = self._tick.get(etapa, 0) + agora - self._marca
+        self._marca = agora
+
+    def descartar(self):
+        self.tick_inicio = None
+        self._tick.clear()
+
+    def fim(self) -> bool:
+        """Fecha o tick; retorna True se ele passou do limite de tick lento."""
+        if self.tick_inicio is None:
+            return False
+        total = self._marca - self.tick_inicio
+        for etapa, ns in self._tick.items():
+            self.registrar(etapa, ns)
+        self.registrar('tick', total)
+        self.tick_inicio = None
+        if total > self.limite_ns:
+            self.lentos += 1
+            return True
+        return False
+
+    def registrar(self, etapa: str, ns: int):
+        hist = self.histogramas.get(etapa)
+        if hist is None:
+            with self._lock:
+                hist = self.histogramas.setdefault(etapa, HistogramaLatencia())
+        hist.registrar(ns)
+
+    # ——————————————————————————————————————————————————————————————
+    # Consulta
+    # ——————————————————————————————————————————————————————————————
+    def ultimo(self) -> str:
+        """Etapas do último tick fechado (ms), ex.: para o log de tick lento."""
+        etapas = ' '.join(f"{e}={ns / _MS:.1f}" for e, ns in self._tick.items())
+        return f"{sum(self._tick.values()) / _MS:.1f} ms ({etapas})"
+
+    def resumo(self) -> dict:
+        """etapa → {n, media_ms, p50_ms, p99_ms, max_ms}."""
+        with self._lock:
+            histogramas = list(self.histogramas.items())
+        return {etapa: hist.resumo() for etapa, hist in histogramas}
+
+    def tabela(self) -> str:
+        linhas = [f"{'etapa':<12} {'n':>8} {'média':>9} {'p50':>9} {'p99':>9} {'máx':>9}  (ms)"]
+        for etapa, r in self.resumo().items():
+            linhas.append(f"{etapa:<12} {r['n']:>8} {r['media_ms']:9.3f} {r['p50_ms']:9.3f} "
+                          f"{r['p99_ms']:9.3f} {r['max_ms']:9.3f}")
+        linhas.append(f"ticks acima de {self.limite_ns / _MS:.0f} ms: {self.lentos}")
+        return '\n'.join(linhas)
+
+    def gravar(self, pasta: str = PASTA_LOGS) -> str | None:
+        """Grava a tabela e as faixas não vazias de cada etapa em latencia_<data>.txt."""
+        if not self.histogramas:
+            return None
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"latencia_{datetime.now():%Y%m%d_%H%M%S}.txt")
+        with self._lock:
+            histogramas = list(self.histogramas.items())
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(self.tabela() + '\n\netapa;ate_ns;contagem\n')
+            for etapa, hist in histogramas:
+                for indice, c in enumerate(hist.contagens):
+                    if c:
+                        f.write(f"{etapa};{_limite(indice)};{c}\n")
+        return caminho
+
+
+medidor = MedidorLatencia()
+
+
+def resumo_latencia() -> str:
+    """Tabela p50/p99/máx por etapa do medidor do processo."""
+    return medidor.tabela()
+
+
+def encerrar_latencia() -> str | None:
+    """Grava os histogramas do processo em PASTA_LOGS; retorna o caminho."""
+    try:
+        return medidor.gravar()
+    except OSError as e:
+        print(f"[Aviso] não foi possível gravar a latência: {e}")
+        return None
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Custo da instrumentação por tick e precisão dos percentis x numpy
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import numpy as np
+
+    etapas = ('feed', 'barras', 'estocastico', 'cenario', 'painel', 'decisao', 'painel')
+    n = 200_000
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for e in etapas:
+            pass
+    t_vazio = time.perf_counter() - t0
+
+    m = MedidorLatencia()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        m.inicio()
+        for e in etapas:
+            m.marcar(e)
+        m.fim()
+    t_med = time.perf_counter() - t0
+    print(f"instrumentação: {(t_med - t_vazio) / n * 1e6:.2f} us por tick "
+          f"({len(etapas)} marcas + fim)")
+
+    rng = np.random.default_rng(23)
+    amostras = rng.lognormal(np.log(2e6), 0.8, 1_000_000).astype(np.int64)   # ~2 ms
+    h = HistogramaLatencia()
+    for ns in amostras.tolist():
+        h.registrar(ns)
+    for p in (50, 99, 99.9):
+        exato = np.percentile(amostras, p)
+        print(f"p{p:<4}: histograma {h.percentil(p) / _MS:8.3f} ms | numpy {exato / _MS:8.3f} ms "
+              f"(erro {h.percentil(p) / exato - 1:+.1%})")
+    print(f"máx: {h.maximo / _MS:.3f} ms | memória: {_FAIXAS} contadores por etapa")
@@ -0,0 +1,182 @@
+# medias_incrementais.py
+
+import numpy as np
+import pandas as pd
+
+from indicador_medias import EMA_21, EMA_50, PERIODOS
+
+
+class _EMAAjustada:
+    """
+    EMA com a mesma recorrência do pandas ewm(span, adjust=False).mean():
+    e = ((1-α)·e + α·x) / ((1-α) + α), pulando a conta quando x == e.
+    """
+    __slots__ = ("fator", "alfa", "media")
+
+    def __init__(self, span: int):
+        com        = (span - 1) / 2.0
+        self.alfa  = 1.0 / (1.0 + com)
+        self.fator = 1.0 - self.alfa
+        self.media = np.nan
+
+    def proximo(self, x: float) -> float:
+        """Valor da EMA após x, sem alterar o estado."""
+        e = self.media
+        if e != e:
+            return x
+        if e == x:
+            return e
+        return (self.fator * e + self.alfa * x) / (self.fator + self.alfa)
+
+
+class _MediasTimeframe:
+    """Estado de um timeframe: EMAs das barras fechadas + barra em formação."""
+    __slots__ = ("passo", "rotulo", "ultimo", "emas", "n")
+
+    def __init__(self, rule: str, spans: tuple):
+        self.passo  = pd.Timedelta(rule).value
+        self.rotulo = None           # rótulo (floor) da barra em formação
+        self.ultimo = np.nan         # último preço válido da barra em formação
+        self.emas   = [_EMAAjustada(s) for s in spans]
+        self.n      = 0              # barras fechadas com preço
+
+    def fechar(self):
+        if self.ultimo == self.ultimo:
+            for e in self.emas:
+                e.media = e.proximo(self.ultimo)
+            self.n += 1
+
+    def tick(self, ts: int, preco: float):
+        rotulo = ts // self.passo * self.passo
+        if rotulo != self.rotulo:
+            if self.rotulo is not None:
+                self.fechar()
+            self.rotulo = rotulo
+            self.ultimo = np.nan
+        if preco == preco:
+            self.ultimo = preco
+
+    def valores(self) -> tuple:
+        if self.ultimo == self.ultimo:
+            return tuple(float(e.proximo(self.ultimo)) for e in self.emas) + (self.n + 1,)
+        if self.n == 0:
+            return (None,) * len(self.emas) + (0,)
+        return tuple(float(e.media) for e in self.emas) + (self.n,)
+
+
+class MediasIncrementais:
+    """
+    EMA21/EMA50 de cada timeframe de PERIODOS mantidas tick a tick, com o
+    mesmo resultado de indicador_medias.calcula_ema (resample(rule).last()
+    .dropna() + ewm(adjust=False)):
+
+      - barra fechada → uma passada da recorrência EMA (O(1))
+      - barra em formação → valor provisório calculado sobre o estado, sem
+        alterá-lo
+
+    sincronizar() segue o TickStore como o MotorBarras: só as linhas novas;
+    se o histórico foi recarregado, aquece com uma passada vetorizada do
+    pandas sobre o histórico inteiro (a EMA não tem janela finita).
+    """
+
+    def __init__(self, regras=None, spans: tuple = (EMA_21, EMA_50)):
+        self.regras   = list(regras or PERIODOS.values())
+        self.spans    = tuple(spans)
+        self._geracao = None
+        self.resetar()
+
+    def resetar(self):
+        self._tfs = {rule: _MediasTimeframe(rule, self.spans) for rule in self.regras}
+        self.ultimo_ts = None
+
+    def tick(self, ts: int, preco: float):
+        for st in self._tfs.values():
+            st.tick(ts, preco)
+        self.ultimo_ts = ts
+
+    def _aquecer(self, dh: np.ndarray, ult: np.ndarray):
+        """Estado inicial a partir do histórico inteiro (vetorizado)."""
+        for rule, st in self._tfs.items():
+            st.rotulo = int(dh[-1] // st.passo * st.passo)
+            fechadas  = int(np.searchsorted(dh, st.rotulo, side="left"))
+            if fechadas:
+                s = pd.Series(ult[:fechadas], index=pd.DatetimeIndex(dh[:fechadas].view("datetime64[ns]")))
+                s = s.resample(rule).last().dropna()
+                st.n = len(s)
+                for e, span in zip(st.emas, self.spans):
+                    if st.n:
+                        e.media = float(s.ewm(span=span, adjust=False).mean().iat[-1])
+            forma = ult[fechadas:]
+            validos = forma[forma == forma]
+            st.ultimo = float(validos[-1]) if len(validos) else np.nan
+        self.ultimo_ts = int(dh[-1])
+
+    def sincronizar(self, store) -> int:
+        """Aplica as linhas do TickStore ainda não vistas; retorna quantas."""
+        if store.vazio:
+            return 0
+        dh  = store.datahora().view(np.int64)
+        ult = store.coluna("Último")
+        if store.geracao != self._geracao:
+            self.resetar()
+            self._geracao = store.geracao
+            self._aquecer(dh, ult)
+            return len(dh)
+        i0 = 0 if self.ultimo_ts is None else int(np.searchsorted(dh, self.ultimo_ts, side="right"))
+        for i in range(i0, len(dh)):
+            self.tick(int(dh[i]), float(ult[i]))
+        return len(dh) - i0
+
+    def assinatura(self, rule: str) -> tuple:
+        """Muda sempre que valores(rule) pode mudar (agendador de indicadores)."""
+        st = self._tfs[rule]
+        return self._geracao, st.n, st.ultimo
+
+    def valores(self, rule: str) -> tuple:
+        """(EMA21, EMA50, count) do timeframe — mesma interface de calcula_ema."""
+        return self._tfs[rule].valores()
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Paridade com calcula_ema + latência por tick x tamanho do histórico
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    from tick_store import TickStore
+    from indicador_medias import calcula_ema
+
+    tamanhos = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    amostras = 300
+    rng = np.random.default_rng(3)
+
+    print(f"{'linhas':>10} | {'calcula_ema x5 (ms/tick)':>25} | {'incremental (us/tick)':>22} | paridade")
+    for n in tamanhos:
+        passos = rng.integers(20, 90, n + amostras).astype(np.int64)
+        passos[rng.random(n + amostras) < 0.002] = 15 * 3600
+        dh  = (np.datetime64("2024-01-02T09:00:00", "ns").astype(np.int64)
+               + np.cumsum(passos) * 1_000_000_000).view("datetime64[ns]")
+        ult = 120_000 + np.cumsum(rng.choice([-10.0, -5.0, 0.0, 5.0, 10.0], n + amostras))
+
+        store = TickStore()
+        store.carregar(pd.DataFrame({"DataHora": dh[:n], "Último": ult[:n]}))
+        medias = MediasIncrementais()
+        medias.sincronizar(store)
+
+        ok = True
+        t_inc = t_pd = 0.0
+        for i in range(n, n + amostras):
+            store.anexar({"DataHora": dh[i], "Último": ult[i]})
+            t0 = time.perf_counter()
+            medias.sincronizar(store)
+            inc = [medias.valores(rule) for rule in PERIODOS.values()]
+            t_inc += time.perf_counter() - t0
+            if i % 50 == 0 or i == n + amostras - 1:
+                t0 = time.perf_counter()
+                df  = store.frame()
+                ref = [calcula_ema(df, rule) for rule in PERIODOS.values()]
+                t_pd += time.perf_counter() - t0
+                for a, b in zip(inc, ref):
+                    ok &= a[2] == b[2] and np.allclose(a[:2], b[:2], rtol=1e-12, atol=0)
+        n_ref = len(range(n, n + amostras, 50)) + 1
+        print(f"{n:>10} | {t_pd / n_ref * 1e3:>25.1f} | {t_inc / amostras * 1e6:>22.1f} | {ok}")
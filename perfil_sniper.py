@@ -0,0 +1,127 @@
+# perfil_sniper.py
+
+import re
+
+import pandas as pd
+
+from config import MODO_SNIPER, PERFIL_INVESTIDOR, SNIPER_TIMEFRAMES, SNIPER_EXIT
+from indicador_medias import PERIODOS
+
+# timeframes na ordem de PERIODOS ('1M', '5M', ...)
+TFS = [tf.strip().upper() for tf in PERIODOS]
+
+# tendências do estocástico que contam a favor de cada lado na confluência
+_LADO = {'ALTA': 'COMPRA', 'BAIXA': 'VENDA'}
+# tendências do timeframe de saída que encerram a posição de cada lado
+_SAIDA = {
+    'COMPRA': ('BAIXA', 'SOBRECOMPRADO'),
+    'VENDA':  ('ALTA', 'SOBREVENDIDO'),
+}
+
+
+def perfil_base(nome: str) -> str:
+    """'frenetico5' → 'frenetico' (o sufixo numérico não muda os timeframes)."""
+    return re.sub(r'\d+$', '', (nome or '').strip().lower())
+
+
+class PerfilSniper:
+    """
+    Timeframes de entrada e de saída do perfil do investidor
+    ([SNIPER_TIMEFRAMES] e [SNIPER_EXIT] do config.ini).
+
+    'timeframes' é tudo o que o perfil precisa calcular (entrada + saída,
+    na ordem de PERIODOS): o motor de barras, as médias e o grafo de
+    indicadores são montados só com eles.
+    """
+
+    def __init__(self, perfil: str = PERFIL_INVESTIDOR,
+                 entradas: dict = SNIPER_TIMEFRAMES, saidas: dict = SNIPER_EXIT):
+        self.nome = perfil_base(perfil)
+        if self.nome in entradas:
+            self.entrada = [tf.upper() for tf in entradas[self.nome] if tf.upper() in TFS]
+        else:
+            print(f"[Aviso] Perfil '{perfil}' sem [SNIPER_TIMEFRAMES]: usando todos os timeframes")
+            self.entrada = list(TFS)
+        if not self.entrada:
+            self.entrada = list(TFS)
+        saida = (saidas.get(self.nome) or [self.entrada[-1]])[0].upper()
+        self.saida = saida if saida in TFS else self.entrada[-1]
+        self.timeframes = [tf for tf in TFS if tf in self.entrada or tf == self.saida]
+
+    def confluencia(self, tendencias: dict) -> str:
+        """COMPRA/VENDA se todos os timeframes de entrada apontam o mesmo lado, senão AGUARDA."""
+        lados = {_LADO.get(tendencias.get(tf, '')) for tf in self.entrada}
+        return lados.pop() if len(lados) == 1 and None not in lados else 'AGUARDA'
+
+    def deve_sair(self, tendencias: dict, posicao: str) -> bool:
+        """True se o timeframe de saída virou contra a posição (COMPRA/VENDA)."""
+        return tendencias.get(self.saida, '') in _SAIDA.get(posicao, ())
+
+    def avaliar(self, cenario: pd.Series, tendencias: dict) -> pd.Series:
+        """
+        Cenário com DECISAO trocada pela confluência do perfil (o cenário
+        casado só nos timeframes do perfil ainda fornece CODIGO, SCORE,
+        BREAKEVEN e TRAILING).
+        """
+        cenario = cenario.copy()
+        cenario['DECISAO'] = self.confluencia(tendencias)
+        return cenario
+
+    def __repr__(self) -> str:
+        return f"PerfilSniper({self.nome}: entrada={','.join(self.entrada)} saída={self.saida})"
+
+
+def perfil_ativo() -> PerfilSniper | None:
+    """Perfil do config.ini se MODO_SNIPER = True; None calcula todos os timeframes."""
+    return PerfilSniper() if MODO_SNIPER else None
+
+
+def regras_ativas(perfil: PerfilSniper | None) -> dict:
+    """{timeframe: regra de resample} dos timeframes que o perfil usa."""
+    regras = {tf.strip().upper(): rule for tf, rule in PERIODOS.items()}
+    if perfil is None:
+        return regras
+    return {tf: regras[tf] for tf in perfil.timeframes}
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Custo por tick de cada perfil (motor + médias + grafo de indicadores)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    import numpy as np
+    from barras import MotorBarras
+    from tick_store import TickStore
+    from medias_incrementais import MediasIncrementais
+    from agendador import GrafoIndicadores
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    rng = np.random.default_rng(14)
+    passos = rng.integers(200, 3_000, n).astype(np.int64) * 1_000_000
+    ts     = np.datetime64("2025-03-10T09:05:00", "ns").astype(np.int64) + np.cumsum(passos)
+    precos = 128_000 + np.cumsum(rng.choice([-5.0, 0.0, 5.0], n))
+
+    perfis = [None] + [PerfilSniper(p) for p in SNIPER_TIMEFRAMES]
+    base = None
+    print(f"{'perfil':<13} | {'timeframes':<18} | {'us/tick':>8} | relativo")
+    for perfil in perfis:
+        regras = regras_ativas(perfil)
+        store  = TickStore()
+        motor  = MotorBarras(regras=regras, max_barras=500)
+        medias = MediasIncrementais(regras=list(regras.values()))
+        grafo  = GrafoIndicadores(motor, medias, timeframes=list(regras))
+        gasto = 0.0
+        for i in range(n):
+            store.anexar({"DataHora": ts[i].astype("datetime64[ns]"), "Último": precos[i]})
+            t0 = time.perf_counter()
+            motor.sincronizar(store)
+            medias.sincronizar(store)
+            grafo.atualizar()
+            if perfil is not None:
+                perfil.confluencia(grafo.tendencias())
+            gasto += time.perf_counter() - t0
+        us = gasto / n * 1e6
+        base = base or us
+        nome = perfil.nome if perfil else "(todos)"
+        print(f"{nome:<13} | {','.join(regras):<18} | {us:8.1f} | {us / base:7.0%}")
@@ -3,131 +3,305 @@
 
 import os
 import csv
-from datetime import datetime
+import glob
+import sqlite3
+from datetime import datetime, date
 import config
-from calibrador import obter_dados_dde
-from config import ATIVO_PRINCIPAL
+from config import OPERACOES_BANCO, OPERACOES_LOTE
 
+# campos de cada operação, na ordem do CSV diário antigo
+COLUNAS = [
+    'data_dde', 'hora_dde', 'hora', 'op_num',
+    'carteira', 'banca', 'contratos', 'operacoes',
+    'stop_op', 'meta_op', 'stop_diario', 'meta_diaria'
+]
+_INTEIRAS = ('op_num', 'contratos', 'operacoes')
+_TEXTOS   = ('data_dde', 'hora_dde', 'hora')
 
-def init_log() -> str:
-    """
-    Cria (se necessário) e retorna o caminho do CSV diário de operações,
-    utilizando a data do DDE (campo 'Data') para nomear o arquivo.
-    O CSV é nomeado 'operacoes_YYYY-MM-DD.csv', com cabeçalho:
-      data_dde, hora_dde, hora, op_num,
-      carteira, banca, contratos, operacoes,
-      stop_op, meta_op, stop_diario, meta_diaria
-    """
-    # pasta de destino
+# data e hora_dde vêm da DataHora do tick (a mesma operação reprocessada
+# num replay não duplica); 'execucao' separa os registros de uma operação
+# cuja saída executou em partes
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS operacoes (
+    id          INTEGER PRIMARY KEY,
+    data        TEXT    NOT NULL,            -- YYYY-MM-DD do pregão
+    data_dde    TEXT, hora_dde TEXT, hora TEXT,
+    op_num      INTEGER NOT NULL,
+    carteira    REAL, banca REAL, contratos INTEGER, operacoes INTEGER,
+    stop_op     REAL, meta_op REAL, stop_diario REAL, meta_diaria REAL,
+    execucao    INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (data, hora_dde, op_num, execucao)
+);
+CREATE INDEX IF NOT EXISTS idx_operacoes_data   ON operacoes (data, op_num);
+CREATE INDEX IF NOT EXISTS idx_operacoes_op_num ON operacoes (op_num);
+CREATE TABLE IF NOT EXISTS csv_importados (
+    arquivo TEXT PRIMARY KEY, tamanho INTEGER, mtime_ns INTEGER
+);
+"""
+
+
+def pasta_operacoes() -> str:
     pasta = config._cfg.get('DEFAULT', 'PASTA_OPERACAOES', fallback=None)
     if not pasta:
         pasta = config._cfg.get('PASTAS', 'PASTA_OPERACAOES')
-    os.makedirs(pasta, exist_ok=True)
+    return pasta
 
-    # obtém data do DDE (formatos 'DD/MM/YYYY' ou 'YYYY-MM-DD')
-    tick = obter_dados_dde(ATIVO_PRINCIPAL) or {}
-    dde_data = tick.get('Data') or tick.get('DAT') or ''
-    # tenta converter para 'YYYY-MM-DD'
-    file_date = None
-    if dde_data:
-        # normaliza separador
-        parts = dde_data.replace('-', '/').split('/')
-        if len(parts) == 3:
-            d, m, y = parts if len(parts[0]) == 2 else parts[::-1]
-            # se vier 'DD/MM/YYYY'
-            if len(parts[0]) == 2:
-                day, month, year = parts
-            else:
-                year, month, day = parts
-            file_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-    if not file_date:
-        # fallback para data do sistema
-        file_date = datetime.now().strftime("%Y-%m-%d")
-
-    arquivo = os.path.join(pasta, f"operacoes_{file_date}.csv")
-
-    # cabeçalho se não existir
-    if not os.path.exists(arquivo):
-        with open(arquivo, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'data_dde', 'hora_dde', 'hora', 'op_num',
-                'carteira', 'banca', 'contratos', 'operacoes',
-                'stop_op', 'meta_op', 'stop_diario', 'meta_diaria'
-            ])
-    return arquivo
 
+def _float(v) -> float:
+    try:
+        return float(str(v).strip().replace(',', '.'))
+    except ValueError:
+        return 0.0
 
-def append_operacao(arquivo: str, registro: dict):
-    """
-    Anexa uma linha ao CSV, incluindo timestamp de DDE.
-    'registro' deve conter chaves:
-      'hora', 'op_num', 'carteira', 'banca',
-      'contratos', 'operacoes', 'stop_op', 'meta_op',
-      'stop_diario', 'meta_diaria'.
-    Data/Hora do DDE são capturados via calibrador.obter_dados_dde().
-    """
-    tick = obter_dados_dde(ATIVO_PRINCIPAL) or {}
-    data_dde = tick.get('Data') or tick.get('DAT') or ''
-    hora_dde = tick.get('Hora') or tick.get('HOR') or ''
-
-    with open(arquivo, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            data_dde,
-            hora_dde,
-            registro['hora'],
-            registro['op_num'],
-            f"{registro['carteira']:.2f}",
-            f"{registro['banca']:.2f}",
-            registro['contratos'],
-            registro['operacoes'],
-            registro['stop_op'],
-            registro['meta_op'],
-            registro['stop_diario'],
-            registro['meta_diaria']
-        ])
+
+def _int(v) -> int:
+    return int(_float(v))
 
 
 def read_operacoes(arquivo: str) -> list:
     """
-    Lê o CSV de operações e retorna lista de registros convertidos.
-    Se alguma coluna faltar ou for inválida, aplica valor default.
+    Lê um CSV diário antigo (operacoes_YYYY-MM-DD.csv) e retorna a lista
+    de registros convertidos; coluna faltando ou inválida vira 0 / ''.
     """
     registros = []
     if not os.path.exists(arquivo):
         return registros
-
     with open(arquivo, newline='') as f:
-        reader = csv.DictReader(f)
-        for idx, row in enumerate(reader, start=1):
-            def to_float(key):
-                v = row.get(key, '0').strip().replace(',', '.')
-                try:
-                    return float(v)
-                except:
-                    return 0.0
-            def to_int(key):
-                v = row.get(key, '0').strip().replace(',', '.')
-                try:
-                    return int(float(v))
-                except:
-                    return 0
-
-            op_num = to_int('op_num') or idx
-
-            registros.append({
-                'data_dde':    row.get('data_dde', ''),
-                'hora_dde':    row.get('hora_dde', ''),
-                'hora':        row.get('hora', ''),
-                'op_num':      op_num,
-                'carteira':    to_float('carteira'),
-                'banca':       to_float('banca'),
-                'contratos':   to_int('contratos'),
-                'operacoes':   to_int('operacoes'),
-                'stop_op':     to_float('stop_op'),
-                'meta_op':     to_float('meta_op'),
-                'stop_diario': to_float('stop_diario'),
-                'meta_diaria': to_float('meta_diaria')
-            })
+        for idx, row in enumerate(csv.DictReader(f), start=1):
+            reg = {}
+            for k in COLUNAS:
+                v = row.get(k) or ''
+                reg[k] = v if k in _TEXTOS else _int(v or 0) if k in _INTEIRAS else _float(v or 0)
+            reg['op_num'] = reg['op_num'] or idx
+            registros.append(reg)
     return registros
+
+
+class BancoOperacoes:
+    """
+    Diário de operações num SQLite em modo WAL (um arquivo para todos os
+    dias), no lugar dos CSVs operacoes_YYYY-MM-DD.csv:
+
+      - anexar(registro, quando) usa a DataHora do tick de quem chama
+        (nada de ler o DDE só para saber a data)
+      - os registros são confirmados em lotes de 'lote' (1 = cada operação
+        vai para o disco na hora); confirmar()/fechar() gravam o resto
+      - índices por data e por op_num: do_dia(), periodo() e
+        resumo_diario() consultam meses de histórico sem abrir CSV nenhum
+      - importar_csvs() traz os CSVs diários antigos (uma vez por arquivo;
+        rodar de novo não duplica)
+    """
+
+    def __init__(self, caminho: str, lote: int = 1):
+        self.caminho = caminho
+        self.lote    = max(1, lote)
+        self._pendentes = []
+        self.conn = sqlite3.connect(caminho)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrar()
+        self.conn.executescript(_ESQUEMA)
+
+    def _migrar(self):
+        """Banco da versão com chave (data, hora, op_num): refaz a tabela com a chave nova."""
+        colunas = [r[1] for r in self.conn.execute("PRAGMA table_info(operacoes)")]
+        if not colunas or 'execucao' in colunas:
+            return
+        campos = ', '.join(['data'] + COLUNAS)
+        self.conn.executescript(f"""
+            BEGIN;
+            DROP INDEX IF EXISTS idx_operacoes_data;
+            DROP INDEX IF EXISTS idx_operacoes_op_num;
+            ALTER TABLE operacoes RENAME TO operacoes_antiga;
+            {_ESQUEMA}
+            INSERT OR IGNORE INTO operacoes ({campos}) SELECT {campos} FROM operacoes_antiga ORDER BY id;
+            DROP TABLE operacoes_antiga;
+            COMMIT;
+        """)
+
+    # ——————————————————————————————————————————————————————————————
+    # Gravação
+    # ——————————————————————————————————————————————————————————————
+    @staticmethod
+    def _linha(dia: str, registro: dict) -> tuple:
+        return (dia,) + tuple(registro.get(k) for k in COLUNAS) + (registro.get('execucao') or 0,)
+
+    def anexar(self, registro: dict, quando=None):
+        """
+        Registra uma operação. 'quando' é a DataHora do tick (datetime ou
+        pd.Timestamp); sem ela, vale o relógio local. registro['execucao']
+        (padrão 0) numera os registros de uma mesma operação.
+        """
+        quando = quando or datetime.now()
+        registro = dict(registro,
+                        data_dde=quando.strftime('%d/%m/%Y'),
+                        hora_dde=quando.strftime('%H:%M:%S'))
+        self._pendentes.append(self._linha(quando.strftime('%Y-%m-%d'), registro))
+        if len(self._pendentes) >= self.lote:
+            self.confirmar()
+
+    def _inserir(self, linhas: list) -> int:
+        campos = ', '.join(['data'] + COLUNAS + ['execucao'])
+        marcas = ', '.join('?' * (len(COLUNAS) + 2))
+        antes = self.conn.total_changes
+        self.conn.executemany(f"INSERT OR IGNORE INTO operacoes ({campos}) VALUES ({marcas})", linhas)
+        return self.conn.total_changes - antes
+
+    def confirmar(self):
+        """Grava os registros pendentes numa transação."""
+        if not self._pendentes:
+            return
+        with self.conn:
+            self._inserir(self._pendentes)
+        self._pendentes.clear()
+
+    def importar_csvs(self, pasta: str) -> int:
+        """Importa os operacoes_YYYY-MM-DD.csv novos ou alterados; retorna linhas inseridas."""
+        inseridas = 0
+        for fn in sorted(glob.glob(os.path.join(glob.escape(pasta), "operacoes_*.csv"))):
+            nome = os.path.basename(fn)
+            try:
+                dia = datetime.strptime(nome[len("operacoes_"):-len(".csv")], "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                print(f"[Aviso] CSV de operações com nome inesperado: {nome}")
+                continue
+            st = os.stat(fn)
+            feito = self.conn.execute(
+                "SELECT 1 FROM csv_importados WHERE arquivo = ? AND tamanho = ? AND mtime_ns = ?",
+                (nome, st.st_size, st.st_mtime_ns)).fetchone()
+            if feito:
+                continue
+            with self.conn:
+                inseridas += self._inserir([self._linha(dia, r) for r in read_operacoes(fn)])
+                self.conn.execute("INSERT OR REPLACE INTO csv_importados VALUES (?, ?, ?)",
+                                  (nome, st.st_size, st.st_mtime_ns))
+        return inseridas
+
+    # ——————————————————————————————————————————————————————————————
+    # Consultas
+    # ——————————————————————————————————————————————————————————————
+    def _consultar(self, onde: str, args: tuple) -> list:
+        self.confirmar()
+        sql = f"SELECT data, {', '.join(COLUNAS)} FROM operacoes WHERE {onde} ORDER BY data, id"
+        return [dict(r) for r in self.conn.execute(sql, args)]
+
+    def do_dia(self, dia=None) -> list:
+        """Operações do pregão 'dia' (date/str 'YYYY-MM-DD'; padrão: hoje)."""
+        return self._consultar("data = ?", (str(dia or date.today()),))
+
+    def periodo(self, inicio, fim) -> list:
+        """Operações de inicio a fim (inclusive)."""
+        return self._consultar("data BETWEEN ? AND ?", (str(inicio), str(fim)))
+
+    def resumo_diario(self, inicio, fim) -> list:
+        """Por pregão: (data, nº de operações, banca e carteira da última operação)."""
+        self.confirmar()
+        return [tuple(r) for r in self.conn.execute(
+            """SELECT o.data, n, o.banca, o.carteira FROM operacoes o
+               JOIN (SELECT data, COUNT(*) AS n, MAX(id) AS ultimo FROM operacoes
+                     WHERE data BETWEEN ? AND ? GROUP BY data) d ON o.id = d.ultimo
+               ORDER BY o.data""", (str(inicio), str(fim)))]
+
+    def fechar(self):
+        self.confirmar()
+        self.conn.close()
+
+
+def abrir_operacoes(importar: bool = True, sessao: str | None = None) -> BancoOperacoes:
+    """
+    Abre (criando se preciso) o banco de operações do config.ini e, na
+    primeira vez, importa os CSVs diários antigos da PASTA_OPERACAOES.
+    'sessao' (TradeSession que não é a principal) usa um banco próprio,
+    '<banco>_<sessao>.sqlite3'.
+    """
+    pasta = pasta_operacoes()
+    os.makedirs(pasta, exist_ok=True)
+    caminho = OPERACOES_BANCO or os.path.join(pasta, "operacoes.sqlite3")
+    if sessao:
+        base, ext = os.path.splitext(caminho)
+        caminho = f"{base}_{sessao}{ext}"
+    banco = BancoOperacoes(caminho, OPERACOES_LOTE)
+    if importar:
+        n = banco.importar_csvs(pasta)
+        if n:
+            print(f"[Aviso] {n} operações importadas dos CSVs diários para {banco.caminho}")
+    return banco
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: CSVs diários x banco (importação, gravação e consulta de meses)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    import numpy as np
+
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    rng  = np.random.default_rng(19)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # histórico antigo: um CSV por pregão, 5-40 operações por dia
+        inicio = date(2025, 1, 2)
+        pregoes = [inicio + timedelta(days=i) for i in range(dias * 7 // 5) if (inicio + timedelta(days=i)).weekday() < 5][:dias]
+        total = 0
+        for d in pregoes:
+            with open(os.path.join(tmp, f"operacoes_{d:%Y-%m-%d}.csv"), 'w', newline='') as f:
+                w = csv.writer(f)
+                w.writerow(COLUNAS)
+                banca = 0.0
+                for k in range(int(rng.integers(5, 40))):
+                    banca += float(rng.normal(0, 50))
+                    w.writerow([f"{d:%d/%m/%Y}", f"{9 + k // 6:02d}:{k % 6 * 10:02d}:00", f"{9 + k // 6:02d}:{k % 6 * 10:02d}:01",
+                                k + 1, f"{1000 + banca:.2f}", f"{banca:.2f}", 1, 40, -100, 200, -300, 600])
+                    total += 1
+
+        banco = BancoOperacoes(os.path.join(tmp, "operacoes.sqlite3"))
+        t0 = time.perf_counter()
+        n = banco.importar_csvs(tmp)
+        t_imp = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        n2 = banco.importar_csvs(tmp)
+        t_imp2 = time.perf_counter() - t0
+        print(f"{len(pregoes)} CSVs, {total} operações | importação: {n} linhas em {t_imp * 1e3:.0f} ms | "
+              f"de novo: {n2} linhas em {t_imp2 * 1e3:.1f} ms")
+
+        # consulta de 3 meses: ler os CSVs do período x SELECT por data
+        ini, fim = pregoes[-63], pregoes[-1]
+        t0 = time.perf_counter()
+        ref = [r for d in pregoes[-63:] for r in read_operacoes(os.path.join(tmp, f"operacoes_{d:%Y-%m-%d}.csv"))]
+        t_csv = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        novo = banco.periodo(ini, fim)
+        t_db = time.perf_counter() - t0
+        ok = [{k: r[k] for k in COLUNAS} for r in novo] == ref
+        t0 = time.perf_counter()
+        resumo = banco.resumo_diario(ini, fim)
+        t_res = time.perf_counter() - t0
+        print(f"3 meses ({len(ref)} operações): CSVs {t_csv * 1e3:.1f} ms | banco {t_db * 1e3:.1f} ms "
+              f"(paridade={ok}) | resumo por dia {t_res * 1e3:.1f} ms ({len(resumo)} pregões)")
+
+        # gravação de uma operação: append no CSV x banco (lote 1 e lote 20)
+        reg = dict(zip(COLUNAS, ['', '', '17:00:00', 99, 1000.0, 0.0, 1, 40, -100, 200, -300, 600]))
+        fn = os.path.join(tmp, "append.csv")
+        t0 = time.perf_counter()
+        for _ in range(200):
+            with open(fn, 'a', newline='') as f:
+                csv.writer(f).writerow([reg[k] for k in COLUNAS])
+        t_app = (time.perf_counter() - t0) / 200
+        tempos = []
+        for lote in (1, 20):
+            b = BancoOperacoes(os.path.join(tmp, f"lote{lote}.sqlite3"), lote)
+            agora = datetime(2025, 6, 2, 9, 0)
+            t0 = time.perf_counter()
+            for k in range(200):
+                b.anexar(dict(reg, op_num=k), agora + timedelta(seconds=k))
+            b.confirmar()
+            tempos.append((time.perf_counter() - t0) / 200)
+            b.fechar()
+        print(f"gravação por operação: CSV {t_app * 1e6:.0f} us | banco lote 1 {tempos[0] * 1e6:.0f} us, "
+              f"lote 20 {tempos[1] * 1e6:.0f} us")
+        banco.fechar()
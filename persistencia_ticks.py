@@ -0,0 +1,233 @@
+# persistencia_ticks.py
+
+import os
+import glob
+import threading
+import time
+from datetime import datetime
+
+# Colunas do CSV no formato do Profit (mesma ordem gravada pelo to_csv antigo)
+COLUNAS_CSV = [
+    "Ativo", "Data", "Hora",
+    "Abertura", "Máximo", "Mínimo",
+    "Fechamento", "Volume", "Quantidade"
+]
+_NUMERICAS = ("Abertura", "Máximo", "Mínimo", "Fechamento", "Volume", "Quantidade")
+
+
+def formatar_linha(nova: dict) -> str:
+    """
+    Formata um tick no mesmo padrão que o to_csv gravava:
+    separador ';', decimal ',' e três casas decimais.
+    """
+    dt = nova["DataHora"]
+    campos = [
+        str(nova["Ativo"]),
+        dt.strftime("%d/%m/%Y"),
+        dt.strftime("%H:%M:%S"),
+    ]
+    for c in _NUMERICAS:
+        v = nova.get(c)
+        campos.append(f"{float(v or 0.0):.3f}".replace('.', ','))
+    return ";".join(campos)
+
+
+def _datahora_linha(linha: str) -> datetime | None:
+    """Extrai DataHora de uma linha 'Ativo;Data;Hora;...' (None se inválida)."""
+    partes = linha.split(";", 3)
+    if len(partes) < 3:
+        return None
+    try:
+        return datetime.strptime(f"{partes[1].strip()} {partes[2].strip()}", "%d/%m/%Y %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _ultima_datahora_csv(fn: str) -> datetime | None:
+    """Lê apenas o final do CSV para descobrir a DataHora da última linha."""
+    if not os.path.isfile(fn):
+        return None
+    with open(fn, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        tam = f.tell()
+        f.seek(max(0, tam - 4096))
+        bloco = f.read().decode("latin1")
+    for linha in reversed(bloco.splitlines()):
+        dt = _datahora_linha(linha)
+        if dt is not None:
+            return dt
+    return None
+
+
+class PersistenciaTicks:
+    """
+    Persistência append-only do histórico 1-min:
+
+      - cada tick novo vira UMA linha no journal '<csv>.journal' (O(1) por tick)
+      - uma thread de fundo rotaciona o journal e anexa as linhas ao CSV do Profit
+      - na inicialização, journals pendentes (crash) são compactados antes da leitura
+
+    Linhas incompletas no fim do journal (gravação interrompida) são descartadas
+    e linhas com DataHora já presente no CSV são ignoradas, então compactar
+    duas vezes o mesmo journal não duplica histórico.
+    """
+
+    def __init__(self, csv_path: str, intervalo_compactacao: float = 30.0):
+        self.csv_path   = csv_path
+        self.journal    = csv_path + ".journal"
+        self.intervalo  = intervalo_compactacao
+        self._lock      = threading.Lock()       # protege o handle do journal
+        self._lock_csv  = threading.Lock()       # serializa compactações
+        self._fh        = None
+        self._seq       = 0
+        self._parar     = threading.Event()
+        self._thread    = None
+
+    # ——————————————————————————————————————————————————————————————
+    # Caminho quente
+    # ——————————————————————————————————————————————————————————————
+    def anexar(self, nova: dict):
+        """Grava um tick no journal (uma linha + flush)."""
+        linha = formatar_linha(nova) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self._fh = open(self.journal, "a", encoding="latin1", newline="")
+            self._fh.write(linha)
+            self._fh.flush()
+
+    # ——————————————————————————————————————————————————————————————
+    # Compactação
+    # ——————————————————————————————————————————————————————————————
+    def _rotacionar(self) -> str | None:
+        """Fecha o journal ativo e renomeia para '<journal>.<seq>' (rápido, sob lock)."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if not os.path.isfile(self.journal) or os.path.getsize(self.journal) == 0:
+                return None
+            self._seq += 1
+            destino = f"{self.journal}.{int(time.time() * 1000)}_{self._seq}"
+            os.replace(self.journal, destino)
+            return destino
+
+    def _pendentes(self) -> list:
+        """Journals rotacionados ainda não compactados, em ordem de criação."""
+        def chave(p):
+            sufixo = p.rsplit(".", 1)[-1]
+            ms, _, seq = sufixo.partition("_")
+            return (int(ms) if ms.isdigit() else 0, int(seq) if seq.isdigit() else 0)
+        return sorted(glob.glob(glob.escape(self.journal) + ".*"), key=chave)
+
+    def _mesclar(self, arquivo: str):
+        """Anexa ao CSV as linhas completas e inéditas de um journal rotacionado."""
+        with open(arquivo, "r", encoding="latin1", newline="") as f:
+            conteudo = f.read()
+        linhas = conteudo.split("\n")
+        if linhas and linhas[-1] != "":
+            print(f"[Aviso] journal com linha incompleta descartada: {arquivo}")
+        linhas = [l.rstrip("\r") for l in linhas[:-1] if l.strip()]
+
+        ultima = _ultima_datahora_csv(self.csv_path)
+        novas = []
+        for linha in linhas:
+            dt = _datahora_linha(linha)
+            if dt is None or (ultima is not None and dt <= ultima):
+                continue
+            novas.append(linha)
+            ultima = dt
+
+        if novas:
+            with open(self.csv_path, "a", encoding="latin1", newline="") as f:
+                f.write("".join(l + os.linesep for l in novas))
+                f.flush()
+                os.fsync(f.fileno())
+        os.remove(arquivo)
+
+    def compactar(self):
+        """Rotaciona o journal ativo e incorpora todos os pendentes ao CSV."""
+        with self._lock_csv:
+            self._rotacionar()
+            for arquivo in self._pendentes():
+                try:
+                    self._mesclar(arquivo)
+                except OSError as e:
+                    # CSV travado (ex.: aberto no Excel): tenta de novo no próximo ciclo
+                    print(f"[Aviso] compactação adiada ({arquivo}): {e}")
+                    break
+
+    # ——————————————————————————————————————————————————————————————
+    # Ciclo de vida
+    # ——————————————————————————————————————————————————————————————
+    def iniciar(self):
+        """Recupera journals de execuções anteriores e dispara a compactação periódica."""
+        self.compactar()
+        if self._thread is None and self.intervalo > 0:
+            self._parar.clear()
+            self._thread = threading.Thread(
+                target=self._loop, name="compactacao-ticks", daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.compactar()
+
+    def encerrar(self):
+        """Para a thread de fundo e faz a compactação final."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.compactar()
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: custo por tick x tamanho do histórico
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    from datetime import timedelta
+
+    import pandas as pd
+
+    tamanhos = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 500_000]
+    amostras = 200
+    base_dt  = datetime(2025, 1, 2, 9, 0, 0)
+
+    def nova_linha(i):
+        return {
+            "Ativo": "WINQ25", "DataHora": base_dt + timedelta(minutes=i),
+            "Abertura": 130000.0, "Máximo": 130050.0, "Mínimo": 129950.0,
+            "Fechamento": 130010.0, "Volume": 1.5e9, "Quantidade": 12000.0,
+            "Último": 130010.0,
+        }
+
+    print(f"{'linhas':>10} | {'append (us/tick)':>17} | {'to_csv (ms/tick)':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in tamanhos:
+            fn = os.path.join(tmp, f"bench_{n}.csv")
+            df = pd.DataFrame([nova_linha(i) for i in range(n)])
+            df["Data"] = df["DataHora"].dt.strftime("%d/%m/%Y")
+            df["Hora"] = df["DataHora"].dt.strftime("%H:%M:%S")
+            kw = dict(sep=";", index=False, columns=COLUNAS_CSV,
+                      encoding="latin1", decimal=",", float_format="%.3f")
+            df.to_csv(fn, **kw)
+
+            # modo novo: uma linha no journal por tick
+            p = PersistenciaTicks(fn, intervalo_compactacao=0)
+            t0 = time.perf_counter()
+            for i in range(amostras):
+                p.anexar(nova_linha(n + i))
+            t_append = (time.perf_counter() - t0) / amostras * 1e6
+            p.encerrar()
+
+            # modo antigo: regrava o CSV inteiro (poucas amostras, é O(histórico))
+            reps = 3
+            t0 = time.perf_counter()
+            for _ in range(reps):
+                df.to_csv(fn, **kw)
+            t_rewrite = (time.perf_counter() - t0) / reps * 1e3
+
+            print(f"{n:>10} | {t_append:>17.1f} | {t_rewrite:>17.1f}")
@@ -0,0 +1,163 @@
+# poller_ativos.py
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class PollerMultiAtivos:
+    """
+    Acompanha o ativo principal e os ativos de correlação sobre o mesmo feed
+    de cotações (FeedCotacoes/FeedReplay).
+
+    A leitura concorrente fica no transporte (pool de threads DDE ou push do
+    socket); aqui coletar() só compara contadores de versão em memória, então
+    cada ativo a mais custa microssegundos no loop, não um round-trip.
+
+    Cada ativo tem um buffer circular de amostras (datahora_principal, último,
+    hora_propria): toda amostra recebe o relógio do ativo principal no
+    momento da coleta, o que alinha ativos com horários/frequências
+    diferentes (IBOV, DI, DOL...) ao eixo de tempo do principal.
+    """
+
+    def __init__(self, feed, ativo_principal: str, ativos: list, tamanho_buffer: int = 30):
+        self.feed            = feed
+        self.ativo_principal = ativo_principal
+        self.ativos          = [a for a in dict.fromkeys(ativos) if a and a != ativo_principal]
+        self.tamanho_buffer  = max(1, int(tamanho_buffer))
+        self._buffers = {a: deque(maxlen=self.tamanho_buffer)
+                         for a in [ativo_principal] + self.ativos}
+        self._versoes = dict.fromkeys(self._buffers, -1)
+
+    def assinar(self):
+        """Assina todos os ativos sem aguardar (as cotações chegam pelo feed)."""
+        for ativo in self._buffers:
+            self.feed.assinar(ativo, timeout=0.0)
+
+    # ——————————————————————————————————————————————————————————————
+    # Coleta (chamada uma vez por ciclo do loop principal)
+    # ——————————————————————————————————————————————————————————————
+    def coletar(self, datahora_principal) -> int:
+        """
+        Registra nos buffers os ativos que mudaram desde a última coleta,
+        carimbados com a DataHora do ativo principal. Retorna quantos mudaram.
+        """
+        ts = pd.Timestamp(datahora_principal).value
+        alterados = 0
+        for ativo, buf in self._buffers.items():
+            v = self.feed.versao(ativo)
+            if v == self._versoes[ativo]:
+                continue
+            cot = self.feed.cotacao(ativo)
+            if cot is None or cot.get("Último") is None:
+                continue
+            self._versoes[ativo] = v
+            amostra = (ts, float(cot["Último"]), cot.get("Hora"))
+            if buf and buf[-1][0] == ts:
+                buf[-1] = amostra              # mesma DataHora: fica só a mais recente
+            else:
+                buf.append(amostra)
+            alterados += 1
+        return alterados
+
+    # ——————————————————————————————————————————————————————————————
+    # Leitura
+    # ——————————————————————————————————————————————————————————————
+    def buffer(self, ativo: str) -> list:
+        """Cópia das amostras (datahora_principal_ns, último, hora_propria) do ativo."""
+        return list(self._buffers.get(ativo, ()))
+
+    def ultimo(self, ativo: str) -> float | None:
+        buf = self._buffers.get(ativo)
+        return buf[-1][1] if buf else None
+
+    def janela(self, n: int = None) -> pd.DataFrame:
+        """
+        Últimas n DataHoras do ativo principal (linhas) x ativos (colunas),
+        com o último valor de cada ativo conhecido até aquela DataHora
+        (as-of; NaN antes da primeira amostra do ativo).
+        """
+        base = self._buffers[self.ativo_principal]
+        amostras = list(base)[-n:] if n else list(base)
+        eixo = np.array([a[0] for a in amostras], dtype=np.int64)
+        dados = {}
+        for ativo, buf in self._buffers.items():
+            if not buf:
+                dados[ativo] = np.full(len(eixo), np.nan)
+                continue
+            ts  = np.fromiter((a[0] for a in buf), dtype=np.int64, count=len(buf))
+            val = np.fromiter((a[1] for a in buf), dtype=np.float64, count=len(buf))
+            idx = np.searchsorted(ts, eixo, side="right") - 1
+            dados[ativo] = np.where(idx >= 0, val[np.maximum(idx, 0)], np.nan)
+        return pd.DataFrame(dados, index=pd.DatetimeIndex(eixo.view("datetime64[ns]"), name="DataHora"))
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: ciclo de varredura DDE sequencial x pool (conversa simulada)
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+    from feed_cotacoes import TransporteDDE, FeedCotacoes, itens_do_ativo
+
+    latencia = float(sys.argv[1]) if len(sys.argv) > 1 else 0.001   # s por Request
+    ativos   = ["WINQ25", "IBOV", "INDJ25", "DOLFUT", "DI1J26", "DI1F27"]
+
+    class _ConversaSimulada:
+        """Request com latência fixa, como um round-trip DDE ao Profit."""
+        def Request(self, item):
+            time.sleep(latencia)
+            tag = item.rpartition(".")[2]
+            if tag == "DAT":
+                return time.strftime("%d/%m/%Y")
+            if tag == "HOR":
+                return time.strftime("%H:%M:%S")
+            return f"{time.perf_counter():.3f}"
+
+    class _ServidorSimulado:
+        def Destroy(self):
+            pass
+
+    for trabalhadores in (1, len(ativos)):
+        transp = TransporteDDE(intervalo=0.0, trabalhadores=trabalhadores)
+        transp._conectar = lambda: (_ServidorSimulado(), _ConversaSimulada())
+        ciclos = []
+        orig = transp._grupos
+
+        def _grupos_medidos():
+            ciclos.append(time.perf_counter())
+            return orig()
+        transp._grupos = _grupos_medidos
+
+        for a in ativos:
+            transp.assinar(itens_do_ativo(a))
+        feed = FeedCotacoes(transp)
+        time.sleep(1.0)
+        feed.parar()
+        dur = np.diff(ciclos[1:-1]).mean() * 1e3 if len(ciclos) > 3 else float("nan")
+        print(f"{len(ativos)} ativos | {trabalhadores} thread(s) | ciclo médio {dur:7.1f} ms")
+
+    # alinhamento as-of ao relógio do principal
+    class _FeedFixo:
+        def __init__(self):
+            self.v = {}
+            self.q = {}
+        def assinar(self, ativo, timeout=0.0):
+            return True
+        def versao(self, ativo):
+            return self.v.get(ativo, 0)
+        def cotacao(self, ativo):
+            return self.q.get(ativo)
+
+    f = _FeedFixo()
+    p = PollerMultiAtivos(f, "WINQ25", ["IBOV", "DI1F27"])
+    t0 = pd.Timestamp("2025-01-02 09:00")
+    for i in range(5):
+        f.q["WINQ25"] = {"Último": 130_000 + i, "Hora": f"09:0{i}:00"}
+        f.v["WINQ25"] = i + 1
+        if i % 2 == 0:
+            f.q["IBOV"] = {"Último": 120_000 + i, "Hora": f"09:0{i}:00"}
+            f.v["IBOV"] = i + 1
+        p.coletar(t0 + pd.Timedelta(minutes=i))
+    print(p.janela())
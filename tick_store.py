@@ -0,0 +1,168 @@
+# tick_store.py
+
+import numpy as np
+import pandas as pd
+
+# Colunas numéricas mantidas em memória (DataHora fica em array próprio)
+COLUNAS = ("Abertura", "Máximo", "Mínimo", "Fechamento", "Volume", "Quantidade", "Último")
+
+
+class TickStore:
+    """
+    Armazena o histórico intraday em arrays NumPy pré-alocados (um por coluna).
+
+      - anexar() é O(1) amortizado: a capacidade cresce geometricamente (x2)
+      - com max_linhas > 0 vira um buffer circular: mantém só as últimas
+        max_linhas linhas, deslocando o bloco vivo para o início quando o
+        buffer enche (também O(1) amortizado, pois o buffer tem 2x max_linhas)
+      - frame()/coluna() devolvem visões somente leitura, sem cópia
+
+    As visões continuam válidas até o próximo anexar()/carregar(); quem
+    precisa guardar os dados entre ticks deve copiá-los.
+    """
+
+    def __init__(self, capacidade: int = 4096, max_linhas: int = 0):
+        self.max_linhas = max(0, int(max_linhas or 0))
+        self.geracao    = 0           # muda a cada carregar() (histórico refeito)
+        self._alocar(max(16, int(capacidade)))
+
+    # ——————————————————————————————————————————————————————————————
+    # Alocação
+    # ——————————————————————————————————————————————————————————————
+    def _alocar(self, cap: int):
+        self._cap      = cap
+        self._ini      = 0
+        self._fim      = 0
+        self._datahora = np.empty(cap, dtype="datetime64[ns]")
+        self._cols     = {c: np.empty(cap, dtype=np.float64) for c in COLUNAS}
+
+    def _realocar(self, cap: int):
+        """Copia o bloco vivo para buffers novos de tamanho cap (início em 0)."""
+        n   = self._fim - self._ini
+        dh  = np.empty(cap, dtype="datetime64[ns]")
+        dh[:n] = self._datahora[self._ini:self._fim]
+        cols = {}
+        for c, arr in self._cols.items():
+            novo = np.empty(cap, dtype=np.float64)
+            novo[:n] = arr[self._ini:self._fim]
+            cols[c] = novo
+        self._datahora, self._cols = dh, cols
+        self._cap, self._ini, self._fim = cap, 0, n
+
+    def _garantir_espaco(self):
+        if self._fim < self._cap:
+            return
+        n = self._fim - self._ini
+        if self.max_linhas and self._cap >= 2 * self.max_linhas:
+            # buffer circular cheio: desloca as linhas vivas para o início
+            self._datahora[:n] = self._datahora[self._ini:self._fim]
+            for arr in self._cols.values():
+                arr[:n] = arr[self._ini:self._fim]
+            self._ini, self._fim = 0, n
+            return
+        cap = self._cap * 2
+        if self.max_linhas:
+            cap = min(cap, 2 * self.max_linhas)
+        self._realocar(max(cap, n + 1))
+
+    # ——————————————————————————————————————————————————————————————
+    # Escrita
+    # ——————————————————————————————————————————————————————————————
+    def carregar(self, df: pd.DataFrame):
+        """Substitui todo o conteúdo pelo DataFrame (DataHora + COLUNAS)."""
+        n = len(df)
+        if self.max_linhas and n > self.max_linhas:
+            df = df.iloc[-self.max_linhas:]
+            n  = self.max_linhas
+        cap = max(self._cap, n + n // 2, 16)
+        if self.max_linhas:
+            cap = min(max(cap, n + 1), 2 * self.max_linhas)
+        self._alocar(cap)
+        self._datahora[:n] = df["DataHora"].to_numpy(dtype="datetime64[ns]")
+        for c, arr in self._cols.items():
+            if c in df:
+                arr[:n] = df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                arr[:n] = np.nan
+        self._fim = n
+        self.geracao += 1
+
+    def anexar(self, linha: dict):
+        """Anexa uma linha (dict com DataHora e as COLUNAS) em O(1) amortizado."""
+        self._garantir_espaco()
+        i = self._fim
+        self._datahora[i] = np.datetime64(pd.Timestamp(linha["DataHora"]).as_unit("ns"))
+        for c, arr in self._cols.items():
+            v = linha.get(c)
+            arr[i] = np.nan if v is None else v
+        self._fim = i + 1
+        if self.max_linhas and self._fim - self._ini > self.max_linhas:
+            self._ini = self._fim - self.max_linhas
+
+    # ——————————————————————————————————————————————————————————————
+    # Leitura (visões sem cópia)
+    # ——————————————————————————————————————————————————————————————
+    def __len__(self) -> int:
+        return self._fim - self._ini
+
+    @property
+    def vazio(self) -> bool:
+        return self._fim == self._ini
+
+    def ultima_datahora(self) -> pd.Timestamp | None:
+        if self.vazio:
+            return None
+        return pd.Timestamp(self._datahora[self._fim - 1])
+
+    def datahora(self) -> np.ndarray:
+        """Visão somente leitura de DataHora (datetime64[ns])."""
+        v = self._datahora[self._ini:self._fim]
+        v.flags.writeable = False
+        return v
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Visão somente leitura de uma coluna numérica."""
+        v = self._cols[nome][self._ini:self._fim]
+        v.flags.writeable = False
+        return v
+
+    def frame(self) -> pd.DataFrame:
+        """DataFrame com DataHora + COLUNAS apoiado nos buffers (sem cópia)."""
+        dados = {"DataHora": self.datahora()}
+        for c in COLUNAS:
+            dados[c] = self.coluna(c)
+        return pd.DataFrame(dados, copy=False)
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Benchmark: pd.concat + copy() x TickStore.anexar + frame()
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+
+    tamanhos = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    amostras = 200
+
+    print(f"{'linhas':>10} | {'concat+copy (us/tick)':>22} | {'TickStore (us/tick)':>20}")
+    for n in tamanhos:
+        dh  = pd.date_range("2025-01-02 09:00", periods=n + amostras, freq="min")
+        df  = pd.DataFrame({"DataHora": dh[:n], **{c: np.ones(n) for c in COLUNAS}})
+        novas = [{"DataHora": dh[n + i], **{c: 1.0 for c in COLUNAS}} for i in range(amostras)]
+
+        antigo = df
+        t0 = time.perf_counter()
+        for nova in novas:
+            antigo = pd.concat([antigo, pd.DataFrame([nova])], ignore_index=True)
+            _ = antigo.copy()
+        t_antigo = (time.perf_counter() - t0) / amostras * 1e6
+
+        store = TickStore()
+        store.carregar(df)
+        t0 = time.perf_counter()
+        for nova in novas:
+            store.anexar(nova)
+            _ = store.frame()
+        t_store = (time.perf_counter() - t0) / amostras * 1e6
+
+        print(f"{n:>10} | {t_antigo:>22.1f} | {t_store:>20.1f}")
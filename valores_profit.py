@@ -0,0 +1,167 @@
+# valores_profit.py
+
+import numpy as np
+import pandas as pd
+
+
+def tratar_valor_dde(raw: str) -> float:
+    """
+    Limpa formatação do Profit e dos nossos CSVs:
+
+      - “x/y” (campos compostos do DDE): usa apenas a parte antes da barra.
+      - Se vier com vírgula (formato europeu: “1.234,56”),
+        remove pontos de milhar e troca vírgula por ponto.
+      - Senão (formato americano: “1234.56”), mantém o ponto decimal.
+      - Vazio, “--”, “-” ou inválido → 0.0
+    """
+    if not raw or raw.strip() in ("", "--", "-"):
+        return 0.0
+
+    s = raw.split('/', 1)[0].strip()
+
+    if ',' in s and s.count(',') >= 1:
+        # vírgula indica decimal, pontos são milhares
+        clean = s.replace('.', '').replace(',', '.')
+    else:
+        # sem vírgula: ponto já é decimal
+        clean = s
+
+    try:
+        return float(clean)
+    except ValueError:
+        return 0.0
+
+
+def tratar_valor_cotacao(raw: str) -> float:
+    """
+    Campo de cotação lido do DDE do Profit, sempre no formato brasileiro:
+    ponto é separador de milhar mesmo sem vírgula (“130.000” → 130000).
+
+      - “x/y”: usa apenas a parte antes da barra.
+      - Vazio, “--” ou “-” → 0.0
+      - Inválido → ValueError (quem lê o campo registra None)
+    """
+    if not raw or raw.strip() in ("", "--", "-"):
+        return 0.0
+    s = raw.split('/', 1)[0].strip()
+    return float(s.replace('.', '').replace(',', '.'))
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Versão vetorizada (colunas inteiras de uma vez)
+# —————————————————————————————————————————————————————————————————————————
+_POT10       = 10 ** np.arange(16, dtype=np.int64)
+_MAX_DIGITOS = 15          # mantissa exata em float64 (< 2**53)
+
+
+def _ou_acumulado(m: np.ndarray) -> np.ndarray:
+    """OR acumulado ao longo das posições (linha a linha, bem mais rápido que ufunc.accumulate em bool)."""
+    out = m.copy()
+    for j in range(1, len(out)):
+        out[j] |= out[j - 1]
+    return out
+
+
+def tratar_valores(valores) -> np.ndarray:
+    """
+    Versão vetorizada de tratar_valor_dde para arrays/Series de strings.
+
+    Aplica as mesmas regras sobre a matriz (posição de caractere x linha):
+    os dígitos viram uma mantissa int64 exata dividida por 10**decimais,
+    o que reproduz float() bit a bit. Linhas fora do padrão simples (notação científica, espaços
+    internos, mais de 15 dígitos...) caem no escalar, uma a uma.
+    """
+    if isinstance(valores, pd.Series):
+        valores = valores.to_numpy()
+    a = np.asarray(valores, dtype=str).ravel()
+    n = a.size
+    if n == 0 or a.dtype.itemsize == 0:
+        return np.zeros(n, dtype=np.float64)
+
+    # matriz (posição, linha) contígua de code points; não-ASCII vira 127 (inválido)
+    w = a.dtype.itemsize // 4
+    c = np.ascontiguousarray(
+        np.minimum(a.view(np.uint32).reshape(n, w), 127).astype(np.uint8).T
+    )
+
+    # “x/y”: descarta a partir da primeira barra
+    c[_ou_acumulado(c == 47)] = 0
+
+    digito = (c >= 48) & (c <= 57)
+    branco = (c == 0) | (c == 32) | ((c >= 9) & (c <= 13))
+    virg   = c == 44
+    ponto  = c == 46
+    sinal  = (c == 43) | (c == 45)
+    n_virg = virg.sum(axis=0)
+    n_pto  = ponto.sum(axis=0)
+    n_dig  = digito.sum(axis=0)
+
+    # há conteúdo antes / depois de cada posição (para sinal e espaços internos)
+    cheio  = ~branco
+    antes  = np.zeros_like(cheio)
+    depois = np.zeros_like(cheio)
+    antes[1:]   = _ou_acumulado(cheio)[:-1]
+    depois[:-1] = _ou_acumulado(cheio[::-1])[::-1][1:]
+
+    invalido = (
+        ~(digito | branco | virg | ponto | sinal)
+        | (sinal & antes)
+        | (branco & antes & depois)
+    ).any(axis=0)
+    neg = ((c == 45) & ~antes).any(axis=0)
+
+    # separador decimal: a vírgula se houver, senão o ponto
+    sep      = np.where(n_virg > 0, virg, ponto)
+    decimais = (digito & _ou_acumulado(sep)).sum(axis=0)
+
+    # mantissa exata por Horner, uma posição de caractere por vez
+    mant = np.zeros(n, dtype=np.int64)
+    for j in range(w):
+        mant = np.where(digito[j], mant * 10 + (c[j].astype(np.int64) - 48), mant)
+
+    invalido |= (n_virg > 1) | ((n_virg == 0) & (n_pto > 1)) | (n_dig > _MAX_DIGITOS)
+
+    res = mant / _POT10[np.minimum(decimais, _MAX_DIGITOS)].astype(np.float64)
+    res = np.where(neg, -res, res)
+    res[n_dig == 0] = 0.0
+
+    # fora do padrão simples: resolve com o escalar
+    for i in np.flatnonzero(invalido & (n_dig > 0)):
+        res[i] = tratar_valor_dde(str(a[i]))
+    return res
+
+
+# —————————————————————————————————————————————————————————————————————————
+# Micro-benchmark: .apply(tratar_valor_dde) x tratar_valores
+# —————————————————————————————————————————————————————————————————————————
+if __name__ == '__main__':
+    import sys
+    import time
+
+    n   = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    # mistura típica de um CSV do Profit: preços, volumes grandes, vazios
+    precos  = [f"{v:,.3f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+               for v in rng.integers(100_000, 140_000, n) * 1.0]
+    volumes = [f"{v:,.3f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+               for v in rng.uniform(1e6, 5e9, n)]
+    misto   = np.array(precos, dtype=object)
+    misto[::17] = "--"
+    misto[::29] = "1234.5"
+    misto[::31] = "130.000,000/129.995,000"
+
+    # DDE: ponto sempre é milhar; CSV: sem vírgula o ponto é decimal
+    for raw, dde, csv in (("130.000", 130000.0, 130.0), ("130.000,5", 130000.5, 130000.5),
+                          ("1.234.567", 1234567.0, 0.0), ("129.995/130.000", 129995.0, 129.995),
+                          ("--", 0.0, 0.0)):
+        assert tratar_valor_cotacao(raw) == dde and tratar_valor_dde(raw) == csv, raw
+
+    for nome, col in (("preços", precos), ("volumes", volumes), ("misto", misto)):
+        s = pd.Series(col, dtype=object)
+        t0 = time.perf_counter(); ref = s.apply(tratar_valor_dde).to_numpy()
+        t_apply = time.perf_counter() - t0
+        t0 = time.perf_counter(); vet = tratar_valores(s)
+        t_vet = time.perf_counter() - t0
+        igual = np.array_equal(ref, vet)
+        print(f"{nome:<8} {n} linhas | apply {t_apply * 1e3:8.1f} ms | "
+              f"vetorizado {t_vet * 1e3:8.1f} ms | x{t_apply / t_vet:5.1f} | idêntico={igual}")